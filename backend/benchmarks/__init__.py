@@ -0,0 +1,11 @@
+# Backend benchmarks. Run from the backend directory, e.g.
+#   python -m benchmarks.generate --count 1000000   # load synthetic listings
+#   python -m benchmarks.report --output report.json
+#
+#   generate       deterministic synthetic listing generator / loader
+#   micro          analysis and response-building functions, per row
+#   macro          API latency and throughput under concurrent load
+#   responsiveness small-request latency while large viewports are served
+#   serialization  listing response body, previous vs current path
+#   savedsearches  saved search matching, 100k searches x 100k listings
+#   report         runs micro + macro + responsiveness into a JSON report, compares reports
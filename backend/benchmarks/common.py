@@ -0,0 +1,30 @@
+# Timing helpers shared by the benchmarks
+
+import time
+
+import numpy as np
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    """Fastest of `repeat` runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def latency_summary(latencies: list, seconds: float, errors: int) -> dict:
+    """Throughput and latency percentiles (ms) of one load run"""
+    values = np.asarray(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'rps': round(len(latencies) / seconds, 1) if seconds else None,
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
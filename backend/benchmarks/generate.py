@@ -0,0 +1,200 @@
+# Deterministic synthetic listings
+#
+# Listings are spread over ten metros, each with fixed zip code centroids
+# and price levels, so bbox density, price spread and analysis inputs look
+# like a real market. Output depends only on (count, seed): rows come in
+# fixed-size chunks, each drawn from its own seeded generator, and the
+# addresses are unique so a load inserts exactly `count` rows.
+#
+# Load into the docker-compose database (DATABASE_URL from backend/.env):
+#   python -m benchmarks.generate --count 1000000 [--seed 0] [--truncate]
+
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import database
+from database import BULK_COLUMNS, bulk_upsert_properties
+
+# Rows per seeded chunk; part of the output's definition, don't change
+CHUNK_SIZE = 10_000
+LOAD_BATCH_SIZE = 20_000
+ZIPS_PER_METRO = 40
+# Listing and sale dates count back from here rather than from today
+REFERENCE_DATE = date(2025, 1, 1)
+
+# city, state, latitude, longitude, first zip, price per sqft, tax rate, weight
+METROS = [
+    ('Dallas', 'TX', 32.7767, -96.7970, 75201, 210, 0.021, 14),
+    ('Houston', 'TX', 29.7604, -95.3698, 77002, 180, 0.022, 14),
+    ('Austin', 'TX', 30.2672, -97.7431, 78701, 300, 0.019, 9),
+    ('Phoenix', 'AZ', 33.4484, -112.0740, 85003, 260, 0.006, 12),
+    ('Atlanta', 'GA', 33.7490, -84.3880, 30303, 220, 0.010, 11),
+    ('Denver', 'CO', 39.7392, -104.9903, 80202, 340, 0.006, 9),
+    ('Tampa', 'FL', 27.9506, -82.4572, 33602, 260, 0.015, 9),
+    ('Charlotte', 'NC', 35.2271, -80.8431, 28202, 230, 0.008, 8),
+    ('Columbus', 'OH', 39.9612, -82.9988, 43215, 170, 0.016, 7),
+    ('Indianapolis', 'IN', 39.7684, -86.1581, 46204, 150, 0.011, 7),
+]
+
+HOME_TYPES = ['Single Family', 'Condo', 'Townhouse', 'Duplex']
+HOME_TYPE_WEIGHTS = [0.7, 0.14, 0.1, 0.06]
+HOME_DESIGNS = ['Ranch', 'Colonial', 'Contemporary', 'Craftsman', 'Modern', 'Traditional']
+STATUSES = ['For Sale', 'New Listing', 'Price Reduced', 'Foreclosure']
+STATUS_WEIGHTS = [0.6, 0.2, 0.15, 0.05]
+STREET_NAMES = [
+    'Main', 'Oak', 'Elm', 'Maple', 'Cedar', 'Pine', 'Lake', 'Hill', 'Park', 'Ridge',
+    'Sunset', 'Highland', 'Meadow', 'Forest', 'River', 'Spring', 'Willow', 'Church',
+    'Mill', 'Washington', 'Lincoln', 'Jackson', 'Franklin', 'Madison', 'Walnut',
+]
+STREET_SUFFIXES = ['St', 'Ave', 'Dr', 'Ln', 'Rd', 'Blvd', 'Ct', 'Way']
+
+
+def _zip_table(seed: int) -> dict:
+    """Centroid offset and price multiplier of every metro's zip codes"""
+    rng = np.random.default_rng([seed, 0])
+    count = len(METROS) * ZIPS_PER_METRO
+    return {
+        'lat_offset': rng.normal(0, 0.12, count),
+        'lng_offset': rng.normal(0, 0.15, count),
+        'price_factor': rng.lognormal(0, 0.25, count),
+    }
+
+
+def _chunk(seed: int, index: int, count: int, zips: dict) -> list:
+    """Rows [index * CHUNK_SIZE, index * CHUNK_SIZE + count) as BULK_COLUMNS tuples"""
+    rng = np.random.default_rng([seed, index + 1])
+    weights = np.array([metro[7] for metro in METROS], dtype=np.float64)
+    metro = rng.choice(len(METROS), count, p=weights / weights.sum())
+    zip_slot = metro * ZIPS_PER_METRO + rng.integers(0, ZIPS_PER_METRO, count)
+
+    center_lat = np.array([m[2] for m in METROS])[metro]
+    center_lng = np.array([m[3] for m in METROS])[metro]
+    latitude = center_lat + zips['lat_offset'][zip_slot] + rng.normal(0, 0.02, count)
+    longitude = center_lng + zips['lng_offset'][zip_slot] + rng.normal(0, 0.025, count)
+
+    home_type = rng.choice(len(HOME_TYPES), count, p=HOME_TYPE_WEIGHTS)
+    is_condo = home_type == 1
+    sqft = np.clip(rng.lognormal(np.log(np.where(is_condo, 1100, 1900)), 0.3), 450, 9000).astype(int)
+    beds = np.clip(np.round(sqft / 600 + rng.normal(0, 0.6, count)), 1, 7).astype(int)
+    baths = np.clip(beds - 1 + rng.choice([0.0, 0.5, 1.0], count), 1, 6)
+    units = np.where(home_type == 3, 2, 1)
+
+    price_per_sqft = np.array([m[5] for m in METROS])[metro] * zips['price_factor'][zip_slot]
+    price = np.round(sqft * price_per_sqft * rng.lognormal(0, 0.15, count), -3)
+    taxes = np.round(price * np.array([m[6] for m in METROS])[metro], 2)
+    hoa = np.where(is_condo | (home_type == 2), np.round(rng.uniform(150, 600, count)), 0.0)
+    year_built = np.clip(np.round(2024 - rng.gamma(2.0, 15.0, count)), 1900, 2024).astype(int)
+    lot_size = np.round(rng.uniform(3000, 12000, count)).astype(int)
+
+    for_sale = rng.random(count) < 0.85
+    status = rng.choice(len(STATUSES), count, p=STATUS_WEIGHTS)
+    listed_days_ago = rng.integers(0, 365, count)
+    # Most listings leave the rent blank for the API to estimate
+    rent = np.where(rng.random(count) < 0.35, np.round(price * rng.uniform(0.005, 0.011, count), -1), np.nan)
+    last_sold = rng.random(count) < 0.5
+    sold_years_ago = rng.integers(1, 15, count)
+    design = rng.integers(0, len(HOME_DESIGNS), count)
+
+    rows = []
+    first = index * CHUNK_SIZE
+    for i in range(count):
+        number = first + i
+        city, state, *_ = METROS[metro[i]]
+        zip_code = str(METROS[metro[i]][4] + int(zip_slot[i]) % ZIPS_PER_METRO)
+        # Unique per row: house number and street together encode the row number
+        street = (f"{number // len(STREET_NAMES) + 100} {STREET_NAMES[number % len(STREET_NAMES)]} "
+                  f"{STREET_SUFFIXES[(number // 7) % len(STREET_SUFFIXES)]}")
+        rows.append((
+            f"{street}, {city}, {state} {zip_code}", street, city, state, zip_code,
+            round(float(latitude[i]), 6), round(float(longitude[i]), 6),
+            bool(for_sale[i]),
+            REFERENCE_DATE - timedelta(days=int(listed_days_ago[i])),
+            STATUSES[status[i]] if for_sale[i] else 'Off Market',
+            float(price[i]), int(sqft[i]), int(beds[i]), float(baths[i]),
+            None if is_condo[i] else int(lot_size[i]), float(hoa[i]),
+            HOME_TYPES[home_type[i]], HOME_DESIGNS[design[i]], float(taxes[i]), int(year_built[i]),
+            int(units[i]),
+            REFERENCE_DATE - timedelta(days=365 * int(sold_years_ago[i])) if last_sold[i] else None,
+            float(np.round(price[i] * 0.8 ** (sold_years_ago[i] / 10), -3)) if last_sold[i] else None,
+            None if np.isnan(rent[i]) else float(rent[i]),
+        ))
+    return rows
+
+
+def generate_properties(count: int, seed: int = 0):
+    """Yield `count` synthetic listings in chunks of BULK_COLUMNS tuples"""
+    zips = _zip_table(seed)
+    for index in range((count + CHUNK_SIZE - 1) // CHUNK_SIZE):
+        yield _chunk(seed, index, min(CHUNK_SIZE, count - index * CHUNK_SIZE), zips)
+
+
+def listing_rows(records: list, first_id: int = 1) -> list:
+    """Generated tuples in the aliased row shape of database.PROPERTY_COLUMNS, for DB-free benchmarks"""
+    rows = []
+    for offset, record in enumerate(records):
+        row = dict(zip(BULK_COLUMNS, record))
+        price, sqft = row['price'], row['square_foot']
+        rows.append({
+            'id': first_id + offset, 'address': row['address'], 'street': row['street'],
+            'city': row['city'], 'state': row['state'], 'zip': row['zip'],
+            'latitude': row['latitude'], 'longitude': row['longitude'],
+            'forSale': row['for_sale'], 'dateListed': row['date_listed'],
+            'daysOnMarket': (REFERENCE_DATE - row['date_listed']).days, 'status': row['status'],
+            'price': price, 'pricePerSqft': round(price / sqft, 2) if sqft else None,
+            'sqft': sqft, 'beds': row['bed'], 'baths': row['bath'], 'lotSize': row['lot_size'],
+            'hoa': row['hoa'], 'homeType': row['home_type'], 'homeDesign': row['home_design'],
+            'estimatedTaxes': row['estimated_taxes'], 'yearBuilt': row['year_built'],
+            'units': row['number_of_units'], 'lastSoldDate': row['last_sold_date'],
+            'lastSoldAmount': row['last_sold_amount'], 'estimatedMonthlyRent': row['estimated_monthly_rent'],
+        })
+    return rows
+
+
+async def load(count: int, seed: int, truncate: bool) -> dict:
+    await database.init_db()
+    try:
+        if truncate:
+            async with database.get_connection() as conn:
+                # CASCADE: saved_search_matches (12-saved-searches.sql) references properties
+                await conn.execute("TRUNCATE properties RESTART IDENTITY CASCADE")
+                # TRUNCATE skips the market_stats triggers (09-market-stats.sql)
+                if await conn.fetchval("SELECT to_regclass('market_stats') IS NOT NULL"):
+                    await conn.execute("DELETE FROM market_stats")
+        started = time.perf_counter()
+        inserted = updated = 0
+        batch = []
+        for chunk in generate_properties(count, seed):
+            batch.extend(chunk)
+            if len(batch) >= LOAD_BATCH_SIZE:
+                batch_inserted, batch_updated, _ = await bulk_upsert_properties(batch)
+                inserted, updated = inserted + batch_inserted, updated + batch_updated
+                batch = []
+                print(f"  {inserted + updated:,} / {count:,}", flush=True)
+        if batch:
+            batch_inserted, batch_updated, _ = await bulk_upsert_properties(batch)
+            inserted, updated = inserted + batch_inserted, updated + batch_updated
+        async with database.get_connection() as conn:
+            await conn.execute("ANALYZE properties")
+        return {
+            'count': count, 'seed': seed, 'inserted': inserted, 'updated': updated,
+            'seconds': round(time.perf_counter() - started, 2),
+        }
+    finally:
+        await database.close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load deterministic synthetic listings into the database")
+    parser.add_argument('--count', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--truncate', action='store_true', help="Empty properties first (drops the seed data)")
+    args = parser.parse_args()
+    print(asyncio.run(load(args.count, args.seed, args.truncate)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# API latency and throughput under concurrent load
+#
+# Needs a database loaded with benchmarks.generate. By default requests go
+# through the app in-process (no HTTP server, background jobs not started)
+# and the response caches are emptied before each scenario; pass --url to
+# load a running server instead. Viewports are drawn around the generated
+# metros, so --seed must match the one used to generate.
+#
+# The insert scenario adds rows through POST /api/properties; it runs last
+# so the cache invalidation it causes doesn't affect the others.
+#
+#   python -m benchmarks.macro [--requests 200] [--concurrency 16] [--url http://localhost:8000]
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import numpy as np
+
+import database
+import main as app_module
+from benchmarks.common import latency_summary
+from benchmarks.generate import METROS, generate_properties
+
+# Viewport of a 1280x800 map at these zoom levels
+ZOOM_LEVELS = (10, 12, 14)
+VIEWPORT_PIXELS = (1280, 800)
+# Generated listings the insert scenario posts, far past any loaded row
+INSERT_SEED_OFFSET = 1_000_003
+
+
+def viewport(rng: np.random.Generator, zoom: int) -> dict:
+    """A random viewport around one of the generated metros"""
+    _, _, lat, lng, *_ = METROS[rng.integers(len(METROS))]
+    lat += rng.normal(0, 0.12)
+    lng += rng.normal(0, 0.15)
+    lng_span = VIEWPORT_PIXELS[0] / 256 * 360 / 2 ** zoom
+    lat_span = VIEWPORT_PIXELS[1] / 256 * 360 / 2 ** zoom * math.cos(math.radians(lat))
+    return {
+        'north': lat + lat_span / 2, 'south': lat - lat_span / 2,
+        'east': lng + lng_span / 2, 'west': lng - lng_span / 2,
+    }
+
+
+def insert_bodies(count: int, seed: int) -> list:
+    """POST /api/properties bodies for newly generated listings"""
+    bodies = []
+    for chunk in generate_properties(count, seed + INSERT_SEED_OFFSET):
+        for record in chunk:
+            (address, street, city, state, zip_code, latitude, longitude, for_sale, date_listed, status,
+             price, sqft, beds, baths, lot_size, hoa, home_type, home_design, taxes, year_built, units,
+             last_sold_date, last_sold_amount, rent) = record
+            bodies.append({
+                # Keeps repeated runs from colliding with earlier inserts
+                'address': f"{address} #{time.time_ns()}", 'street': street, 'city': city, 'state': state,
+                'zip': zip_code, 'latitude': latitude, 'longitude': longitude,
+                'for_sale': for_sale, 'status': status, 'date_listed': date_listed.isoformat(),
+                'price': price, 'sqft': sqft, 'beds': beds, 'baths': baths,
+                'price_per_sqft': round(price / sqft, 2), 'lot_size': lot_size or 0, 'hoa': hoa,
+                'home_type': home_type, 'home_design': home_design, 'estimated_taxes': taxes,
+                'year_built': year_built, 'units': units, 'estimated_monthly_rent': rent,
+            })
+    return bodies
+
+
+async def load_run(client: httpx.AsyncClient, requests: list, concurrency: int) -> dict:
+    """Issue (method, path, params, body) requests from `concurrency` workers"""
+    queue = list(reversed(requests))
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            method, path, params, body = queue.pop()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, params=params, json=body)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latency_summary(latencies, time.perf_counter() - started, errors)
+
+
+def scenarios(count: int, seed: int, total_properties: int) -> dict:
+    rng = np.random.default_rng(seed)
+    plans = {
+        f'bbox_z{zoom}': [('GET', '/api/properties', viewport(rng, zoom), None) for _ in range(count)]
+        for zoom in ZOOM_LEVELS
+    }
+    plans['stats'] = [('GET', '/api/stats', None, None)] * count
+    plans['property_by_id'] = [
+        ('GET', f'/api/properties/{int(property_id)}', None, None)
+        for property_id in rng.integers(1, max(total_properties, 1) + 1, count)
+    ]
+    plans['insert'] = [('POST', '/api/properties', None, body) for body in insert_bodies(count, seed)]
+    return plans
+
+
+@asynccontextmanager
+async def app_client(url: str = None):
+    """Client for the app in-process (opening the database here) or for a running server at `url`"""
+    if url is not None:
+        async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+            yield client
+        return
+    await database.init_db()
+    try:
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=60) as client:
+            yield client
+    finally:
+        await database.close_db()
+
+
+async def run(count: int = 200, concurrency: int = 16, seed: int = 0, url: str = None) -> dict:
+    """Latency summary per scenario, plus the listing count it ran against"""
+    in_process = url is None
+    async with app_client(url) as client:
+        stats = (await client.get('/api/stats')).json()
+        results = {'total_properties': stats['total_properties']}
+        for name, requests in scenarios(count, seed, stats['total_properties']).items():
+            if in_process:
+                app_module.property_cache.clear()
+                app_module.tile_cache.clear()
+            results[name] = await load_run(client, requests, concurrency)
+            print(f"  {name}: {results[name]['p50_ms']} ms p50, {results[name]['rps']} req/s", flush=True)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API latency and throughput under concurrent load")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help="Base URL of a running server (default: in-process)")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.concurrency, args.seed, args.url)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
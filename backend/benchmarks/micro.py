@@ -0,0 +1,110 @@
+# Per-call cost of the analysis and response-building functions
+#
+# Runs on generated listings without a database. Single-row functions are
+# timed one call per listing; batch functions report their cost per row.
+#
+#   python -m benchmarks.micro [--rows 10000] [--repeat 5] [--seed 0]
+
+import argparse
+import json
+import math
+from collections import defaultdict
+
+import numpy as np
+
+import comps
+from benchmarks.common import best_of
+from benchmarks.generate import generate_properties, listing_rows
+from main import (
+    AnalysisAssumptions, Property, analysis_cache, analyze_property, calculate_properties_analysis,
+    calculate_property_analysis, dump_json, to_frontend_properties, to_frontend_property,
+)
+
+CUSTOM_ASSUMPTIONS = AnalysisAssumptions(down_payment_percent=0.2, interest_rate=0.065)
+
+
+def property_models(rows: list) -> list:
+    """Listing rows as the Property models analyze_property takes"""
+    return [
+        Property(
+            id=row['id'], address=row['address'], street=row['street'], city=row['city'],
+            state=row['state'], zip=row['zip'], latitude=row['latitude'], longitude=row['longitude'],
+            price=row['price'], sqft=row['sqft'], beds=row['beds'], baths=row['baths'],
+            price_per_sqft=row['pricePerSqft'] or 0, lot_size=row['lotSize'] or 0, hoa=row['hoa'],
+            home_type=row['homeType'], estimated_taxes=row['estimatedTaxes'],
+            year_built=row['yearBuilt'], units=row['units'],
+            estimated_monthly_rent=row['estimatedMonthlyRent'],
+        )
+        for row in rows
+    ]
+
+
+def rent_table(rows: list) -> comps.RentTable:
+    """What rent_rates would hold for the generated listings that have a rent"""
+    groups = defaultdict(list)
+    for row in rows:
+        if not (row['estimatedMonthlyRent'] or 0) > 0 or not row['sqft']:
+            continue
+        rate = comps.unit_rent_per_sqft(row['estimatedMonthlyRent'], row['sqft'], row['units'])
+        cell = (f"{math.floor(row['latitude'] / comps.RENT_CELL_DEGREES)}:"
+                f"{math.floor(row['longitude'] / comps.RENT_CELL_DEGREES)}")
+        for home_type in (row['homeType'], comps.ANY_HOME_TYPE):
+            groups[('zip', row['zip'], home_type)].append(rate)
+            groups[('cell', cell, home_type)].append(rate)
+    return comps.RentTable(
+        (level, area, home_type, float(np.median(rates)), len(rates))
+        for (level, area, home_type), rates in groups.items()
+    )
+
+
+def run(rows_count: int = 10_000, repeat: int = 5, seed: int = 0) -> dict:
+    """Microseconds per row of each benchmark"""
+    rows = listing_rows([record for chunk in generate_properties(rows_count, seed) for record in chunk])
+    models = property_models(rows)
+    assumptions = AnalysisAssumptions()
+
+    def each(fn, items, *args):
+        for item in items:
+            fn(item, *args)
+
+    def custom_cold():
+        analysis_cache.clear()
+        calculate_properties_analysis(rows, CUSTOM_ASSUMPTIONS)
+
+    local_rents = rent_table(rows)
+
+    def local_rent():
+        flat, comps.rent_table = comps.rent_table, local_rents
+        try:
+            calculate_properties_analysis(rows)
+        finally:
+            comps.rent_table = flat
+
+    cases = {
+        'calculate_property_analysis': lambda: each(calculate_property_analysis, rows),
+        'analyze_property': lambda: each(analyze_property, models, assumptions),
+        'to_frontend_property': lambda: each(to_frontend_property, rows),
+        'calculate_properties_analysis': lambda: calculate_properties_analysis(rows),
+        'calculate_properties_analysis_local_rent': local_rent,
+        'calculate_properties_analysis_custom_cold': custom_cold,
+        'calculate_properties_analysis_custom_cached': lambda: calculate_properties_analysis(rows, CUSTOM_ASSUMPTIONS),
+        'to_frontend_properties': lambda: to_frontend_properties(rows),
+        'listing_response_body': lambda: dump_json(to_frontend_properties(rows)),
+    }
+    return {
+        name: {'us_per_row': round(best_of(repeat, case) / rows_count * 1e6, 3)}
+        for name, case in cases.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-row cost of the analysis and response functions")
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat, args.seed), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+# Benchmark report for comparing commits
+#
+# Runs the micro and/or macro benchmarks (macro includes responsiveness)
+# and writes one JSON document with the environment it ran in (commit,
+# Python, CPU count, listing count).
+# --compare prints each metric against an earlier report and flags changes
+# beyond --threshold in the slower direction.
+#
+#   python -m benchmarks.report --output before.json
+#   git checkout my-branch
+#   python -m benchmarks.report --output after.json --compare before.json [--fail-on-regression]
+#   python -m benchmarks.report --compare before.json after.json   # compare two saved reports
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Metrics where a larger value is better; every other timing is lower-is-better
+HIGHER_IS_BETTER = ('rps',)
+# Values that describe the run rather than measure it
+NOT_COMPARED = ('requests', 'errors', 'seconds', 'total_properties')
+
+
+def git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(['git', *args], capture_output=True, text=True).stdout.strip()
+    return {'commit': git('rev-parse', 'HEAD') or None, 'dirty': bool(git('status', '--porcelain'))}
+
+
+def environment() -> dict:
+    return {
+        **git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def flatten(results: dict, prefix: str = '') -> dict:
+    """{'macro.bbox_z12.p50_ms': 4.2, ...} for every compared number"""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and key not in NOT_COMPARED:
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Print a metric-by-metric comparison; returns the regressed metric names"""
+    before, after = flatten(baseline['results']), flatten(current['results'])
+    regressions = []
+    print(f"{'metric':<60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        change = (new - old) / old if old else 0.0
+        worse = -change if name.rsplit('.', 1)[-1] in HIGHER_IS_BETTER else change
+        flag = ''
+        if worse > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif worse < -threshold:
+            flag = '  improved'
+        print(f"{name:<60} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{flag}")
+    for name in sorted(before.keys() ^ after.keys()):
+        print(f"{name:<60} only in {'baseline' if name in before else 'current'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmarks and write or compare JSON reports")
+    parser.add_argument('reports', nargs='*', help="With --compare: an existing report to compare instead of running")
+    parser.add_argument('--output', help="Write the report here")
+    parser.add_argument('--compare', help="Baseline report to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="Relative change flagged (default 0.1)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-macro', action='store_true', help="No database needed")
+    parser.add_argument('--rows', type=int, default=10_000, help="Micro-benchmark rows")
+    parser.add_argument('--requests', type=int, default=200, help="Macro requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help="Macro-benchmark a running server instead of in-process")
+    args = parser.parse_args()
+
+    if args.reports:
+        with open(args.reports[0]) as f:
+            report = json.load(f)
+    else:
+        results = {}
+        if not args.skip_micro:
+            from benchmarks import micro
+            print("Micro-benchmarks...", flush=True)
+            results['micro'] = micro.run(args.rows, seed=args.seed)
+        if not args.skip_macro:
+            from benchmarks import macro
+            print("Macro-benchmarks...", flush=True)
+            results['macro'] = asyncio.run(macro.run(args.requests, args.concurrency, args.seed, args.url))
+            from benchmarks import responsiveness
+            print("Responsiveness under large viewports...", flush=True)
+            results['responsiveness'] = asyncio.run(responsiveness.run(args.requests, seed=args.seed, url=args.url))
+        report = {
+            'environment': environment(),
+            'settings': {
+                'rows': args.rows, 'requests': args.requests, 'concurrency': args.concurrency,
+                'seed': args.seed, 'url': args.url,
+            },
+            'results': results,
+        }
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Report written to {args.output}")
+        else:
+            print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
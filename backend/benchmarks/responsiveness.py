@@ -0,0 +1,119 @@
+# Small-request latency while large viewports are being served
+#
+# Runs /health and small bbox requests twice: once on an idle server, once
+# while --large workers keep requesting 5000-listing viewports. With the
+# worker pool (offload.py) the small requests' p99 should barely move; with
+# OFFLOAD_EXECUTOR=off every large page blocks the event loop and it climbs.
+# In-process runs also report the event loop lag seen by each phase.
+#
+# Like macro, needs a database loaded with benchmarks.generate:
+#   python -m benchmarks.responsiveness [--requests 300] [--large 4] [--url http://localhost:8000]
+#   OFFLOAD_EXECUTOR=off python -m benchmarks.responsiveness   # for comparison
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import numpy as np
+
+import offload
+from benchmarks.common import latency_summary
+from benchmarks.macro import app_client, load_run, viewport
+from metrics import loop_lag, monitor_event_loop
+
+LARGE_ZOOM = 10
+LARGE_LIMIT = 5000
+SMALL_ZOOM = 14
+SMALL_LIMIT = 20
+SMALL_CONCURRENCY = 2
+LOOP_LAG_INTERVAL_SECONDS = 0.01
+
+
+def small_requests(rng: np.random.Generator, count: int) -> dict:
+    # A random min_price keeps every request out of the response cache
+    return {
+        'health': [('GET', '/health', None, None)] * count,
+        'small_bbox': [
+            ('GET', '/api/properties',
+             {**viewport(rng, SMALL_ZOOM), 'limit': SMALL_LIMIT, 'min_price': int(rng.integers(1, 1000))}, None)
+            for _ in range(count)
+        ],
+    }
+
+
+async def large_load(client: httpx.AsyncClient, rng: np.random.Generator, stop: asyncio.Event,
+                     latencies: list, errors: list):
+    """Request large viewports back to back until `stop` is set"""
+    while not stop.is_set():
+        params = {**viewport(rng, LARGE_ZOOM), 'limit': LARGE_LIMIT, 'min_price': int(rng.integers(1, 1000))}
+        start = time.perf_counter()
+        try:
+            response = await client.get('/api/properties', params=params)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(e)
+        latencies.append(time.perf_counter() - start)
+
+
+async def measure(client: httpx.AsyncClient, requests: dict) -> dict:
+    results = {}
+    loop_lag['max_seconds'] = 0.0
+    for name, plan in requests.items():
+        results[name] = await load_run(client, plan, SMALL_CONCURRENCY)
+    results['loop_lag_max_ms'] = round(loop_lag['max_seconds'] * 1000, 3)
+    return results
+
+
+async def run(count: int = 300, large: int = 4, seed: int = 0, url: str = None) -> dict:
+    """Small-request latency idle and under large-viewport load"""
+    rng = np.random.default_rng(seed)
+    monitor = asyncio.create_task(monitor_event_loop(LOOP_LAG_INTERVAL_SECONDS)) if url is None else None
+    try:
+        async with app_client(url) as client:
+            results = {'executor': offload.OFFLOAD_EXECUTOR if url is None else None}
+            results['idle'] = await measure(client, small_requests(rng, count))
+
+            stop = asyncio.Event()
+            large_latencies, large_errors = [], []
+            started = time.perf_counter()
+            workers = [
+                asyncio.create_task(large_load(client, rng, stop, large_latencies, large_errors))
+                for _ in range(large)
+            ]
+            # Let the large requests get going before measuring
+            await asyncio.sleep(0.5)
+            try:
+                results['loaded'] = await measure(client, small_requests(rng, count))
+            finally:
+                stop.set()
+                await asyncio.gather(*workers)
+            results['loaded']['large_bbox'] = latency_summary(
+                large_latencies, time.perf_counter() - started, len(large_errors)
+            )
+            for phase in ('idle', 'loaded'):
+                summary = ", ".join(
+                    f"{name} p99 {values['p99_ms']} ms"
+                    for name, values in results[phase].items() if isinstance(values, dict)
+                )
+                print(f"  {phase}: {summary}", flush=True)
+            return results
+    finally:
+        if monitor is not None:
+            monitor.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Small-request latency while large viewports are served")
+    parser.add_argument('--requests', type=int, default=300, help="Requests per small scenario and phase")
+    parser.add_argument('--large', type=int, default=4, help="Concurrent large-viewport workers")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help="Base URL of a running server (default: in-process)")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.large, args.seed, args.url)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
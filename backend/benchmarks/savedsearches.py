@@ -0,0 +1,120 @@
+# Saved search matching: a listing feed against many saved searches
+#
+# Generates --searches saved searches (viewports around the generated
+# metros, zoom 11-15, with a random mix of the listing filters) and a feed
+# of --listings generated listings, then times building the SearchIndex and
+# matching the feed in bulk-load sized batches. For comparison it times a
+# full scan (every listing against every search) on a sample of the feed,
+# and checks both find the same matches there. No database needed.
+#
+#   python -m benchmarks.savedsearches [--searches 100000] [--listings 100000] [--seed 0]
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.generate import HOME_TYPES, STATUSES, generate_properties, listing_rows
+from benchmarks.macro import viewport
+from main import BULK_BATCH_SIZE, LISTING_ANALYSIS_FIELDS, SAVED_SEARCH_CELL_DEGREES, analyze_rows
+from savedsearch import SearchIndex
+
+FULL_SCAN_SAMPLE = 500
+SEARCH_ZOOMS = [11, 12, 13, 14, 15]
+SEARCH_ZOOM_WEIGHTS = [0.1, 0.25, 0.3, 0.25, 0.1]
+# Seed offset so searches don't share draws with the listing generator
+SEARCH_SEED_OFFSET = 7_000_003
+
+
+def generate_searches(count: int, seed: int) -> list:
+    """Saved searches shaped like the map's filter panel"""
+    rng = np.random.default_rng(seed + SEARCH_SEED_OFFSET)
+    searches = []
+    for search_id in range(1, count + 1):
+        # A few watch everywhere, most a neighbourhood to a city
+        if rng.random() < 0.002:
+            search = {'id': search_id}
+        else:
+            search = {'id': search_id, **viewport(rng, int(rng.choice(SEARCH_ZOOMS, p=SEARCH_ZOOM_WEIGHTS)))}
+        if rng.random() < 0.3:
+            search['status'] = STATUSES[rng.integers(len(STATUSES))]
+        if rng.random() < 0.5:
+            search['home_type'] = HOME_TYPES[rng.integers(len(HOME_TYPES))]
+        if rng.random() < 0.8:
+            search['min_price'] = int(rng.integers(1, 16)) * 50_000
+        if rng.random() < 0.8:
+            search['max_price'] = search.get('min_price', 0) + int(rng.integers(1, 7)) * 50_000
+        if rng.random() < 0.6:
+            search['min_beds'] = int(rng.integers(1, 5))
+        if rng.random() < 0.4:
+            search['min_deal_score'] = int(rng.integers(3, 9)) * 10
+        searches.append(search)
+    return searches
+
+
+def full_scan(index: SearchIndex, rows: list, deal_scores: np.ndarray) -> set:
+    """Matches found by checking every (listing, search) pair"""
+    listing = index._listing_arrays(rows, deal_scores)
+    slots = np.arange(len(index.ids))
+    matches = set()
+    for row in range(len(rows)):
+        ok = index._check(listing, np.full(len(slots), row), slots, exact=False)
+        matches.update(zip(index.ids[ok].tolist(), [int(listing['ids'][row])] * int(ok.sum())))
+    return matches
+
+
+def run(search_count: int = 100_000, listing_count: int = 100_000, seed: int = 0) -> dict:
+    searches = generate_searches(search_count, seed)
+    rows = listing_rows([record for chunk in generate_properties(listing_count, seed) for record in chunk])
+    deal_scores = analyze_rows(rows, fields=LISTING_ANALYSIS_FIELDS)['deal_score']
+
+    index = SearchIndex(SAVED_SEARCH_CELL_DEGREES)
+    started = time.perf_counter()
+    index.load(searches)
+    build_seconds = time.perf_counter() - started
+
+    matches = 0
+    batch_seconds = []
+    for start in range(0, len(rows), BULK_BATCH_SIZE):
+        batch_started = time.perf_counter()
+        search_ids, _ = index.match(rows[start:start + BULK_BATCH_SIZE], deal_scores[start:start + BULK_BATCH_SIZE])
+        batch_seconds.append(time.perf_counter() - batch_started)
+        matches += len(search_ids)
+    match_seconds = sum(batch_seconds)
+
+    sample = rows[:FULL_SCAN_SAMPLE]
+    started = time.perf_counter()
+    expected = full_scan(index, sample, deal_scores[:FULL_SCAN_SAMPLE])
+    scan_seconds_per_listing = (time.perf_counter() - started) / len(sample)
+    search_ids, property_ids = index.match(sample, deal_scores[:FULL_SCAN_SAMPLE])
+    found = set(zip(search_ids.tolist(), property_ids.tolist()))
+
+    return {
+        'searches': search_count,
+        'listings': listing_count,
+        'index': index.stats(),
+        'build_seconds': round(build_seconds, 3),
+        'match_seconds': round(match_seconds, 3),
+        'listings_per_second': round(listing_count / match_seconds),
+        'batch_ms_p50': round(float(np.percentile(batch_seconds, 50)) * 1000, 3),
+        'batch_ms_max': round(max(batch_seconds) * 1000, 3),
+        'matches': matches,
+        'matches_per_listing': round(matches / listing_count, 2),
+        'full_scan_seconds_estimate': round(scan_seconds_per_listing * listing_count, 3),
+        'speedup': round(scan_seconds_per_listing * listing_count / match_seconds, 1),
+        'sample_matches_agree': found == expected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Saved search matching throughput")
+    parser.add_argument('--searches', type=int, default=100_000)
+    parser.add_argument('--listings', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.searches, args.listings, args.seed), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# Per-row cost of building a /api/properties response body
+#
+# Compares the previous path (dict(row) + isoformat, renaming keys per row,
+# FastAPI's jsonable_encoder and stdlib json) with the current one (rows
+# aliased in SQL, one dict copy per row, orjson). Rows are synthetic and no
+# database is needed; analysis is computed once up front since both paths
+# share it.
+#
+#   python -m benchmarks.serialization [--rows 10000] [--repeat 5]
+
+import argparse
+import json
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.common import best_of
+from main import calculate_properties_analysis, dump_json, to_frontend_properties
+
+# The per-row renames the previous path did after fetching DB-named rows
+_FIELD_RENAMES = [
+    ('square_foot', 'sqft', 0),
+    ('bed', 'beds', 0),
+    ('bath', 'baths', 0),
+    ('price_per_square_foot', 'pricePerSqft', 0),
+    ('lot_size', 'lotSize', 0),
+    ('home_type', 'homeType', ''),
+    ('home_design', 'homeDesign', ''),
+    ('estimated_taxes', 'estimatedTaxes', 0),
+    ('year_built', 'yearBuilt', 0),
+    ('number_of_units', 'units', 1),
+    ('date_listed', 'dateListed', None),
+    ('days_on_market', 'daysOnMarket', 0),
+    ('for_sale', 'forSale', True),
+    ('last_sold_date', 'lastSoldDate', None),
+    ('last_sold_amount', 'lastSoldAmount', 0),
+    ('estimated_monthly_rent', 'estimatedMonthlyRent', 0),
+]
+
+
+def db_rows(count: int, seed: int = 0) -> list:
+    """Synthetic rows as asyncpg returned them for the old DB-named column list"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        sqft = rng.randint(700, 4000)
+        price = Decimal(rng.randint(80_000, 900_000)).quantize(Decimal('0.01'))
+        rows.append({
+            'id': i, 'address': f'{i} Main St, Dallas, TX 75201', 'street': f'{i} Main St',
+            'city': 'Dallas', 'state': 'TX', 'zip': '75201',
+            'latitude': Decimal('32.7') + Decimal(rng.randint(0, 10**6)) / 10**7,
+            'longitude': Decimal('-96.8') + Decimal(rng.randint(0, 10**6)) / 10**7,
+            'for_sale': True, 'date_listed': date(2024, 1, 1) + timedelta(days=rng.randint(0, 365)),
+            'days_on_market': rng.randint(0, 120), 'status': 'For Sale',
+            'price': price, 'price_per_square_foot': (price / sqft).quantize(Decimal('0.01')),
+            'square_foot': sqft, 'bed': rng.randint(1, 5), 'bath': Decimal(rng.randint(2, 8)) / 2,
+            'lot_size': rng.randint(2000, 12000), 'hoa': Decimal('0.00'),
+            'home_type': 'Single Family', 'home_design': None,
+            'estimated_taxes': (price * Decimal('0.02')).quantize(Decimal('0.01')),
+            'year_built': rng.randint(1950, 2023), 'number_of_units': 1,
+            'last_sold_date': None, 'last_sold_amount': None, 'estimated_monthly_rent': None,
+        })
+    return rows
+
+
+def listing_rows(rows: list) -> list:
+    """The same rows in the aliased, float8 shape of database.PROPERTY_COLUMNS"""
+    def number(value):
+        return float(value) if value is not None else None
+
+    listing = []
+    for row in rows:
+        prop = dict(row)
+        for key in ('latitude', 'longitude', 'price', 'price_per_square_foot', 'bath', 'hoa',
+                    'estimated_taxes', 'last_sold_amount', 'estimated_monthly_rent'):
+            prop[key] = number(prop[key])
+        for db_key, frontend_key, _ in _FIELD_RENAMES:
+            prop[frontend_key] = prop.pop(db_key)
+        listing.append(prop)
+    return listing
+
+
+def previous_path(rows: list, analyses: list) -> bytes:
+    props = []
+    for row, analysis in zip(rows, analyses):
+        prop = dict(row)
+        if prop.get('date_listed'):
+            prop['date_listed'] = prop['date_listed'].isoformat()
+        if prop.get('last_sold_date'):
+            prop['last_sold_date'] = prop['last_sold_date'].isoformat()
+        prop['analysis'] = analysis
+        for db_key, frontend_key, default in _FIELD_RENAMES:
+            prop[frontend_key] = prop.pop(db_key, default)
+        props.append(prop)
+    return json.dumps(jsonable_encoder(props)).encode()
+
+
+def current_path(rows: list, analyses: list) -> bytes:
+    return dump_json([{**row, 'analysis': analysis} for row, analysis in zip(rows, analyses)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-row cost of building a /api/properties response body")
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    old_rows = db_rows(args.rows)
+    new_rows = listing_rows(old_rows)
+    analyses = calculate_properties_analysis(new_rows)
+
+    # Both paths must produce the same document
+    assert json.loads(previous_path(old_rows, analyses)) == json.loads(current_path(new_rows, analyses))
+
+    results = {
+        'rows': args.rows,
+        'previous_us_per_row': best_of(args.repeat, previous_path, old_rows, analyses) / args.rows * 1e6,
+        'current_us_per_row': best_of(args.repeat, current_path, new_rows, analyses) / args.rows * 1e6,
+        'current_with_analysis_us_per_row': (
+            best_of(args.repeat, lambda: dump_json(to_frontend_properties(new_rows))) / args.rows * 1e6
+        ),
+    }
+    results['speedup'] = results['previous_us_per_row'] / results['current_us_per_row']
+    print(json.dumps({key: round(value, 3) for key, value in results.items()}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# In-process response cache for map viewport queries
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    LRU cache with per-entry expiry.
+    Size is bounded both by entry count and by total weight (e.g. rows held),
+    so one huge viewport can't crowd out everything else unnoticed.
+    Thread-safe: offload worker threads read and fill it while the event
+    loop clears it.
+    """
+
+    def __init__(self, max_entries: int = 256, max_weight: int = 200_000, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, weight, value)
+        self._weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, _, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, weight: int = 1):
+        """Store a value, evicting least recently used entries past the limits"""
+        if weight > self.max_weight:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, weight, value)
+            self._weight += weight
+
+            while len(self._entries) > self.max_entries or self._weight > self.max_weight:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (called when the underlying data changes)"""
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+            self.invalidations += 1
+
+    def _remove(self, key: Hashable):
+        _, weight, _ = self._entries.pop(key)
+        self._weight -= weight
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, weight = len(self._entries), self._weight
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'weight': weight,
+            'max_entries': self.max_entries,
+            'max_weight': self.max_weight,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+def snap_bbox(north: float, south: float, east: float, west: float, cells: int = 4):
+    """
+    Expand a bounding box outward to a power-of-two degree grid.
+    The grid step is about 1/cells of the larger viewport side, so small pans
+    and zoom jitter at the same zoom level land on the same snapped box.
+    """
+    span = max(north - south, east - west, 1e-6)
+    step = 2.0 ** math.floor(math.log2(span / cells))
+    return (
+        min(math.ceil(north / step) * step, 90.0),
+        max(math.floor(south / step) * step, -90.0),
+        min(math.ceil(east / step) * step, 180.0),
+        max(math.floor(west / step) * step, -180.0),
+    )
+
+
+# Shared cache for /api/properties responses, weighted by rows held
+property_cache = TTLCache(
+    max_entries=int(os.getenv("PROPERTY_CACHE_MAX_ENTRIES", "256")),
+    max_weight=int(os.getenv("PROPERTY_CACHE_MAX_ROWS", "200000")),
+    ttl_seconds=float(os.getenv("PROPERTY_CACHE_TTL_SECONDS", "60")),
+)
+
+# Encoded vector tiles, weighted by bytes
+tile_cache = TTLCache(
+    max_entries=int(os.getenv("TILE_CACHE_MAX_ENTRIES", "4096")),
+    max_weight=int(os.getenv("TILE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("TILE_CACHE_TTL_SECONDS", "300")),
+)
+
+# Per-property analysis results under non-default assumptions, keyed by the
+# assumption hash and the row's analysis inputs. One entry per row, so the
+# entry count is the only bound that matters.
+_ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "100000"))
+analysis_cache = TTLCache(
+    max_entries=_ANALYSIS_CACHE_MAX_ENTRIES,
+    max_weight=_ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "600")),
+)
+
+
+class DataVersion:
+    """
+    Counter of listing data changes seen by this process.
+    This process's write paths bump it right away, and every committed
+    change, from any process, bumps it again when its property_changes
+    notification arrives (main.on_data_change). ETags are derived from it,
+    so a client's cached copy can be validated without querying Postgres.
+    The epoch is random per process so counters restarting at zero never
+    reuse an ETag.
+    """
+
+    def __init__(self):
+        self.value = 0
+        self.epoch = os.urandom(4).hex()
+
+    def bump(self) -> int:
+        self.value += 1
+        return self.value
+
+
+data_version = DataVersion()
@@ -0,0 +1,156 @@
+# Live change feed for /api/stream
+#
+# Property change notifications (07/08 SQL) are collected here and flushed
+# in batches: the API fetches the current rows for the changed ids and hands
+# them to publish(), which pushes each subscriber one event holding only the
+# changes that touch its viewport and filters. A listing is upserted when
+# its new state matches, and removed when its old state matched but the new
+# one doesn't (or it was deleted).
+#
+# Events are Server-Sent Events frames, encoded once per flush and shared by
+# every subscriber they apply to.
+
+import asyncio
+import json
+from typing import Dict, List, Optional
+
+# Events buffered per subscriber; a client further behind is sent a resync
+MAX_QUEUED_EVENTS = 100
+
+RESYNC_EVENT = b'event: resync\ndata: {}\n\n'
+READY_EVENT = b'event: ready\ndata: {}\n\n'
+HEARTBEAT = b': ping\n\n'
+
+# Old values of an update or delete whose notification didn't carry them
+# (07-change-notify.sql without 08); treated as matching every subscriber
+UNKNOWN = {}
+
+
+def _at_least(value, bound, missing: bool) -> bool:
+    if value is None:
+        return missing
+    return value >= bound
+
+
+def matches(row: dict, bbox: Optional[tuple], filters: dict, missing: bool = False) -> bool:
+    """
+    Whether a listing row passes a subscription, with the semantics of
+    database._filter_conditions. Rows carry deal_score and cap_rate; when
+    those are NULL the answer is `missing` (stored analysis may be stale).
+    """
+    if bbox is not None:
+        north, south, east, west = bbox
+        lat, lng = row['latitude'], row['longitude']
+        if lat is None or lng is None or not (south <= lat <= north and west <= lng <= east):
+            return False
+    if filters.get('status') and filters['status'] != 'All' and row['status'] != filters['status']:
+        return False
+    if filters.get('home_type') and filters['home_type'] != 'All' and row['homeType'] != filters['home_type']:
+        return False
+    if filters.get('min_price') and not _at_least(row['price'], filters['min_price'], False):
+        return False
+    if filters.get('max_price') and not (row['price'] is not None and row['price'] <= filters['max_price']):
+        return False
+    if filters.get('min_beds') and not _at_least(row['beds'], filters['min_beds'], False):
+        return False
+    if filters.get('for_sale') is not None and row['forSale'] != filters['for_sale']:
+        return False
+    if filters.get('min_deal_score') is not None and not _at_least(row['deal_score'], filters['min_deal_score'], missing):
+        return False
+    if filters.get('min_cap_rate') is not None and not _at_least(row['cap_rate'], filters['min_cap_rate'], missing):
+        return False
+    return True
+
+
+class Subscription:
+    """One connected client: its viewport, filters and outgoing event queue"""
+
+    def __init__(self, bbox: Optional[tuple], filters: dict):
+        self.bbox = bbox
+        self.filters = {key: value for key, value in filters.items() if value is not None}
+        self.queue: asyncio.Queue = asyncio.Queue(MAX_QUEUED_EVENTS)
+
+    def send(self, event: bytes):
+        if self.queue.full():
+            # Too far behind to catch up: drop the backlog, tell it to refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC_EVENT
+        self.queue.put_nowait(event)
+
+
+class ChangeFeed:
+    """Subscriber registry plus the changes waiting for the next flush"""
+
+    def __init__(self):
+        self.subscriptions: List[Subscription] = []
+        # id -> old values from the first notification since the last flush
+        # (None for inserts), i.e. the state subscribers last saw
+        self.pending: Dict[int, Optional[dict]] = {}
+        self.resync = False
+        self.events_sent = 0
+
+    def subscribe(self, bbox: Optional[tuple], filters: dict) -> Subscription:
+        subscription = Subscription(bbox, filters)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+    def record(self, payload: str):
+        """Notification callback"""
+        change = json.loads(payload)
+        if change['op'] == 'analysis':
+            # Only the stored analysis changed; events carry analysis computed here
+            return
+        if change['op'] == 'bulk':
+            self.resync = True
+        else:
+            old = change.get('old')
+            if old is None and change['op'] != 'insert':
+                old = UNKNOWN
+            self.pending.setdefault(change['id'], old)
+
+    def take(self) -> tuple:
+        """(resync, {id: old values}) collected since the last call"""
+        resync, pending = self.resync, self.pending
+        self.resync, self.pending = False, {}
+        return resync, pending
+
+    def publish(self, resync: bool, old_rows: Dict[int, Optional[dict]], rows: List[dict], bodies: List[bytes]):
+        """
+        Push one event per affected subscriber.
+        `rows` are the current listing rows of the changed ids that still
+        exist, with deal_score and cap_rate, and `bodies` their encoded JSON.
+        """
+        if resync:
+            for subscription in self.subscriptions:
+                subscription.send(RESYNC_EVENT)
+            self.events_sent += len(self.subscriptions)
+            return
+
+        current = {row['id']: (row, body) for row, body in zip(rows, bodies)}
+        for subscription in self.subscriptions:
+            upserts, removes = [], []
+            for property_id, old in old_rows.items():
+                row, body = current.get(property_id, (None, None))
+                if row is not None and matches(row, subscription.bbox, subscription.filters):
+                    upserts.append(body)
+                elif old is UNKNOWN or (old is not None and matches(
+                        old, subscription.bbox, subscription.filters, missing=True)):
+                    removes.append(str(property_id).encode())
+            if upserts or removes:
+                subscription.send(
+                    b'event: changes\ndata: {"upserts":[' + b','.join(upserts)
+                    + b'],"removes":[' + b','.join(removes) + b']}\n\n'
+                )
+                self.events_sent += 1
+
+    def stats(self) -> dict:
+        return {
+            'subscribers': len(self.subscriptions),
+            'pending': len(self.pending) + int(self.resync),
+            'events_sent': self.events_sent,
+        }
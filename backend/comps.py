@@ -0,0 +1,142 @@
+# Location-aware rents: the local rent table and comparable properties
+#
+# RentTable holds the rent_rates view (11-rent-rates.sql): the median rent
+# per square foot per unit of listings with a known rent, by zip and by
+# RENT_CELL_DEGREES grid cell, each over all home types and per home type.
+# rates() looks up a whole page of rows at once, so analyzing a viewport
+# with local rents costs a few dict lookups per row rather than a query.
+# The most specific group with at least RENT_MIN_SAMPLES rents wins:
+# zip + home type, cell + home type, zip, cell. Rows with none (and every
+# row before the table is loaded) keep the flat BASE_RENT_PER_SQFT model.
+#
+# weigh_comps() turns the nearest similar listings with a rent
+# (database.fetch_comps) into a rent estimate, weighting each comp by
+# distance and by how recently it was listed.
+
+import hashlib
+import math
+import os
+import time
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+# Grid cell size of rent_rates; must match 11-rent-rates.sql
+RENT_CELL_DEGREES = 0.05
+# Fewer rents than this in a group are too noisy to use
+RENT_MIN_SAMPLES = int(os.getenv("RENT_MIN_SAMPLES", "5"))
+ANY_HOME_TYPE = '*'
+
+# Comparable properties: same home type, beds and baths within one, size
+# within 30%, up to COMP_MAX_DISTANCE_KM away
+COMP_BED_TOLERANCE = 1
+COMP_BATH_TOLERANCE = 1
+COMP_SQFT_TOLERANCE = 0.3
+COMP_MAX_DISTANCE_KM = 10.0
+# A comp's weight falls by e every COMP_DISTANCE_SCALE_KM and halves every
+# COMP_RECENCY_HALF_LIFE_DAYS since it was listed
+COMP_DISTANCE_SCALE_KM = 2.0
+COMP_RECENCY_HALF_LIFE_DAYS = 180
+
+
+def unit_rent_per_sqft(rent: float, sqft: float, units: Optional[int]) -> float:
+    """Rent per square foot per unit, the way rent_rates measures it"""
+    return rent / (sqft * max(units or 1, 1))
+
+
+class RentTable:
+    """In-memory rent_rates, looked up in batches"""
+
+    def __init__(self, rows=()):
+        # rows: (level, area, home_type, rent_per_sqft, samples)
+        self._zip = {}
+        self._cell = {}
+        for level, area, home_type, rate, samples in rows:
+            if samples < RENT_MIN_SAMPLES or not rate or rate <= 0:
+                continue
+            if level == 'zip':
+                self._zip[(area, home_type)] = float(rate)
+            else:
+                lat_index, lng_index = area.split(':')
+                self._cell[(int(lat_index), int(lng_index), home_type)] = float(rate)
+        self.entries = len(self._zip) + len(self._cell)
+        rates = list(self._zip.values()) + list(self._cell.values())
+        self.max_rate = max(rates) if rates else None
+        # Identifies the contents, so reloading an unchanged table is a no-op
+        digest = repr(sorted((key, round(rate, 4)) for key, rate in self._zip.items()))
+        digest += repr(sorted((key, round(rate, 4)) for key, rate in self._cell.items()))
+        self.version = hashlib.sha1(digest.encode()).hexdigest()[:12] if self.entries else 'flat'
+        self.loaded_at = time.time()
+
+    def rates(self, lat: np.ndarray, lng: np.ndarray, zips: list, home_types: list) -> Optional[np.ndarray]:
+        """Local rent per sqft of each row, NaN where no group qualifies; None for an empty table"""
+        if not self.entries:
+            return None
+        located = ~(np.isnan(lat) | np.isnan(lng))
+        lat_cells = np.where(located, np.floor(np.nan_to_num(lat) / RENT_CELL_DEGREES), 0).astype(np.int64).tolist()
+        lng_cells = np.where(located, np.floor(np.nan_to_num(lng) / RENT_CELL_DEGREES), 0).astype(np.int64).tolist()
+        zip_rate, cell_rate = self._zip.get, self._cell.get
+        rates = [
+            zip_rate((zip_code, home_type))
+            or (cell_rate((lat_cell, lng_cell, home_type)) if has_location else None)
+            or zip_rate((zip_code, ANY_HOME_TYPE))
+            or (cell_rate((lat_cell, lng_cell, ANY_HOME_TYPE)) if has_location else None)
+            for zip_code, home_type, lat_cell, lng_cell, has_location
+            in zip(zips, home_types, lat_cells, lng_cells, located.tolist())
+        ]
+        return np.array([math.nan if rate is None else rate for rate in rates], dtype=np.float64)
+
+    def stats(self) -> dict:
+        return {
+            'entries': self.entries,
+            'zips': len({area for area, _ in self._zip}),
+            'cells': len({(lat, lng) for lat, lng, _ in self._cell}),
+            'max_rent_per_sqft': self.max_rate,
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+        }
+
+
+# The table analysis uses; replaced by main.load_rent_table
+rent_table = RentTable()
+
+
+def comp_ranges(beds: Optional[int], baths: Optional[float], sqft: Optional[int]) -> dict:
+    """Bed, bath and size ranges a comp of this subject must fall in"""
+    beds, baths, sqft = beds or 0, baths or 0, sqft or 0
+    return {
+        'beds': (beds - COMP_BED_TOLERANCE, beds + COMP_BED_TOLERANCE),
+        'baths': (baths - COMP_BATH_TOLERANCE, baths + COMP_BATH_TOLERANCE),
+        'sqft': (sqft * (1 - COMP_SQFT_TOLERANCE), sqft * (1 + COMP_SQFT_TOLERANCE)),
+    }
+
+
+def weigh_comps(subject, comps: list, today: Optional[date] = None) -> dict:
+    """
+    Weight each comp (listing rows with distanceMeters) by distance and
+    recency, and estimate the subject's rent from their weighted rent per
+    sqft. The estimate is None without comps or subject size.
+    """
+    today = today or date.today()
+    weighted = []
+    total_weight = weighted_rate = 0.0
+    for comp in comps:
+        distance_km = comp['distanceMeters'] / 1000
+        listed = comp['dateListed']
+        age_days = max((today - listed).days, 0) if listed else 0
+        weight = math.exp(-distance_km / COMP_DISTANCE_SCALE_KM) * 0.5 ** (age_days / COMP_RECENCY_HALF_LIFE_DAYS)
+        rate = unit_rent_per_sqft(comp['estimatedMonthlyRent'], comp['sqft'], comp['units'])
+        total_weight += weight
+        weighted_rate += weight * rate
+        weighted.append({**comp, 'rentPerSqft': round(rate, 4), 'weight': round(weight, 4)})
+
+    estimate = None
+    rate = weighted_rate / total_weight if total_weight > 0 else None
+    if rate is not None and subject['sqft']:
+        estimate = round(rate * subject['sqft'] * max(subject['units'] or 1, 1))
+    return {
+        'estimatedRent': estimate,
+        'rentPerSqft': None if rate is None else round(rate, 4),
+        'comps': weighted,
+    }
@@ -0,0 +1,131 @@
+# Conditional GET and response compression
+#
+# ETags come from the data version counter (cache.data_version) plus the
+# request itself, so a matching If-None-Match is answered with 304 before
+# any query runs. Bodies over MIN_COMPRESS_BYTES are compressed with brotli
+# (when the optional `brotli` package is installed) or gzip, whichever the
+# client's Accept-Encoding prefers. Each encoding is its own representation
+# and gets its own strong ETag ("<digest>-gzip").
+
+import gzip
+import hashlib
+import os
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from metrics import phase
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_BYTES = int(os.getenv("MIN_COMPRESS_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Clients may keep a copy but must revalidate it before every reuse
+REVALIDATE = "no-cache"
+
+
+def request_etag(request: Request, *version) -> str:
+    """Strong ETag for a GET whose body depends only on `version` and the URL"""
+    key = repr((version, request.url.path, sorted(request.query_params.multi_items())))
+    return f'"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+
+def matching_etag(request: Request, etag: str) -> Optional[str]:
+    """The If-None-Match entry that matches `etag` in any encoding, if one does"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    digest = etag.strip('"')
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return etag
+        tag = candidate.removeprefix("W/").strip('"')
+        if tag == digest or tag.rsplit("-", 1)[0] == digest:
+            return candidate
+    return None
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={
+        "ETag": etag, "Cache-Control": REVALIDATE, "Vary": "Accept-Encoding",
+    })
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported content coding the client accepts: br, then gzip"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def request_encoding(request: Request) -> Optional[str]:
+    """The content coding send() will use for this request's large bodies"""
+    return choose_encoding(request.headers.get("accept-encoding"))
+
+
+def compressed_variants(body: bytes, encoding: Optional[str]) -> Dict[str, bytes]:
+    """
+    A `compressed` dict for send() holding `body` in `encoding` (if it's
+    worth compressing), so the compression can run ahead of time, e.g. on a
+    worker thread.
+    """
+    if not encoding or len(body) < MIN_COMPRESS_BYTES:
+        return {}
+    with phase('compress'):
+        return {encoding: compress(body, encoding)}
+
+
+def send(request: Request, body: bytes, media_type: str, etag: Optional[str] = None,
+         headers: Optional[dict] = None, compressed: Optional[Dict[str, bytes]] = None) -> Response:
+    """
+    Build the response for an encoded body, compressing it when worthwhile.
+    `compressed` is an optional per-body dict of already compressed variants;
+    new variants are added to it so cached bodies are compressed only once.
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = None
+    if len(body) >= MIN_COMPRESS_BYTES:
+        encoding = request_encoding(request)
+    if encoding:
+        variant = compressed.get(encoding) if compressed is not None else None
+        if variant is None:
+            with phase('compress'):
+                variant = compress(body, encoding)
+            if compressed is not None:
+                compressed[encoding] = variant
+        body = variant
+        headers["Content-Encoding"] = encoding
+    if etag:
+        headers["ETag"] = f'{etag[:-1]}-{encoding}"' if encoding else etag
+        headers["Cache-Control"] = REVALIDATE
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,243 @@
+# Hex-binned heatmap aggregation
+#
+# Properties are binned into pointy-top hexagons laid out in lng/lat degrees.
+# The hex size halves with every zoom level, so one precomputed level per
+# zoom forms a pyramid. Each level keeps count / mean / p50 / max per metric
+# for every non-empty hex, and a request only ships the hexes in its bbox.
+
+import math
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+MIN_ZOOM = 3
+MAX_ZOOM = 15
+
+# Roughly how many hexes span one 256px map tile, i.e. ~32px hexes
+HEXES_PER_TILE = 8
+
+HEATMAP_METRICS = ('dealScore', 'capRate', 'monthlyCashFlow')
+
+# Axial (q, r) coordinates are packed into one int64 key
+_R_BITS = 22
+_R_OFFSET = 1 << (_R_BITS - 1)
+_R_MASK = (1 << _R_BITS) - 1
+
+_SQRT3 = math.sqrt(3)
+
+
+def hex_size(zoom: int) -> float:
+    """Hex circumradius in degrees for a zoom level"""
+    return 360.0 / (2 ** zoom) / HEXES_PER_TILE
+
+
+def zoom_for_bbox(east: float, west: float) -> int:
+    """Pick the pyramid level whose hexes suit a viewport of this width"""
+    width = max(east - west, 1e-6)
+    # A viewport is typically ~4 tiles wide
+    zoom = round(math.log2(360.0 * 4 / width))
+    return min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+
+
+def hex_keys(lat: np.ndarray, lng: np.ndarray, size: float) -> np.ndarray:
+    """Vectorized point -> hex key using cube-coordinate rounding"""
+    q = (_SQRT3 / 3 * lng - lat / 3) / size
+    r = (2 / 3 * lat) / size
+    s = -q - r
+
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+
+    return (rq.astype(np.int64) << _R_BITS) + (rr.astype(np.int64) + _R_OFFSET)
+
+
+def hex_centers(keys: np.ndarray, size: float):
+    """Hex key -> (lat, lng) of the hex center"""
+    q = (keys >> _R_BITS).astype(np.float64)
+    r = ((keys & _R_MASK) - _R_OFFSET).astype(np.float64)
+    lng = size * _SQRT3 * (q + r / 2)
+    lat = size * 1.5 * r
+    return lat, lng
+
+
+def aggregate_bins(keys: np.ndarray, values: np.ndarray):
+    """
+    Group values by hex key.
+    Returns (unique keys, counts, [mean, p50, max] arrays for values).
+    """
+    order = np.lexsort((values, keys))
+    sorted_keys = keys[order]
+    sorted_values = values[order]
+
+    unique, starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+    if len(unique) == 0:
+        empty = np.zeros(0)
+        return unique, counts, empty, empty, empty
+
+    mean = np.add.reduceat(sorted_values, starts) / counts
+    maximum = np.maximum.reduceat(sorted_values, starts)
+    # Values are sorted within each group, so the median is the middle element(s)
+    p50 = (sorted_values[starts + (counts - 1) // 2] + sorted_values[starts + counts // 2]) / 2
+
+    return unique, counts, mean, p50, maximum
+
+
+class HexLevel:
+    """Aggregates for every non-empty hex at one zoom level"""
+
+    def __init__(self, zoom: int, keys: np.ndarray, metrics: Dict[str, np.ndarray]):
+        self.zoom = zoom
+        self.size = hex_size(zoom)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.stats = {name: np.zeros((0, 3)) for name in HEATMAP_METRICS}
+        self._index: Dict[int, int] = {}
+        self._build(keys, metrics)
+
+    def _build(self, keys: np.ndarray, metrics: Dict[str, np.ndarray]):
+        for name in HEATMAP_METRICS:
+            unique, counts, mean, p50, maximum = aggregate_bins(keys, metrics[name])
+            self.stats[name] = np.column_stack([mean, p50, maximum])
+        self.keys = unique
+        self.counts = counts
+        self.lat, self.lng = hex_centers(unique, self.size)
+        self._index = {key: i for i, key in enumerate(unique.tolist())}
+
+    def refresh_bins(self, bin_keys: np.ndarray, keys: np.ndarray, metrics: Dict[str, np.ndarray]):
+        """Recompute the given hexes from all of their members (`keys` and `metrics` of every property)"""
+        members = np.isin(keys, bin_keys)
+        member_keys = keys[members]
+        stats = {}
+        for name in HEATMAP_METRICS:
+            unique, counts, mean, p50, maximum = aggregate_bins(member_keys, metrics[name][members])
+            stats[name] = np.column_stack([mean, p50, maximum])
+
+        added = np.array([key for key in unique.tolist() if key not in self._index], dtype=np.int64)
+        if len(added):
+            for key in added.tolist():
+                self._index[key] = len(self._index)
+            self.keys = np.concatenate([self.keys, added])
+            self.counts = np.concatenate([self.counts, np.zeros(len(added), dtype=np.int64)])
+            lat, lng = hex_centers(added, self.size)
+            self.lat = np.concatenate([self.lat, lat])
+            self.lng = np.concatenate([self.lng, lng])
+            for name in HEATMAP_METRICS:
+                self.stats[name] = np.vstack([self.stats[name], np.zeros((len(added), 3))])
+
+        rows = np.array([self._index[key] for key in unique.tolist()], dtype=np.int64)
+        self.counts[rows] = counts
+        for name in HEATMAP_METRICS:
+            self.stats[name][rows] = stats[name]
+        for key in set(bin_keys.tolist()) - set(unique.tolist()):
+            self.clear_bin(key)
+
+    def clear_bin(self, key: int):
+        """Mark a hex as empty after its last member moved out"""
+        i = self._index.get(key)
+        if i is not None:
+            self.counts[i] = 0
+
+    def mask(self, north: float, south: float, east: float, west: float) -> np.ndarray:
+        """Non-empty hexes whose centers fall in the bbox"""
+        # Pad by one hex so partially visible hexes on the edge are included
+        pad = self.size
+        return (self.counts > 0) & (
+            (self.lat >= south - pad) & (self.lat <= north + pad) &
+            (self.lng >= west - pad) & (self.lng <= east + pad)
+        )
+
+    def query(self, north: float, south: float, east: float, west: float, metric: str) -> List[dict]:
+        mask = self.mask(north, south, east, west)
+        stats = self.stats[metric][mask]
+        return [
+            {'lat': lat, 'lng': lng, 'count': count, 'mean': mean, 'p50': p50, 'max': maximum}
+            for lat, lng, count, (mean, p50, maximum) in zip(
+                np.round(self.lat[mask], 6).tolist(),
+                np.round(self.lng[mask], 6).tolist(),
+                self.counts[mask].tolist(),
+                np.round(stats, 4).tolist(),
+            )
+        ]
+
+
+class HexPyramid:
+    """
+    Per-zoom hex aggregates over a set of analyzed properties.
+    Built in one vectorized pass; changed properties are folded in afterwards
+    by recomputing only the hexes they leave or enter.
+    """
+
+    def __init__(self, ids, lat, lng, metrics: Dict[str, np.ndarray]):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.metrics = {name: np.asarray(metrics[name], dtype=np.float64) for name in HEATMAP_METRICS}
+        self.keys: Dict[int, np.ndarray] = {}
+        self.levels: Dict[int, HexLevel] = {}
+        for zoom in range(MIN_ZOOM, MAX_ZOOM + 1):
+            self.keys[zoom] = hex_keys(self.lat, self.lng, hex_size(zoom))
+            self.levels[zoom] = HexLevel(zoom, self.keys[zoom], self.metrics)
+        self.built_at = time.monotonic()
+
+    def apply(self, ids, lat, lng, metrics: Dict[str, np.ndarray], removed_ids=()):
+        """
+        Add or replace a batch of properties and drop removed ones,
+        recomputing only the hexes they leave or enter
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        replaced = np.isin(self.ids, np.concatenate([ids, np.asarray(removed_ids, dtype=np.int64)]))
+        kept = ~replaced
+
+        self.ids = np.concatenate([self.ids[kept], ids])
+        self.lat = np.concatenate([self.lat[kept], lat])
+        self.lng = np.concatenate([self.lng[kept], lng])
+        for name in HEATMAP_METRICS:
+            self.metrics[name] = np.concatenate([
+                self.metrics[name][kept], np.asarray(metrics[name], dtype=np.float64)
+            ])
+
+        for zoom, level in self.levels.items():
+            added = hex_keys(lat, lng, level.size)
+            touched = np.union1d(self.keys[zoom][replaced], added)
+            self.keys[zoom] = np.concatenate([self.keys[zoom][kept], added])
+            if len(touched):
+                level.refresh_bins(touched, self.keys[zoom], self.metrics)
+
+    def remove(self, ids):
+        """Drop properties (sold, delisted or deleted) from their hexes"""
+        empty = np.zeros(0)
+        self.apply([], empty, empty, {name: empty for name in HEATMAP_METRICS}, removed_ids=ids)
+
+    def query(self, north: float, south: float, east: float, west: float,
+              metric: str, zoom: Optional[int] = None) -> dict:
+        if zoom is None:
+            zoom = zoom_for_bbox(east, west)
+        zoom = min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+        level = self.levels[zoom]
+        return {
+            'metric': metric,
+            'zoom': zoom,
+            'hexSize': level.size,
+            'bins': level.query(north, south, east, west, metric),
+        }
+
+    def clusters(self, north: float, south: float, east: float, west: float, zoom: int) -> dict:
+        """Hexes in a bbox as column lists of count and deal metrics, for vector tiles"""
+        level = self.levels[min(max(zoom, MIN_ZOOM), MAX_ZOOM)]
+        mask = level.mask(north, south, east, west)
+        return {
+            'lat': level.lat[mask].tolist(),
+            'lng': level.lng[mask].tolist(),
+            'count': level.counts[mask].tolist(),
+            'deal_score': level.stats['dealScore'][mask, 0].tolist(),
+            'max_deal_score': level.stats['dealScore'][mask, 2].tolist(),
+            'cap_rate': level.stats['capRate'][mask, 0].tolist(),
+        }
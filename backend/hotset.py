@@ -0,0 +1,269 @@
+# In-memory index of the for-sale listings
+#
+# Holds the filterable fields of every for-sale property as NumPy columns,
+# a uniform lat/lng grid over them and each listing's pre-encoded JSON, so
+# bbox + filter pages can be answered without a database round-trip. Rows
+# changed after the last full build are appended to an unindexed tail (and
+# their old slot marked dead) until the tail grows enough to rebuild.
+#
+# Queries reproduce the SQL listing queries in database.py: the same filter
+# semantics, inclusive bbox, ORDER BY <key> DESC, id DESC with NULL dates
+# first, and (value, id) keyset cursors.
+
+import math
+import time
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Rebuild the grid once this share of slots is dead or unindexed
+REBUILD_FRACTION = 0.05
+
+# Cell key packing: lat and lng cell numbers are offset to be non-negative
+_CELL_OFFSET = 1 << 20
+_CELL_STRIDE = 1 << 21
+
+
+class HotSet:
+    """
+    Column store plus grid index of for-sale listings.
+    Rows are added in batches: listing rows (database.PROPERTY_COLUMNS
+    shape), their analyze_batch result under the default assumptions, the
+    encoded JSON body of each row and typed map columns for columnar output.
+    """
+
+    def __init__(self, cell_degrees: float = 0.05):
+        self.cell_degrees = cell_degrees
+        self._codes: Dict[str, Dict[str, int]] = {'status': {}, 'homeType': {}}
+        self._clear()
+        self.built_at = None
+        self.updated_at = None
+        self.refresh_seconds = 0.0
+
+    def _clear(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.lat = np.zeros(0)
+        self.lng = np.zeros(0)
+        self.price = np.zeros(0)
+        self.beds = np.zeros(0)
+        self.status = np.zeros(0, dtype=np.int32)
+        self.home_type = np.zeros(0, dtype=np.int32)
+        # Date ordinal; NULL is +inf so it sorts first under DESC, like Postgres
+        self.date_listed = np.zeros(0)
+        self.deal_score = np.zeros(0)
+        self.cap_rate = np.zeros(0)
+        self.alive = np.zeros(0, dtype=bool)
+        self.bodies: List[bytes] = []
+        self.columns: Dict[str, np.ndarray] = {}
+        self._slot: Dict[int, int] = {}
+        self._cell_keys = np.zeros(0, dtype=np.int64)
+        self._cell_slots = np.zeros(0, dtype=np.int64)
+        self._indexed = 0
+
+    # ----- building -----
+
+    def _code(self, field: str, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        codes = self._codes[field]
+        return codes.setdefault(value, len(codes))
+
+    def _batch_arrays(self, rows: list, analysis: Dict[str, np.ndarray]) -> dict:
+        def number(key):
+            return np.fromiter(
+                (float(v) if (v := row[key]) is not None else math.nan for row in rows),
+                dtype=np.float64, count=len(rows),
+            )
+
+        return {
+            'ids': np.fromiter((row['id'] for row in rows), dtype=np.int64, count=len(rows)),
+            'lat': number('latitude'),
+            'lng': number('longitude'),
+            'price': number('price'),
+            'beds': number('beds'),
+            'status': np.fromiter((self._code('status', row['status']) for row in rows),
+                                  dtype=np.int32, count=len(rows)),
+            'home_type': np.fromiter((self._code('homeType', row['homeType']) for row in rows),
+                                     dtype=np.int32, count=len(rows)),
+            'date_listed': np.fromiter(
+                (d.toordinal() if (d := row['dateListed']) is not None else math.inf for row in rows),
+                dtype=np.float64, count=len(rows),
+            ),
+            'deal_score': np.asarray(analysis['deal_score'], dtype=np.float64),
+            'cap_rate': np.asarray(analysis['cap_rate'], dtype=np.float64),
+        }
+
+    _FIELDS = ('ids', 'lat', 'lng', 'price', 'beds', 'status', 'home_type', 'date_listed',
+               'deal_score', 'cap_rate')
+
+    def load(self, batches: list):
+        """Replace everything with (rows, analysis, bodies, columns) batches"""
+        started = time.perf_counter()
+        self._clear()
+        for rows, analysis, bodies, columns in batches:
+            self._append(rows, analysis, bodies, columns)
+        self._rebuild_index()
+        self.built_at = self.updated_at = time.time()
+        self.refresh_seconds = time.perf_counter() - started
+
+    def _append(self, rows: list, analysis: Dict[str, np.ndarray], bodies: List[bytes],
+                columns: Dict[str, np.ndarray]):
+        if not rows:
+            return
+        first = len(self.ids)
+        arrays = self._batch_arrays(rows, analysis)
+        for field in self._FIELDS:
+            setattr(self, field, np.concatenate([getattr(self, field), arrays[field]]))
+        self.alive = np.concatenate([self.alive, np.ones(len(rows), dtype=bool)])
+        self.bodies.extend(bodies)
+        for name, values in columns.items():
+            existing = self.columns.get(name, np.zeros(0, dtype=values.dtype))
+            self.columns[name] = np.concatenate([existing, values])
+        for offset, property_id in enumerate(arrays['ids'].tolist()):
+            old = self._slot.get(property_id)
+            if old is not None:
+                self.alive[old] = False
+            self._slot[property_id] = first + offset
+
+    def apply(self, rows: list, analysis: Dict[str, np.ndarray], bodies: List[bytes],
+              columns: Dict[str, np.ndarray], removed_ids: List[int]):
+        """Upsert changed listings and drop ones that left the for-sale set"""
+        started = time.perf_counter()
+        for property_id in removed_ids:
+            slot = self._slot.pop(property_id, None)
+            if slot is not None:
+                self.alive[slot] = False
+        self._append(rows, analysis, bodies, columns)
+        stale = (len(self.ids) - self._indexed) + int((~self.alive[:self._indexed]).sum())
+        if stale > REBUILD_FRACTION * max(len(self._slot), 1):
+            self._compact()
+        self.updated_at = time.time()
+        self.refresh_seconds = time.perf_counter() - started
+
+    def _compact(self):
+        """Drop dead slots and rebuild the grid over every live row"""
+        keep = np.flatnonzero(self.alive)
+        for field in self._FIELDS:
+            setattr(self, field, getattr(self, field)[keep])
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.bodies = [self.bodies[i] for i in keep.tolist()]
+        self.columns = {name: values[keep] for name, values in self.columns.items()}
+        self._slot = {property_id: slot for slot, property_id in enumerate(self.ids.tolist())}
+        self._rebuild_index()
+
+    def _cells(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        rows = np.floor(lat / self.cell_degrees).astype(np.int64) + _CELL_OFFSET
+        cols = np.floor(lng / self.cell_degrees).astype(np.int64) + _CELL_OFFSET
+        return rows * _CELL_STRIDE + cols
+
+    def _rebuild_index(self):
+        keys = self._cells(self.lat, self.lng)
+        order = np.argsort(keys, kind='stable')
+        self._cell_keys = keys[order]
+        self._cell_slots = order
+        self._indexed = len(self.ids)
+
+    # ----- querying -----
+
+    def _bbox_slots(self, north: float, south: float, east: float, west: float) -> np.ndarray:
+        """Slots of every row in the grid cells the bbox touches, plus the unindexed tail"""
+        row_lo, row_hi = (int(math.floor(v / self.cell_degrees)) + _CELL_OFFSET for v in (south, north))
+        col_lo, col_hi = (int(math.floor(v / self.cell_degrees)) + _CELL_OFFSET for v in (west, east))
+        row_keys = np.arange(row_lo, row_hi + 1, dtype=np.int64) * _CELL_STRIDE
+        starts = np.searchsorted(self._cell_keys, row_keys + col_lo, side='left')
+        ends = np.searchsorted(self._cell_keys, row_keys + col_hi, side='right')
+        parts = [self._cell_slots[start:end] for start, end in zip(starts.tolist(), ends.tolist()) if end > start]
+        parts.append(np.arange(self._indexed, len(self.ids)))
+        return np.concatenate(parts)
+
+    def _sort_values(self, sort: str) -> np.ndarray:
+        return {'price': self.price, 'date_listed': self.date_listed, 'deal_score': self.deal_score}[sort]
+
+    def query(self, bbox: Optional[tuple], filters: Optional[dict], sort: str,
+              after: Optional[tuple], limit: int) -> np.ndarray:
+        """
+        Slots of up to `limit` matching rows in listing order.
+        `bbox` is (north, south, east, west) or None for the whole set;
+        `after` is the (sort value, id) keyset from a cursor.
+        """
+        if bbox is not None:
+            north, south, east, west = bbox
+            slots = self._bbox_slots(north, south, east, west)
+            lat, lng = self.lat[slots], self.lng[slots]
+            mask = self.alive[slots] & (lat >= south) & (lat <= north) & (lng >= west) & (lng <= east)
+        else:
+            slots = np.arange(len(self.ids))
+            mask = self.alive.copy()
+
+        if filters:
+            mask &= self._filter_mask(slots, filters)
+
+        values = self._sort_values(sort)[slots]
+        ids = self.ids[slots]
+        if sort == 'deal_score':
+            mask &= ~np.isnan(values)
+        if after is not None:
+            last_value, last_id = after
+            if sort == 'date_listed':
+                last_value = last_value.toordinal() if last_value is not None else math.inf
+            last_value = float(last_value)
+            mask &= (values < last_value) | ((values == last_value) & (ids < last_id))
+
+        slots, values, ids = slots[mask], values[mask], ids[mask]
+        if len(slots) > limit:
+            # Keep the top `limit` values (plus ties) before the exact sort
+            threshold = np.partition(-values, limit - 1)[limit - 1]
+            keep = -values <= threshold
+            slots, values, ids = slots[keep], values[keep], ids[keep]
+        order = np.lexsort((-ids, -values))[:limit]
+        return slots[order]
+
+    def _filter_mask(self, slots: np.ndarray, filters: dict) -> np.ndarray:
+        """Same semantics as database._filter_conditions"""
+        mask = np.ones(len(slots), dtype=bool)
+        for key, field, column in (('status', 'status', self.status), ('home_type', 'homeType', self.home_type)):
+            value = filters.get(key)
+            if value and value != 'All':
+                mask &= column[slots] == self._codes[field].get(value, -2)
+        if filters.get('min_price'):
+            mask &= self.price[slots] >= filters['min_price']
+        if filters.get('max_price'):
+            mask &= self.price[slots] <= filters['max_price']
+        if filters.get('min_beds'):
+            mask &= self.beds[slots] >= filters['min_beds']
+        if filters.get('min_deal_score') is not None:
+            mask &= self.deal_score[slots] >= filters['min_deal_score']
+        if filters.get('min_cap_rate') is not None:
+            mask &= self.cap_rate[slots] >= filters['min_cap_rate']
+        return mask
+
+    def cursor_row(self, slot: int) -> dict:
+        """The keyset fields of a row, keyed like a listing row"""
+        listed = self.date_listed[slot]
+        return {
+            'id': int(self.ids[slot]),
+            'price': float(self.price[slot]),
+            'dateListed': date.fromordinal(int(listed)) if math.isfinite(listed) else None,
+            'deal_score': int(self.deal_score[slot]),
+        }
+
+    def json_body(self, slots: np.ndarray) -> bytes:
+        """JSON array of the pre-encoded rows"""
+        return b'[' + b','.join([self.bodies[slot] for slot in slots.tolist()]) + b']'
+
+    def stats(self) -> dict:
+        arrays = [getattr(self, field) for field in self._FIELDS] + [self.alive, self._cell_keys, self._cell_slots]
+        array_bytes = sum(a.nbytes for a in arrays) + sum(a.nbytes for a in self.columns.values())
+        body_bytes = sum(len(body) for body in self.bodies)
+        return {
+            'rows': len(self._slot),
+            'slots': len(self.ids),
+            'unindexed': len(self.ids) - self._indexed,
+            'memory_bytes': array_bytes + body_bytes,
+            'array_bytes': array_bytes,
+            'body_bytes': body_bytes,
+            'built_at': self.built_at,
+            'updated_at': self.updated_at,
+            'last_refresh_seconds': self.refresh_seconds,
+        }
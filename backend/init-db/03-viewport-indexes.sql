@@ -0,0 +1,34 @@
+-- Viewport query indexes
+-- Runs automatically on first database start. For an existing database apply
+-- it by hand; every statement is idempotent:
+--   psql "$DATABASE_URL" -f backend/init-db/03-viewport-indexes.sql
+
+-- btree_gist lets scalar columns live in the same GIST index as the geometry,
+-- so bbox + attribute filters are answered by a single index scan
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- Rows loaded before the location trigger existed have no geometry
+UPDATE properties
+SET location = ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)
+WHERE location IS NULL;
+
+-- Composite spatial index for fetch_properties_in_bbox:
+-- location && envelope plus the status / home_type / price / bed filters
+CREATE INDEX IF NOT EXISTS idx_properties_location_filters
+    ON properties USING GIST (location, status, home_type, price, bed);
+
+-- Partial spatial index over the active listings (fetch_all_properties and
+-- most map traffic only look at for-sale rows)
+CREATE INDEX IF NOT EXISTS idx_properties_location_for_sale
+    ON properties USING GIST (location)
+    WHERE for_sale = true;
+
+-- Sort index for the for-sale initial load
+CREATE INDEX IF NOT EXISTS idx_properties_for_sale_date_listed
+    ON properties (date_listed DESC)
+    WHERE for_sale = true;
+
+ANALYZE properties;
+
+-- tests/test_viewport_index.py checks that the query build_bbox_query emits
+-- is planned as a scan of one of these indexes
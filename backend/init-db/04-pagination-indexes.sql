@@ -0,0 +1,18 @@
+-- Keyset pagination indexes for /api/properties
+-- Runs automatically on first database start. For an existing database apply
+-- it by hand; every statement is idempotent:
+--   psql "$DATABASE_URL" -f backend/init-db/04-pagination-indexes.sql
+
+-- Bounding box pages are ordered by (price DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_properties_price_id
+    ON properties (price DESC, id DESC);
+
+-- Initial-load pages walk the for-sale set by (date_listed DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_properties_for_sale_listed_id
+    ON properties (date_listed DESC, id DESC)
+    WHERE for_sale = true;
+
+-- Superseded by idx_properties_for_sale_listed_id
+DROP INDEX IF EXISTS idx_properties_for_sale_date_listed;
+
+ANALYZE properties;
@@ -0,0 +1,77 @@
+-- Bulk ingest support for POST /api/properties/bulk
+-- Runs automatically on first database start. For an existing database apply
+-- it by hand; every statement is idempotent:
+--   psql "$DATABASE_URL" -f backend/init-db/05-bulk-ingest.sql
+
+-- Bulk loads upsert on (address, zip) with INSERT ... ON CONFLICT, which
+-- needs a unique index; concurrent loads of the same rows then update rather
+-- than both inserting. It also applies to POST /api/properties, which
+-- answers 409 for an address and zip that already exist.
+--
+-- Loads that raced before the index existed may have left duplicates. They
+-- are listed and the file stops rather than deleting anything: merge or
+-- delete them (saved search matches cascade with a deleted listing), then
+-- re-run it.
+DO $$
+DECLARE
+    duplicates text;
+BEGIN
+    SELECT string_agg(format('%s, %s: ids %s', address, zip, ids), E'\n')
+    INTO duplicates
+    FROM (
+        SELECT address, zip, array_agg(id ORDER BY id) AS ids
+        FROM properties
+        WHERE address IS NOT NULL AND zip IS NOT NULL
+        GROUP BY address, zip
+        HAVING count(*) > 1
+        ORDER BY address, zip
+    ) d;
+    IF duplicates IS NOT NULL THEN
+        RAISE EXCEPTION 'properties has duplicate (address, zip) rows; resolve them and re-run 05-bulk-ingest.sql'
+            USING DETAIL = duplicates;
+    END IF;
+END $$;
+
+DROP INDEX IF EXISTS idx_properties_address_zip;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_properties_address_zip_key ON properties (address, zip);
+
+-- The bulk merge computes location, price per sqft and days on market in the
+-- same set-based statement, so the per-row triggers step aside while the
+-- transaction-local dealfinder.bulk_load setting is on.
+CREATE OR REPLACE FUNCTION update_location_geometry()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('dealfinder.bulk_load', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+    NEW.location := ST_SetSRID(ST_MakePoint(NEW.longitude, NEW.latitude), 4326);
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_price_per_sqft()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('dealfinder.bulk_load', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+    IF NEW.square_foot > 0 THEN
+        NEW.price_per_square_foot := NEW.price / NEW.square_foot;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_days_on_market()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('dealfinder.bulk_load', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+    IF NEW.date_listed IS NOT NULL THEN
+        NEW.days_on_market := CURRENT_DATE - NEW.date_listed;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,44 @@
+-- Stored deal analysis under the default assumptions
+-- Runs automatically on first database start. For an existing database apply
+-- it by hand; every statement is idempotent:
+--   psql "$DATABASE_URL" -f backend/init-db/06-analysis-columns.sql
+--
+-- The API computes these columns with the same engine that serves
+-- /api/analyze and writes them back. analysis_version identifies the default
+-- assumptions they were computed under; NULL means the row needs
+-- (re)computing, which the API picks up on startup and after every write.
+
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS deal_score SMALLINT;
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS cap_rate DOUBLE PRECISION;
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS cash_on_cash DOUBLE PRECISION;
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS monthly_cash_flow DOUBLE PRECISION;
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS analysis_version VARCHAR(40);
+
+-- Filtering and sorting by the stored metrics
+CREATE INDEX IF NOT EXISTS idx_properties_deal_score_id ON properties (deal_score DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_properties_cap_rate ON properties (cap_rate);
+
+-- Finds rows waiting for analysis without scanning the table
+CREATE INDEX IF NOT EXISTS idx_properties_analysis_stale
+    ON properties (id)
+    WHERE analysis_version IS NULL;
+
+-- Mark the stored analysis stale whenever one of its inputs changes. Bulk
+-- loads clear analysis_version in their own set-based UPDATE.
+CREATE OR REPLACE FUNCTION mark_analysis_stale()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('dealfinder.bulk_load', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+    NEW.analysis_version := NULL;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_mark_analysis_stale ON properties;
+CREATE TRIGGER trigger_mark_analysis_stale
+BEFORE UPDATE OF price, estimated_taxes, hoa, estimated_monthly_rent,
+    square_foot, bed, bath, year_built, number_of_units ON properties
+FOR EACH ROW
+EXECUTE FUNCTION mark_analysis_stale();
@@ -0,0 +1,28 @@
+-- Change notifications for the in-memory listing index
+-- Runs automatically on first database start. For an existing database apply
+-- it by hand; every statement is idempotent:
+--   psql "$DATABASE_URL" -f backend/init-db/07-change-notify.sql
+--
+-- Every committed insert, update or delete on properties sends
+-- {"op": ..., "id": ...} on the property_changes channel. Bulk loads skip the
+-- per-row notices and send a single {"op": "bulk"} instead.
+
+CREATE OR REPLACE FUNCTION notify_property_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('dealfinder.bulk_load', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM pg_notify('property_changes', json_build_object(
+        'op', lower(TG_OP),
+        'id', CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_notify_property_change ON properties;
+CREATE TRIGGER trigger_notify_property_change
+AFTER INSERT OR UPDATE OR DELETE ON properties
+FOR EACH ROW
+EXECUTE FUNCTION notify_property_change();
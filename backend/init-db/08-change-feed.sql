@@ -0,0 +1,59 @@
+-- Change payloads for the live /api/stream feed
+-- Runs automatically on first database start. For an existing database apply
+-- it by hand (after 07-change-notify.sql); every statement is idempotent:
+--   psql "$DATABASE_URL" -f backend/init-db/08-change-feed.sql
+--
+-- Replaces the 07 notify function. Updates and deletes also carry the old
+-- values of the fields subscriptions filter on, so the API can tell a client
+-- to drop a listing that moved out of its viewport or filters:
+--   {"op": "update", "id": 1, "old": {"latitude": ..., "price": ..., ...}}
+-- Updates that only touch the stored analysis send {"op": "analysis"}, once
+-- per transaction however many rows it recomputes (identical notices are
+-- folded): the API computes listings' analysis itself, but pages filtered
+-- or sorted by the stored metrics may have changed. A recompute that moves
+-- a listing's deal_score or cap_rate (new rent rates, say) is a full update,
+-- so subscriptions filtering on them see it qualify or drop out.
+
+CREATE OR REPLACE FUNCTION notify_property_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    derived CONSTANT text[] := ARRAY[
+        'deal_score', 'cap_rate', 'cash_on_cash', 'monthly_cash_flow',
+        'analysis_version', 'updated_at'
+    ];
+BEGIN
+    IF current_setting('dealfinder.bulk_load', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE' AND (to_jsonb(NEW) - derived) = (to_jsonb(OLD) - derived)
+            AND NEW.deal_score IS NOT DISTINCT FROM OLD.deal_score
+            AND NEW.cap_rate IS NOT DISTINCT FROM OLD.cap_rate THEN
+        IF (to_jsonb(NEW) - 'updated_at') <> (to_jsonb(OLD) - 'updated_at') THEN
+            PERFORM pg_notify('property_changes', '{"op": "analysis"}');
+        END IF;
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('property_changes', json_build_object(
+            'op', 'insert', 'id', NEW.id
+        )::text);
+    ELSE
+        PERFORM pg_notify('property_changes', json_build_object(
+            'op', lower(TG_OP),
+            'id', OLD.id,
+            'old', json_build_object(
+                'latitude', OLD.latitude,
+                'longitude', OLD.longitude,
+                'forSale', OLD.for_sale,
+                'status', OLD.status,
+                'homeType', OLD.home_type,
+                'price', OLD.price,
+                'beds', OLD.bed,
+                'deal_score', OLD.deal_score,
+                'cap_rate', OLD.cap_rate
+            )
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
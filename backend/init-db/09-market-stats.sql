@@ -0,0 +1,181 @@
+-- Incrementally maintained market statistics for /api/stats
+-- Runs automatically on first database start. For an existing database apply
+-- it by hand; every statement is idempotent (re-running rebuilds the table):
+--   psql "$DATABASE_URL" -f backend/init-db/09-market-stats.sql
+--
+-- market_stats holds one row per (state, city, zip, home_type, for_sale)
+-- group with listing counts, sums for averages and quantile sketches of
+-- price, price per sqft, rent and stored deal score. Statement-level
+-- triggers fold each write's transition tables into it set-based, so bulk
+-- loads cost one merge per statement rather than one per row.
+--
+-- A sketch is a JSON object {bucket: count} over logarithmic buckets
+-- (sketch.py reads them): bucket 0 holds values below 1, bucket i >= 1
+-- holds [1.02^(i-1), 1.02^i), giving quantiles within about 1%. Counts can
+-- be added and subtracted, so sketches merge across groups and support
+-- updates and deletes.
+
+CREATE TABLE IF NOT EXISTS market_stats (
+    state VARCHAR(2) NOT NULL,
+    city VARCHAR(100) NOT NULL,
+    zip VARCHAR(10) NOT NULL,
+    home_type VARCHAR(50) NOT NULL,
+    for_sale BOOLEAN NOT NULL,
+    listings INTEGER NOT NULL DEFAULT 0,
+    price_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    price_per_sqft_count INTEGER NOT NULL DEFAULT 0,
+    price_per_sqft_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    price_sketch JSONB NOT NULL DEFAULT '{}',
+    price_per_sqft_sketch JSONB NOT NULL DEFAULT '{}',
+    rent_sketch JSONB NOT NULL DEFAULT '{}',
+    deal_score_sketch JSONB NOT NULL DEFAULT '{}',
+    PRIMARY KEY (state, city, zip, home_type, for_sale)
+);
+
+CREATE OR REPLACE FUNCTION market_stats_bucket(value DOUBLE PRECISION)
+RETURNS INTEGER AS $$
+    SELECT CASE
+        WHEN value IS NULL THEN NULL
+        WHEN value < 1 THEN 0
+        ELSE floor(ln(value) / ln(1.02))::int + 1
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Add two sketches bucket by bucket, dropping buckets that reach zero
+CREATE OR REPLACE FUNCTION sketch_merge(a JSONB, b JSONB)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_object_agg(bucket, total), '{}'::jsonb)
+    FROM (
+        SELECT bucket, SUM(n::int) AS total
+        FROM (
+            SELECT * FROM jsonb_each_text(a)
+            UNION ALL
+            SELECT * FROM jsonb_each_text(b)
+        ) AS e(bucket, n)
+        GROUP BY bucket
+        HAVING SUM(n::int) <> 0
+    ) AS s
+$$ LANGUAGE sql IMMUTABLE;
+
+-- The merge statement for a source of (sign, properties.*) rows: +1 rows
+-- are added to their group, -1 rows removed
+CREATE OR REPLACE FUNCTION market_stats_merge_sql(source TEXT)
+RETURNS TEXT AS $$
+    SELECT format($sql$
+        WITH d AS (
+            SELECT
+                sign, state, city, zip, home_type,
+                COALESCE(for_sale, false) AS for_sale,
+                price::float8 AS price,
+                price_per_square_foot::float8 AS price_per_sqft,
+                estimated_monthly_rent::float8 AS rent,
+                deal_score::float8 AS deal_score
+            FROM (%s) AS source
+        ),
+        totals AS (
+            SELECT
+                state, city, zip, home_type, for_sale,
+                SUM(sign) AS listings,
+                SUM(sign * price) AS price_sum,
+                COALESCE(SUM(sign) FILTER (WHERE price_per_sqft IS NOT NULL), 0) AS price_per_sqft_count,
+                COALESCE(SUM(sign * price_per_sqft), 0) AS price_per_sqft_sum
+            FROM d
+            GROUP BY state, city, zip, home_type, for_sale
+        ),
+        buckets AS (
+            SELECT state, city, zip, home_type, for_sale, metric, bucket, SUM(sign) AS n
+            FROM d
+            CROSS JOIN LATERAL (VALUES
+                ('price', market_stats_bucket(price)),
+                ('price_per_sqft', market_stats_bucket(price_per_sqft)),
+                ('rent', market_stats_bucket(rent)),
+                ('deal_score', market_stats_bucket(deal_score))
+            ) AS m(metric, bucket)
+            WHERE bucket IS NOT NULL
+            GROUP BY state, city, zip, home_type, for_sale, metric, bucket
+            HAVING SUM(sign) <> 0
+        ),
+        sketches AS (
+            SELECT
+                state, city, zip, home_type, for_sale,
+                jsonb_object_agg(bucket, n) FILTER (WHERE metric = 'price') AS price_sketch,
+                jsonb_object_agg(bucket, n) FILTER (WHERE metric = 'price_per_sqft') AS price_per_sqft_sketch,
+                jsonb_object_agg(bucket, n) FILTER (WHERE metric = 'rent') AS rent_sketch,
+                jsonb_object_agg(bucket, n) FILTER (WHERE metric = 'deal_score') AS deal_score_sketch
+            FROM buckets
+            GROUP BY state, city, zip, home_type, for_sale
+        )
+        INSERT INTO market_stats AS m (
+            state, city, zip, home_type, for_sale,
+            listings, price_sum, price_per_sqft_count, price_per_sqft_sum,
+            price_sketch, price_per_sqft_sketch, rent_sketch, deal_score_sketch
+        )
+        SELECT
+            t.state, t.city, t.zip, t.home_type, t.for_sale,
+            t.listings, t.price_sum, t.price_per_sqft_count, t.price_per_sqft_sum,
+            COALESCE(s.price_sketch, '{}'), COALESCE(s.price_per_sqft_sketch, '{}'),
+            COALESCE(s.rent_sketch, '{}'), COALESCE(s.deal_score_sketch, '{}')
+        FROM totals t
+        LEFT JOIN sketches s USING (state, city, zip, home_type, for_sale)
+        -- Updates that change none of the tracked fields net out to nothing
+        WHERE t.listings <> 0 OR t.price_sum <> 0 OR t.price_per_sqft_sum <> 0
+            OR t.price_per_sqft_count <> 0 OR s.state IS NOT NULL
+        -- A fixed lock order keeps concurrent writers from deadlocking
+        ORDER BY t.state, t.city, t.zip, t.home_type, t.for_sale
+        ON CONFLICT (state, city, zip, home_type, for_sale) DO UPDATE SET
+            listings = m.listings + EXCLUDED.listings,
+            price_sum = m.price_sum + EXCLUDED.price_sum,
+            price_per_sqft_count = m.price_per_sqft_count + EXCLUDED.price_per_sqft_count,
+            price_per_sqft_sum = m.price_per_sqft_sum + EXCLUDED.price_per_sqft_sum,
+            price_sketch = sketch_merge(m.price_sketch, EXCLUDED.price_sketch),
+            price_per_sqft_sketch = sketch_merge(m.price_per_sqft_sketch, EXCLUDED.price_per_sqft_sketch),
+            rent_sketch = sketch_merge(m.rent_sketch, EXCLUDED.rent_sketch),
+            deal_score_sketch = sketch_merge(m.deal_score_sketch, EXCLUDED.deal_score_sketch)
+    $sql$, source)
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Transition tables are statement-wide, so this runs once per statement,
+-- including the set-based bulk merge (it ignores dealfinder.bulk_load)
+CREATE OR REPLACE FUNCTION market_stats_apply()
+RETURNS TRIGGER AS $$
+BEGIN
+    EXECUTE market_stats_merge_sql(CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT 1 AS sign, * FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT -1 AS sign, * FROM old_rows'
+        ELSE 'SELECT 1 AS sign, * FROM new_rows UNION ALL SELECT -1, * FROM old_rows'
+    END);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_market_stats_insert ON properties;
+CREATE TRIGGER trigger_market_stats_insert
+AFTER INSERT ON properties
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION market_stats_apply();
+
+DROP TRIGGER IF EXISTS trigger_market_stats_update ON properties;
+CREATE TRIGGER trigger_market_stats_update
+AFTER UPDATE ON properties
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION market_stats_apply();
+
+DROP TRIGGER IF EXISTS trigger_market_stats_delete ON properties;
+CREATE TRIGGER trigger_market_stats_delete
+AFTER DELETE ON properties
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION market_stats_apply();
+
+-- Full recount, e.g. after restoring properties with triggers disabled
+CREATE OR REPLACE FUNCTION rebuild_market_stats()
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM market_stats;
+    EXECUTE market_stats_merge_sql('SELECT 1 AS sign, * FROM properties');
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_market_stats();
@@ -0,0 +1,6 @@
+#!/bin/bash
+# Accept streaming replication connections, for the optional db-replica
+# service in docker-compose.yml. They authenticate like any other remote
+# connection; wal_level and max_wal_senders already default to replica/10.
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
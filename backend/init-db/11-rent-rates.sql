@@ -0,0 +1,63 @@
+-- Local rent rates for the rent estimate and comparable properties
+-- Runs automatically on first database start. For an existing database apply
+-- it by hand; every statement is idempotent:
+--   psql "$DATABASE_URL" -f backend/init-db/11-rent-rates.sql
+--
+-- rent_rates holds the median monthly rent per square foot (per unit) of
+-- listings with a known rent, by zip and by 0.05 degree grid cell
+-- (comps.RENT_CELL_DEGREES), each over all home types ('*') and per home
+-- type. The API loads it into memory (comps.RentTable) to estimate rents
+-- for whole pages at once, and refreshes it every RENT_TABLE_REFRESH_SECONDS.
+-- After refreshing it by hand, run NOTIFY rent_rates so the API reloads it
+-- and recomputes the stored analysis if the rates changed.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS rent_rates AS
+WITH observed AS (
+    SELECT
+        COALESCE(zip, '') AS zip,
+        floor(latitude::float8 / 0.05)::int || ':' || floor(longitude::float8 / 0.05)::int AS cell,
+        home_type,
+        estimated_monthly_rent::float8 / (square_foot * GREATEST(COALESCE(number_of_units, 1), 1))
+            AS rent_per_sqft
+    FROM properties
+    WHERE estimated_monthly_rent > 0
+      AND square_foot > 0
+      AND latitude IS NOT NULL
+      AND longitude IS NOT NULL
+)
+SELECT
+    'zip'::text AS level,
+    zip AS area,
+    CASE WHEN GROUPING(home_type) = 1 THEN '*' ELSE COALESCE(home_type, '') END AS home_type,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY rent_per_sqft) AS rent_per_sqft,
+    COUNT(*) AS samples
+FROM observed
+GROUP BY GROUPING SETS ((zip), (zip, home_type))
+UNION ALL
+SELECT
+    'cell'::text,
+    cell,
+    CASE WHEN GROUPING(home_type) = 1 THEN '*' ELSE COALESCE(home_type, '') END,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY rent_per_sqft),
+    COUNT(*)
+FROM observed
+GROUP BY GROUPING SETS ((cell), (cell, home_type));
+
+-- Required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rent_rates_key ON rent_rates (level, area, home_type);
+
+-- Nearest-neighbour (<->) scans for comparable properties only visit
+-- listings that have a rent
+CREATE INDEX IF NOT EXISTS idx_properties_rent_comps
+    ON properties USING GIST (location)
+    WHERE estimated_monthly_rent > 0 AND square_foot > 0;
+
+-- The stored analysis (06-analysis-columns.sql) now also depends on where a
+-- listing is and what it is, through its local rent rate, so changing
+-- those columns marks it stale too
+CREATE OR REPLACE TRIGGER trigger_mark_analysis_stale
+BEFORE UPDATE OF price, estimated_taxes, hoa, estimated_monthly_rent,
+    square_foot, bed, bath, year_built, number_of_units,
+    latitude, longitude, zip, home_type ON properties
+FOR EACH ROW
+EXECUTE FUNCTION mark_analysis_stale();
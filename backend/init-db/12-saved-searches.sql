@@ -0,0 +1,42 @@
+-- Saved searches and the listings that matched them
+-- Runs automatically on first database start. For an existing database apply
+-- it by hand; every statement is idempotent:
+--   psql "$DATABASE_URL" -f backend/init-db/12-saved-searches.sql
+--
+-- A saved search is an optional bbox plus the listing filters of the map's
+-- filter panel. The API holds all of them in an in-memory index
+-- (savedsearch.py), matches every created or bulk-loaded listing against
+-- it, and records each new match in saved_search_matches once.
+
+CREATE TABLE IF NOT EXISTS saved_searches (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    -- Free-form client identifier (e.g. an email) to list a user's searches by
+    owner VARCHAR(200),
+    north DOUBLE PRECISION,
+    south DOUBLE PRECISION,
+    east DOUBLE PRECISION,
+    west DOUBLE PRECISION,
+    status VARCHAR(50),
+    home_type VARCHAR(50),
+    min_price DOUBLE PRECISION,
+    max_price DOUBLE PRECISION,
+    min_beds INTEGER,
+    min_deal_score INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_saved_searches_owner ON saved_searches (owner);
+
+CREATE TABLE IF NOT EXISTS saved_search_matches (
+    id BIGSERIAL,
+    search_id INTEGER NOT NULL REFERENCES saved_searches (id) ON DELETE CASCADE,
+    property_id INTEGER NOT NULL REFERENCES properties (id) ON DELETE CASCADE,
+    matched_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (search_id, property_id)
+);
+
+-- Newest matches of a search first, keyset-paginated on id
+CREATE INDEX IF NOT EXISTS idx_saved_search_matches_recent ON saved_search_matches (search_id, id DESC);
+-- Deleting a property cascades here
+CREATE INDEX IF NOT EXISTS idx_saved_search_matches_property ON saved_search_matches (property_id);
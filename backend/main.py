@@ -1,19 +1,57 @@
 # Deal Finder API
 # FastAPI backend for real estate investment analysis
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Response, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, List, Dict
 from datetime import date
+from decimal import Decimal
 from contextlib import asynccontextmanager
+import asyncio
+import base64
+import csv
+import hashlib
+import heapq
+import json
 import math
 import os
+import time
+
+import asyncpg
+import msgpack
+import numpy as np
+import orjson
 
 from database import (
     init_db, close_db, 
     fetch_properties_in_bbox, fetch_property_by_id, 
-    fetch_all_properties, insert_property, get_property_stats
+    fetch_all_properties, insert_property, get_property_stats, fetch_market_stats,
+    build_bbox_query, build_all_query, stream_properties, SORT_COLUMNS,
+    fetch_analysis_columns, fetch_tile_analysis_columns,
+    render_property_tile, render_cluster_tile,
+    bulk_upsert_properties, BULK_COLUMNS,
+    invalidate_stored_analysis, fetch_unanalyzed_rows, store_analysis,
+    fetch_deal_candidates, build_for_sale_query, fetch_for_sale_rows, start_change_listener, RENT_RATES_CHANNEL,
+    fetch_listing_rows, PoolBusyError, fetch_comps, fetch_rent_rates, refresh_rent_rates,
+    fetch_saved_searches, fetch_saved_search, insert_saved_search, delete_saved_search,
+    store_search_matches, fetch_search_matches,
+)
+import database
+import comps
+from changefeed import ChangeFeed, READY_EVENT, HEARTBEAT
+from cache import property_cache, tile_cache, analysis_cache, data_version, snap_bbox
+from conditional import request_etag, matching_etag, not_modified, send, request_encoding, compressed_variants
+from heatmap import HexPyramid
+from metrics import CallbackMetric, TimingMiddleware, loop_lag, monitor_event_loop, phase, render as render_metrics
+import offload
+from hotset import HotSet
+from savedsearch import SearchIndex
+import sketch
+from projection import (
+    mortgage_payment_factor, amortization_schedule, project, flat_paths, random_paths,
+    summarize, nan_to_none, YEARLY_METRICS,
 )
 
 
@@ -21,22 +59,59 @@ from database import (
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     # Startup
+    run_in_background(monitor_event_loop(LOOP_LAG_INTERVAL_SECONDS))
     try:
         await init_db()
         print("✅ API connected to database")
+        await start_change_listener(on_data_change)
+        await start_change_listener(on_rent_rates_refresh, RENT_RATES_CHANNEL)
+        await start_change_listener(on_heatmap_change)
+        run_in_background(run_heatmap_changes())
+        # Stored analysis is versioned by the rent table, so load it first
+        await load_rent_table()
+        run_in_background(sync_stored_analysis())
+        run_in_background(run_rent_table())
+        run_in_background(run_saved_searches())
+        if HOT_SET_ENABLED:
+            run_in_background(run_hot_set())
     except Exception as e:
         print(f"⚠️ Database connection failed: {e}")
         print("   Running in mock data mode")
     yield
     # Shutdown
     await close_db()
+    offload.shutdown()
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dump_json(content) -> bytes:
+    """orjson encoding shared by responses and NDJSON streams"""
+    return orjson.dumps(content, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response encoded with orjson. Dates, numpy values and asyncpg rows'
+    native types are written directly; Decimal falls back to float.
+    Returning one from an endpoint also skips FastAPI's jsonable_encoder.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dump_json(content)
 
 
 app = FastAPI(
     title="Deal Finder API",
     description="Real estate investment analysis and property data API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # CORS middleware for React frontend.
@@ -55,8 +130,25 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "Retry-After"],
 )
 
+# Per-request phase timings as a Server-Timing header (see metrics.py)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1").lower() in ("1", "true", "yes")
+app.add_middleware(TimingMiddleware, server_timing=SERVER_TIMING)
+# How often the event loop's responsiveness is sampled (metrics.monitor_event_loop)
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.25"))
+
+
+@app.exception_handler(PoolBusyError)
+async def pool_busy_handler(request: Request, exc: PoolBusyError):
+    """Shed load with a quick 503 instead of queueing on an exhausted pool"""
+    print(f"⚠️ Shedding {request.method} {request.url.path}: {exc}")
+    return FastJSONResponse(
+        {"detail": "Server busy, retry shortly"}, status_code=503,
+        headers={"Retry-After": str(database.DB_RETRY_AFTER_SECONDS)},
+    )
+
 # ============ HEALTH CHECK ============
 
 @app.get("/health")
@@ -66,38 +158,45 @@ async def health_check():
 
 # ============ MODELS ============
 
+# Column limits of the properties table (01-schema.sql). Values past them
+# would fail the insert, so they are rejected here with a 422 instead.
+MAX_INTEGER = 2 ** 31 - 1
+MAX_DECIMAL_12_2 = 1e10
+MAX_DECIMAL_10_2 = 1e8
+MAX_BATHS = 99.9   # DECIMAL(3, 1)
+
 class PropertyBase(BaseModel):
-    address: str
-    street: str
-    city: str
-    state: str
-    zip: str
-    latitude: float
-    longitude: float
+    address: str = Field(..., max_length=500)
+    street: str = Field(..., max_length=255)
+    city: str = Field(..., max_length=100)
+    state: str = Field(..., max_length=2)
+    zip: str = Field(..., max_length=10)
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
     
     for_sale: bool = True
-    status: str = "For Sale"
+    status: str = Field("For Sale", max_length=50)
     date_listed: Optional[date] = None
-    days_on_market: int = 0
-    
-    price: float
-    sqft: int
-    beds: int
-    baths: float
-    price_per_sqft: float
-    lot_size: int
-    hoa: float = 0
-    
-    home_type: str
-    home_design: Optional[str] = None
-    estimated_taxes: float
-    year_built: int
-    units: int = 1
+    days_on_market: int = Field(0, ge=-MAX_INTEGER, le=MAX_INTEGER)
+    
+    price: float = Field(..., ge=0, lt=MAX_DECIMAL_12_2)
+    sqft: int = Field(..., ge=0, le=MAX_INTEGER)
+    beds: int = Field(..., ge=0, le=MAX_INTEGER)
+    baths: float = Field(..., ge=0, le=MAX_BATHS)
+    price_per_sqft: float = Field(..., ge=0, lt=MAX_DECIMAL_10_2)
+    lot_size: int = Field(..., ge=0, le=MAX_INTEGER)
+    hoa: float = Field(0, ge=0, lt=MAX_DECIMAL_10_2)
+    
+    home_type: str = Field(..., max_length=50)
+    home_design: Optional[str] = Field(None, max_length=50)
+    estimated_taxes: float = Field(..., ge=0, lt=MAX_DECIMAL_10_2)
+    year_built: int = Field(..., ge=0, le=MAX_INTEGER)
+    units: int = Field(1, ge=0, le=MAX_INTEGER)
     
     last_sold_date: Optional[date] = None
-    last_sold_amount: Optional[float] = None
+    last_sold_amount: Optional[float] = Field(None, ge=0, lt=MAX_DECIMAL_12_2)
     
-    estimated_monthly_rent: Optional[float] = None
+    estimated_monthly_rent: Optional[float] = Field(None, ge=0, lt=MAX_DECIMAL_10_2)
 
 class PropertyCreate(PropertyBase):
     pass
@@ -149,56 +248,205 @@ class DealAnalysis(BaseModel):
     passes_one_percent: bool
     deal_score: int
 
+class BatchAnalysisRequest(BaseModel):
+    # Column arrays; every list must have the same length.
+    price: List[float]
+    estimated_taxes: List[float]
+    hoa: List[float]
+    estimated_monthly_rent: List[Optional[float]]
+    sqft: List[int]
+    beds: List[int]
+    baths: List[float]
+    year_built: List[int]
+    units: List[int]
+    assumptions: AnalysisAssumptions = AnalysisAssumptions()
+
+class SensitivityRange(BaseModel):
+    # Either explicit values, or `steps` evenly spaced points from start to stop
+    values: Optional[List[float]] = None
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: int = Field(10, ge=1, le=1000)
+
+class SensitivityRequest(BaseModel):
+    property: PropertyCreate
+    # Base assumptions; fields named in `ranges` are swept instead
+    assumptions: AnalysisAssumptions = AnalysisAssumptions()
+    # AnalysisAssumptions field name -> values to sweep. Grid axes follow
+    # the order given here.
+    ranges: Dict[str, SensitivityRange]
+
+class ProjectionAssumptions(BaseModel):
+    hold_years: int = Field(10, ge=1, le=40)
+    rent_growth: float = 0.03
+    appreciation: float = 0.03
+    # Growth of taxes, insurance, HOA, maintenance and capex
+    expense_growth: float = 0.025
+    selling_cost_percent: float = 0.06
+
+class SimulationSettings(BaseModel):
+    trials: int = Field(10_000, ge=1, le=100_000)
+    seed: Optional[int] = None
+    # Yearly standard deviations of the drawn paths
+    rent_growth_sd: float = Field(0.02, ge=0)
+    appreciation_sd: float = Field(0.05, ge=0)
+    vacancy_sd: float = Field(0.03, ge=0)
+    # Yearly mortgage rate shock; 0 keeps the loan fixed-rate
+    rate_sd: float = Field(0.0, ge=0)
+
+class ProjectionRequest(BaseModel):
+    property: PropertyCreate
+    assumptions: AnalysisAssumptions = AnalysisAssumptions()
+    projection: ProjectionAssumptions = ProjectionAssumptions()
+
+class SimulationRequest(ProjectionRequest):
+    simulation: SimulationSettings = SimulationSettings()
+
 class BoundingBox(BaseModel):
     north: float
     south: float
     east: float
     west: float
 
+class PropertySearch(BaseModel):
+    # Bounding box; all four must be set to search a viewport
+    north: Optional[float] = None
+    south: Optional[float] = None
+    east: Optional[float] = None
+    west: Optional[float] = None
+    status: Optional[str] = None
+    home_type: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_beds: Optional[int] = None
+    for_sale: Optional[bool] = None
+    min_deal_score: Optional[int] = None
+    min_cap_rate: Optional[float] = None
+    sort: Optional[str] = None
+    limit: Optional[int] = Field(None, ge=1)
+    cursor: Optional[str] = None
+    stream: Optional[str] = None
+    # 'json' (default), 'columnar' or 'msgpack'
+    format: Optional[str] = None
+    assumptions: Optional[AnalysisAssumptions] = None
+
+class SavedSearchCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=200)
+    # Free-form client identifier to list a user's searches by
+    owner: Optional[str] = Field(None, max_length=200)
+    # Bounding box; all four or none (anywhere)
+    north: Optional[float] = None
+    south: Optional[float] = None
+    east: Optional[float] = None
+    west: Optional[float] = None
+    status: Optional[str] = None
+    home_type: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_beds: Optional[int] = None
+    min_deal_score: Optional[int] = None
+
+class TopDealsRequest(BaseModel):
+    bbox: Optional[BoundingBox] = None
+    status: Optional[str] = None
+    home_type: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_beds: Optional[int] = None
+    min_deal_score: Optional[int] = None
+    n: int = Field(20, ge=1, le=1000)
+    assumptions: AnalysisAssumptions = AnalysisAssumptions()
+
 # ============ CALCULATOR FUNCTIONS ============
 
 def calculate_mortgage_payment(principal: float, annual_rate: float, years: int) -> float:
     """Calculate monthly mortgage payment (P&I)"""
-    monthly_rate = annual_rate / 12
-    num_payments = years * 12
-    
-    if monthly_rate == 0:
-        return principal / num_payments
-    
-    payment = principal * (monthly_rate * (1 + monthly_rate) ** num_payments) / \
-              ((1 + monthly_rate) ** num_payments - 1)
-    
-    return payment
+    return principal * mortgage_payment_factor(annual_rate, years)
+
+# Rent model used when a property has no stored rent. BASE_RENT_PER_SQFT
+# applies where the local rent table (comps.py) has no rate.
+BASE_RENT_PER_SQFT = 1.2
+NEW_BUILD_RENT_FACTOR = 1.15   # under 10 years old
+MID_AGE_RENT_FACTOR = 1.0      # 10-29 years old
+OLD_BUILD_RENT_FACTOR = 0.9    # 30+ years old
+RENT_PER_EXTRA_BED = 100       # per bedroom above 2
+RENT_PER_EXTRA_BATH = 50       # per bathroom above 1
 
 def estimate_rent(sqft: int, beds: int, baths: float, year_built: int) -> float:
     """Estimate monthly rent based on property characteristics"""
-    base_rent_per_sqft = 1.2
+    base_rent_per_sqft = BASE_RENT_PER_SQFT
     
     age = date.today().year - year_built
     if age < 10:
-        base_rent_per_sqft *= 1.15
+        base_rent_per_sqft *= NEW_BUILD_RENT_FACTOR
     elif age < 30:
-        base_rent_per_sqft *= 1.0
+        base_rent_per_sqft *= MID_AGE_RENT_FACTOR
     else:
-        base_rent_per_sqft *= 0.9
+        base_rent_per_sqft *= OLD_BUILD_RENT_FACTOR
     
     rent = sqft * base_rent_per_sqft
-    rent += (beds - 2) * 100
-    rent += (baths - 1) * 50
+    rent += (beds - 2) * RENT_PER_EXTRA_BED
+    rent += (baths - 1) * RENT_PER_EXTRA_BATH
     
     return round(rent)
 
-def analyze_property(property: Property, assumptions: AnalysisAssumptions) -> DealAnalysis:
-    """Perform full investment analysis on a property"""
+def estimate_rent_batch(sqft: np.ndarray, beds: np.ndarray, baths: np.ndarray, year_built: np.ndarray,
+                        base_rent_per_sqft: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Vectorized estimate_rent over column arrays. `base_rent_per_sqft` gives
+    local rates per row; NaN entries fall back to BASE_RENT_PER_SQFT.
+    """
+    age = date.today().year - year_built
+    base = BASE_RENT_PER_SQFT
+    if base_rent_per_sqft is not None:
+        base = np.where(np.isnan(base_rent_per_sqft), BASE_RENT_PER_SQFT, base_rent_per_sqft)
+    rent_per_sqft = base * np.select(
+        [age < 10, age < 30],
+        [NEW_BUILD_RENT_FACTOR, MID_AGE_RENT_FACTOR],
+        default=OLD_BUILD_RENT_FACTOR,
+    )
+    
+    rent = sqft * rent_per_sqft
+    rent += (beds - 2) * RENT_PER_EXTRA_BED
+    rent += (baths - 1) * RENT_PER_EXTRA_BATH
+    
+    return np.round(rent)
+
+def analyze_batch(
+    price: np.ndarray,
+    estimated_taxes: np.ndarray,
+    hoa: np.ndarray,
+    estimated_monthly_rent: np.ndarray,
+    sqft: np.ndarray,
+    beds: np.ndarray,
+    baths: np.ndarray,
+    year_built: np.ndarray,
+    units: np.ndarray,
+    assumptions: AnalysisAssumptions,
+    rent_per_sqft: Optional[np.ndarray] = None,
+    listing_rules: bool = False,
+) -> Dict[str, np.ndarray]:
+    """
+    Perform full investment analysis on column arrays of properties.
+    Returns one array per DealAnalysis field. Missing stored rents should be
+    passed as 0 or NaN and are estimated from the property characteristics,
+    at the local `rent_per_sqft` of each row where given (see comps.py).
+    Assumption fields may be arrays of the same length as the columns, in
+    which case each row is analyzed under its own assumptions.
     
-    price = property.price
-    sqft = property.sqft
-    year_built = property.year_built
-    estimated_taxes = property.estimated_taxes
-    hoa = property.hoa
-    beds = property.beds
-    baths = property.baths
-    units = property.units
+    By default rows are analyzed like the /api/analyze calculator. With
+    `listing_rules` they follow the listing endpoints instead: rent is only
+    estimated for rows with a size, and rows without a price score zero.
+    """
+    price = np.asarray(price, dtype=np.float64)
+    estimated_taxes = np.nan_to_num(np.asarray(estimated_taxes, dtype=np.float64))
+    hoa = np.nan_to_num(np.asarray(hoa, dtype=np.float64))
+    stored_rent = np.nan_to_num(np.asarray(estimated_monthly_rent, dtype=np.float64))
+    sqft = np.asarray(sqft, dtype=np.float64)
+    beds = np.asarray(beds, dtype=np.float64)
+    baths = np.asarray(baths, dtype=np.float64)
+    year_built = np.asarray(year_built, dtype=np.float64)
+    units = np.asarray(units, dtype=np.float64)
     
     # Calculate loan details
     down_payment = price * assumptions.down_payment_percent
@@ -206,20 +454,21 @@ def analyze_property(property: Property, assumptions: AnalysisAssumptions) -> De
     closing_costs = price * assumptions.closing_cost_percent
     total_cash_invested = down_payment + closing_costs + assumptions.rehab_budget
     
-    # Calculate monthly mortgage
-    monthly_mortgage = calculate_mortgage_payment(
-        loan_amount, 
-        assumptions.interest_rate, 
+    # The amortization factor only depends on the assumptions, so compute it once
+    monthly_mortgage = loan_amount * mortgage_payment_factor(
+        assumptions.interest_rate,
         assumptions.loan_term_years
     )
     
-    # Estimate rent if not provided
-    if assumptions.estimated_rent:
-        monthly_rent = assumptions.estimated_rent
-    elif property.estimated_monthly_rent:
-        monthly_rent = property.estimated_monthly_rent
-    else:
-        monthly_rent = estimate_rent(sqft, beds, baths, year_built) * units
+    # Estimate rent if not provided. An assumed rent overrides it wherever it
+    # is set (elementwise, since a sensitivity grid sweeps it per point).
+    estimated = estimate_rent_batch(sqft, beds, baths, year_built, rent_per_sqft) * units
+    if listing_rules:
+        estimated = np.where(sqft > 0, estimated, 0.0)
+    monthly_rent = np.where(stored_rent > 0, stored_rent, estimated)
+    if assumptions.estimated_rent is not None:
+        assumed_rent = np.asarray(assumptions.estimated_rent, dtype=np.float64)
+        monthly_rent = np.where(assumed_rent != 0, assumed_rent, monthly_rent)
     
     # Calculate expenses
     monthly_taxes = estimated_taxes / 12
@@ -229,7 +478,7 @@ def analyze_property(property: Property, assumptions: AnalysisAssumptions) -> De
     monthly_management = monthly_rent * assumptions.management_percent
     
     total_monthly_expenses = (
-        monthly_taxes + monthly_insurance + hoa + 
+        monthly_taxes + monthly_insurance + hoa +
         monthly_maintenance + monthly_capex + monthly_management
     )
     
@@ -241,75 +490,85 @@ def analyze_property(property: Property, assumptions: AnalysisAssumptions) -> De
     monthly_cash_flow = monthly_noi - monthly_mortgage
     annual_cash_flow = monthly_cash_flow * 12
     
-    # Calculate returns
-    cap_rate = annual_noi / price if price > 0 else 0
-    cash_on_cash = annual_cash_flow / total_cash_invested if total_cash_invested > 0 else 0
+    # Calculate returns. Divide into pre-filled outputs so zero denominators
+    # fall back to the same defaults as the scalar calculator.
+    has_price = price > 0
+    cap_rate = np.divide(annual_noi, price, out=np.zeros_like(price), where=has_price)
+    cash_on_cash = np.divide(annual_cash_flow, total_cash_invested,
+                             out=np.zeros_like(price), where=total_cash_invested > 0)
     # When there's no mortgage, DSCR is effectively infinite. Use a large finite
     # sentinel instead of float('inf'), which serializes to invalid JSON.
-    dscr = annual_noi / (monthly_mortgage * 12) if monthly_mortgage > 0 else 999.0
+    dscr = np.divide(annual_noi, monthly_mortgage * 12,
+                     out=np.full_like(price, 999.0), where=monthly_mortgage > 0)
     
     # Break-even occupancy
-    break_even_occupancy = (total_monthly_expenses + monthly_mortgage) / monthly_rent if monthly_rent > 0 else 1
+    break_even_occupancy = np.divide(total_monthly_expenses + monthly_mortgage, monthly_rent,
+                                     out=np.ones_like(price), where=monthly_rent > 0)
     
     # 1% Rule
-    one_percent_rule = monthly_rent / price if price > 0 else 0
+    one_percent_rule = np.divide(monthly_rent, price, out=np.zeros_like(price), where=has_price)
     passes_one_percent = one_percent_rule >= 0.01
     
     # Deal score (0-100)
-    deal_score = 0
-    
-    if cash_on_cash >= 0.12:
-        deal_score += 30
-    elif cash_on_cash >= 0.08:
-        deal_score += 20
-    elif cash_on_cash >= 0.05:
-        deal_score += 10
-    
-    if cap_rate >= 0.08:
-        deal_score += 25
-    elif cap_rate >= 0.06:
-        deal_score += 15
-    elif cap_rate >= 0.04:
-        deal_score += 5
-    
-    if dscr >= 1.5:
-        deal_score += 20
-    elif dscr >= 1.25:
-        deal_score += 15
-    elif dscr >= 1.0:
-        deal_score += 5
-    
-    if passes_one_percent:
-        deal_score += 15
-    elif one_percent_rule >= 0.008:
-        deal_score += 8
-    
-    if monthly_cash_flow >= 300:
-        deal_score += 10
-    elif monthly_cash_flow >= 200:
-        deal_score += 5
-    
-    return DealAnalysis(
-        down_payment=down_payment,
-        loan_amount=loan_amount,
-        closing_costs=closing_costs,
-        total_cash_invested=total_cash_invested,
-        monthly_mortgage=monthly_mortgage,
-        monthly_rent=monthly_rent,
-        effective_gross_income=effective_gross_income,
-        monthly_expenses=total_monthly_expenses,
-        monthly_noi=monthly_noi,
-        annual_noi=annual_noi,
-        monthly_cash_flow=monthly_cash_flow,
-        annual_cash_flow=annual_cash_flow,
-        cap_rate=cap_rate,
-        cash_on_cash=cash_on_cash,
-        dscr=dscr,
-        break_even_occupancy=break_even_occupancy,
-        one_percent_rule=one_percent_rule,
-        passes_one_percent=passes_one_percent,
-        deal_score=deal_score
+    deal_score = (
+        np.select([cash_on_cash >= 0.12, cash_on_cash >= 0.08, cash_on_cash >= 0.05], [30, 20, 10], 0) +
+        np.select([cap_rate >= 0.08, cap_rate >= 0.06, cap_rate >= 0.04], [25, 15, 5], 0) +
+        np.select([dscr >= 1.5, dscr >= 1.25, dscr >= 1.0], [20, 15, 5], 0) +
+        np.select([passes_one_percent, one_percent_rule >= 0.008], [15, 8], 0) +
+        np.select([monthly_cash_flow >= 300, monthly_cash_flow >= 200], [10, 5], 0)
     )
+    deal_score = deal_score.astype(np.int64)
+    
+    if listing_rules:
+        # A listing without a price can't be analyzed; report zeros
+        unpriced = ~has_price
+        for column in (deal_score, cash_on_cash, monthly_cash_flow, annual_cash_flow, dscr):
+            column[unpriced] = 0
+    
+    return {
+        'down_payment': down_payment,
+        'loan_amount': loan_amount,
+        'closing_costs': closing_costs,
+        'total_cash_invested': total_cash_invested,
+        'monthly_mortgage': monthly_mortgage,
+        'monthly_rent': monthly_rent,
+        'effective_gross_income': effective_gross_income,
+        'monthly_expenses': total_monthly_expenses,
+        'monthly_noi': monthly_noi,
+        'annual_noi': annual_noi,
+        'monthly_cash_flow': monthly_cash_flow,
+        'annual_cash_flow': annual_cash_flow,
+        'cap_rate': cap_rate,
+        'cash_on_cash': cash_on_cash,
+        'dscr': dscr,
+        'break_even_occupancy': break_even_occupancy,
+        'one_percent_rule': one_percent_rule,
+        'passes_one_percent': passes_one_percent,
+        'deal_score': deal_score,
+    }
+
+def property_rent_per_sqft(property: PropertyBase) -> Optional[np.ndarray]:
+    """Local rent rate of a single property, as analyze_batch takes it"""
+    return comps.rent_table.rates(
+        np.array([property.latitude]), np.array([property.longitude]), [property.zip], [property.home_type]
+    )
+
+def analyze_property(property: Property, assumptions: AnalysisAssumptions) -> DealAnalysis:
+    """Perform full investment analysis on a property"""
+    result = analyze_batch(
+        price=[property.price],
+        estimated_taxes=[property.estimated_taxes],
+        hoa=[property.hoa],
+        estimated_monthly_rent=[property.estimated_monthly_rent or 0],
+        sqft=[property.sqft],
+        beds=[property.beds],
+        baths=[property.baths],
+        year_built=[property.year_built],
+        units=[property.units],
+        assumptions=assumptions,
+        rent_per_sqft=property_rent_per_sqft(property),
+    )
+    return DealAnalysis(**{key: values[0].item() for key, values in result.items()})
 
 # ============ API ENDPOINTS ============
 
@@ -330,8 +589,283 @@ async def analyze_deal(property: PropertyCreate, assumptions: Optional[AnalysisA
     prop = Property(id=0, **property.model_dump())
     return analyze_property(prop, assumptions)
 
+@app.post("/api/analyze/batch")
+async def analyze_deals_batch(request: BatchAnalysisRequest):
+    """
+    Analyze many properties at once.
+    Takes column arrays and returns one array per DealAnalysis metric.
+    """
+    columns = request.model_dump(exclude={'assumptions'})
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise HTTPException(status_code=422, detail="All columns must have the same length")
+    
+    columns['estimated_monthly_rent'] = [
+        rent if rent is not None else 0 for rent in columns['estimated_monthly_rent']
+    ]
+    body = await offload.run(run_batch_analysis, columns, request.assumptions, size=len(columns['price']))
+    return Response(content=body, media_type="application/json")
+
+def run_batch_analysis(columns: dict, assumptions: Optional[AnalysisAssumptions]) -> bytes:
+    """Analyze and encode the batch columns"""
+    result = analyze_batch(**columns, assumptions=assumptions)
+    return dump_json({key: values.tolist() for key, values in result.items()})
+
+MAX_SENSITIVITY_POINTS = 250_000
+
+def sensitivity_axis(field: str, sweep: SensitivityRange) -> np.ndarray:
+    """Values for one grid axis"""
+    if field not in AnalysisAssumptions.model_fields:
+        raise HTTPException(status_code=422, detail=f"Unknown assumption: {field}")
+    if sweep.values is not None:
+        if not sweep.values:
+            raise HTTPException(status_code=422, detail=f"No values given for {field}")
+        return np.asarray(sweep.values, dtype=np.float64)
+    if sweep.start is None or sweep.stop is None:
+        raise HTTPException(status_code=422, detail=f"{field} needs values or start and stop")
+    return np.linspace(sweep.start, sweep.stop, sweep.steps)
+
+@app.post("/api/analyze/sensitivity")
+async def analyze_sensitivity(request: SensitivityRequest):
+    """
+    Analyze one property across the cartesian grid of the given assumption ranges.
+    Every grid point is evaluated in a single analyze_batch pass. Metric
+    arrays are flattened in row-major order over `shape` (the first range
+    varies slowest). break_even_rent is the monthly rent at which cash flow
+    is zero for each point, or null where no rent breaks even.
+    """
+    if not request.ranges:
+        raise HTTPException(status_code=422, detail="At least one range is required")
+    axes = {field: sensitivity_axis(field, sweep) for field, sweep in request.ranges.items()}
+    shape = [len(values) for values in axes.values()]
+    points = math.prod(shape)
+    if points > MAX_SENSITIVITY_POINTS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Grid has {points} points, the limit is {MAX_SENSITIVITY_POINTS}"
+        )
+    
+    body = await offload.run(run_sensitivity, request, axes, size=points)
+    return Response(content=body, media_type="application/json")
+
+def run_sensitivity(request: SensitivityRequest, axes: Dict[str, np.ndarray]) -> bytes:
+    """Evaluate and encode the sensitivity grid"""
+    shape = [len(values) for values in axes.values()]
+    points = math.prod(shape)
+    # Swept fields become one array per grid point, the rest stay scalars
+    grid = np.meshgrid(*axes.values(), indexing='ij')
+    assumptions = request.assumptions.model_copy(
+        update={field: values.ravel() for field, values in zip(axes, grid)}
+    )
+    
+    prop = request.property
+    def column(value) -> np.ndarray:
+        return np.full(points, value or 0, dtype=np.float64)
+    
+    result = analyze_batch(
+        price=column(prop.price),
+        estimated_taxes=column(prop.estimated_taxes),
+        hoa=column(prop.hoa),
+        estimated_monthly_rent=column(prop.estimated_monthly_rent),
+        sqft=column(prop.sqft),
+        beds=column(prop.beds),
+        baths=column(prop.baths),
+        year_built=column(prop.year_built),
+        units=column(prop.units),
+        assumptions=assumptions,
+        rent_per_sqft=property_rent_per_sqft(prop),
+    )
+    
+    # Cash flow is linear in rent: rent * (1 - vacancy - management) minus the
+    # rent-independent expenses and the mortgage
+    rent_share = np.broadcast_to(1 - assumptions.vacancy_rate - assumptions.management_percent, (points,))
+    fixed_costs = (
+        result['monthly_expenses'] - result['monthly_rent'] * assumptions.management_percent
+        + result['monthly_mortgage']
+    )
+    break_even_rent = np.divide(fixed_costs, rent_share, out=np.full(points, np.nan), where=rent_share > 0)
+    
+    # The payload is plain lists of floats, so skip jsonable_encoder's walk
+    # over every grid point
+    return dump_json({
+        'axes': {field: values.tolist() for field, values in axes.items()},
+        'shape': shape,
+        'monthly_cash_flow': np.round(result['monthly_cash_flow'], 2).tolist(),
+        'cash_on_cash': np.round(result['cash_on_cash'], 4).tolist(),
+        'dscr': np.round(result['dscr'], 2).tolist(),
+        'deal_score': result['deal_score'].tolist(),
+        'break_even_rent': [
+            None if math.isnan(rent) else rent for rent in np.round(break_even_rent, 2).tolist()
+        ],
+    })
+
+def projection_inputs(request: ProjectionRequest) -> dict:
+    """Year-1 figures for the projection engine, taken from the single-year analysis"""
+    assumptions = request.assumptions
+    analysis = analyze_property(Property(id=0, **request.property.model_dump()), assumptions)
+    return {
+        'price': request.property.price,
+        'monthly_rent': analysis.monthly_rent,
+        'monthly_operating_expenses': (
+            analysis.monthly_expenses - analysis.monthly_rent * assumptions.management_percent
+        ),
+        'management_percent': assumptions.management_percent,
+        'loan_amount': analysis.loan_amount,
+        'loan_term_years': assumptions.loan_term_years,
+        'total_cash_invested': analysis.total_cash_invested,
+        'selling_cost_percent': request.projection.selling_cost_percent,
+    }
+
+def path_settings(request: ProjectionRequest) -> dict:
+    return {
+        'years': request.projection.hold_years,
+        'rent_growth': request.projection.rent_growth,
+        'appreciation': request.projection.appreciation,
+        'expense_growth': request.projection.expense_growth,
+        'vacancy': request.assumptions.vacancy_rate,
+        'interest_rate': request.assumptions.interest_rate,
+    }
+
+def run_projection(request: ProjectionRequest) -> dict:
+    inputs = projection_inputs(request)
+    result = project(**inputs, **flat_paths(**path_settings(request)))
+    schedule = amortization_schedule(
+        inputs['loan_amount'],
+        request.assumptions.interest_rate,
+        request.assumptions.loan_term_years,
+    )
+    return {
+        'years': list(range(1, request.projection.hold_years + 1)),
+        **{metric: np.round(result[metric][0], 2).tolist() for metric in YEARLY_METRICS},
+        'sale_proceeds': round(float(result['sale_proceeds'][0]), 2),
+        'irr': nan_to_none(round(float(result['irr'][0]), 4)),
+        'total_return': nan_to_none(round(float(result['total_return'][0]), 4)),
+        'equity_multiple': nan_to_none(round(float(result['equity_multiple'][0]), 4)),
+        'amortization': {
+            key: np.round(values, 2).tolist() for key, values in schedule.items()
+        },
+    }
+
+def run_simulation(request: SimulationRequest) -> dict:
+    settings = request.simulation
+    paths = random_paths(
+        trials=settings.trials,
+        **path_settings(request),
+        rent_growth_sd=settings.rent_growth_sd,
+        appreciation_sd=settings.appreciation_sd,
+        vacancy_sd=settings.vacancy_sd,
+        rate_sd=settings.rate_sd,
+        seed=settings.seed,
+    )
+    result = project(**projection_inputs(request), **paths)
+    return {
+        'trials': settings.trials,
+        'years': list(range(1, request.projection.hold_years + 1)),
+        **summarize(result),
+    }
+
+@app.post("/api/analyze/projection")
+async def analyze_projection(request: ProjectionRequest):
+    """
+    Project a property over a hold period with constant growth rates.
+    Returns year-by-year columns (rent, NOI, debt service, cash flow,
+    interest, principal, loan balance, value, equity), the exit figures
+    (sale proceeds, IRR, total return, equity multiple) and the monthly
+    amortization schedule of the loan.
+    """
+    return await offload.run(run_projection, request, size=request.projection.hold_years)
+
+@app.post("/api/analyze/simulate")
+async def analyze_simulation(request: SimulationRequest):
+    """
+    Monte Carlo version of /api/analyze/projection.
+    Rent growth, appreciation, vacancy and (optionally) the mortgage rate
+    are drawn per trial and year. Returns p5/p25/p50/p75/p95 bands for each
+    yearly column and for IRR, total return and equity multiple, plus the
+    share of trials that lose money. Large simulations run on the worker
+    pool (offload.py) so they don't block the event loop.
+    """
+    size = request.simulation.trials * request.projection.hold_years
+    return await offload.run(run_simulation, request, size=size)
+
+# Keyset pagination. A cursor is the (sort key, id) of the last row on a page,
+# tagged with the sort it belongs to so it can't be replayed against another
+# ordering. It is base64 encoded to keep it opaque to clients.
+_BBOX_SORT_KEY = 'price'
+_ALL_SORT_KEY = 'date_listed'
+_SORT_VALUE_PARSERS = {
+    'price': Decimal,
+    'date_listed': date.fromisoformat,
+    'deal_score': int,
+}
+MAX_PAGE_SIZE = 5000
+STREAM_BATCH_SIZE = 500
+
+
+def encode_cursor(sort_key: str, row: dict) -> str:
+    """Build the cursor pointing just past `row`."""
+    value = row[SORT_COLUMNS[sort_key]]
+    payload = [sort_key, str(value) if value is not None else None, row['id']]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str, sort_key: str) -> tuple:
+    """Parse a cursor into the (sort value, id) keyset for `sort_key`."""
+    try:
+        key, value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if key != sort_key:
+            raise ValueError("cursor belongs to a different query")
+        if value is not None:
+            value = _SORT_VALUE_PARSERS[key](value)
+        return value, int(last_id)
+    except (ValueError, TypeError, ArithmeticError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+
+# Compact query encoding for assumption overrides, e.g. ?assumptions=dp:0.2,ir:0.065
+# Full AnalysisAssumptions field names are accepted as keys too.
+_ASSUMPTION_ALIASES = {
+    'dp': 'down_payment_percent',
+    'ir': 'interest_rate',
+    'lt': 'loan_term_years',
+    'cc': 'closing_cost_percent',
+    'rb': 'rehab_budget',
+    'vr': 'vacancy_rate',
+    'mp': 'maintenance_percent',
+    'cx': 'capex_percent',
+    'mg': 'management_percent',
+    'in': 'insurance_rate',
+    'er': 'estimated_rent',
+}
+
+
+def parse_assumptions(encoded: Optional[str]) -> Optional[AnalysisAssumptions]:
+    """Decode the compact `key:value,key:value` assumptions query param."""
+    if not encoded:
+        return None
+    values = {}
+    for part in encoded.split(','):
+        key, separator, value = part.partition(':')
+        field = _ASSUMPTION_ALIASES.get(key.strip(), key.strip())
+        if not separator or field not in AnalysisAssumptions.model_fields:
+            raise HTTPException(status_code=400, detail=f"Invalid assumption: {part!r}")
+        values[field] = value.strip()
+    try:
+        return AnalysisAssumptions(**values)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid assumptions: {e.errors()[0]['msg']}")
+
+
+def assumptions_key(assumptions: Optional[AnalysisAssumptions]) -> Optional[str]:
+    """Stable hash of an assumption set for cache keys (None means defaults)."""
+    if assumptions is None:
+        return None
+    return hashlib.sha1(assumptions.model_dump_json().encode()).hexdigest()[:16]
+
+
 @app.get("/api/properties")
 async def get_properties(
+    request: Request,
     north: float = Query(None, description="North boundary latitude"),
     south: float = Query(None, description="South boundary latitude"),
     east: float = Query(None, description="East boundary longitude"),
@@ -341,231 +875,1775 @@ async def get_properties(
     min_price: Optional[float] = Query(None, description="Minimum price"),
     max_price: Optional[float] = Query(None, description="Maximum price"),
     min_beds: Optional[int] = Query(None, description="Minimum bedrooms"),
+    for_sale: Optional[bool] = Query(None, description="Only listings with this for-sale flag"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    stream: Optional[str] = Query(None, description="'ndjson' to stream every matching property"),
+    min_deal_score: Optional[int] = Query(None, description="Minimum stored deal score"),
+    min_cap_rate: Optional[float] = Query(None, description="Minimum stored cap rate"),
+    sort: Optional[str] = Query(None, description="'deal_score' to order by stored deal score"),
+    assumptions: Optional[str] = Query(None, description="Analysis overrides, e.g. dp:0.2,ir:0.065"),
+    format: Optional[str] = Query(None, description="'json' (default), 'columnar' or 'msgpack'"),
 ):
     """
     Get properties within a bounding box or all properties.
     Uses PostGIS for spatial queries.
+    Results are paged; when more rows remain, the X-Next-Cursor response
+    header holds the cursor for the next page. With stream=ndjson the whole
+    result set (or `limit` rows) is streamed one property per line instead.
+    min_deal_score, min_cap_rate and sort=deal_score use the analysis stored
+    under the default assumptions; rows awaiting analysis are left out of a
+    deal score sort. `assumptions` only changes the attached analysis.
+    format=columnar returns typed map columns instead of property objects,
+    as JSON arrays or, with format=msgpack, as little-endian binary blobs.
+    Pages carry a strong ETag tied to the data version; a matching
+    If-None-Match gets a 304 without querying the database. With the hot
+    set enabled, for-sale pages (bbox + for_sale=true, or no bbox) under
+    default assumptions are answered from memory.
     """
+    search = PropertySearch(
+        north=north, south=south, east=east, west=west,
+        status=status, home_type=home_type,
+        min_price=min_price, max_price=max_price, min_beds=min_beds, for_sale=for_sale,
+        min_deal_score=min_deal_score, min_cap_rate=min_cap_rate,
+        sort=sort, limit=limit, cursor=cursor, stream=stream, format=format,
+        assumptions=parse_assumptions(assumptions),
+    )
+    return await list_properties(request, search, etag=data_etag(request))
+
+
+@app.post("/api/properties/search")
+async def search_properties(request: Request, search: PropertySearch):
+    """Same as GET /api/properties, with a JSON body that can carry full assumptions."""
+    if search.limit is not None and search.limit > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"limit must be at most {MAX_PAGE_SIZE}")
+    return await list_properties(request, search)
+
+
+def data_etag(request: Request) -> str:
+    """ETag for a GET answered purely from listing data (analysis depends on the year too)"""
+    return request_etag(request, data_version.epoch, data_version.value, date.today().year)
+
+
+async def list_properties(request: Request, search: PropertySearch, etag: Optional[str] = None):
+    """
+    Shared implementation of the property listing endpoints.
+    `etag` enables conditional requests for paged (non-streamed) responses.
+    """
+    north, south, east, west = search.north, search.south, search.east, search.west
+    # If a full bounding box is provided, use the spatial query. Check for
+    # None explicitly so a legitimate 0.0 coordinate isn't treated as missing.
+    use_bbox = all(v is not None for v in (north, south, east, west))
+    if search.sort is not None and search.sort != 'deal_score':
+        raise HTTPException(status_code=400, detail="Unsupported sort, use 'deal_score'")
+    sort_key = search.sort or (_BBOX_SORT_KEY if use_bbox else _ALL_SORT_KEY)
+    after = decode_cursor(search.cursor, sort_key) if search.cursor else None
+    limit = search.limit
+    page_size = limit or (500 if use_bbox else 1000)
+    assumptions = search.assumptions
+    response_format = search.format or 'json'
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported format, use 'json', 'columnar' or 'msgpack'")
+    filters = search.model_dump(include={
+        'status', 'home_type', 'min_price', 'max_price', 'min_beds', 'for_sale',
+        'min_deal_score', 'min_cap_rate',
+    })
+    
+    if search.stream is not None:
+        if search.stream != 'ndjson':
+            raise HTTPException(status_code=400, detail="Unsupported stream format, use 'ndjson'")
+        if response_format != 'json':
+            raise HTTPException(status_code=400, detail="Streaming only supports the json format")
+        if use_bbox:
+            query, params = build_bbox_query(north, south, east, west, filters, limit, after, sort_key)
+        else:
+            query, params = build_all_query(filters, limit, after, sort_key)
+        return StreamingResponse(
+            stream_ndjson(query, params, assumptions),
+            media_type="application/x-ndjson",
+        )
+    
+    if etag and (matched := matching_etag(request, etag)):
+        return not_modified(matched)
+    
+    # Pages are cached per exact viewport; the rows behind them per snapped
+    # viewport cell (fetch_viewport_rows), which overlapping pans share
+    scenario = assumptions_key(assumptions)
+    if use_bbox:
+        cache_key = ('bbox', north, south, east, west, tuple(sorted(filters.items())),
+                     sort_key, page_size, search.cursor, scenario, response_format)
+    else:
+        cache_key = ('all', tuple(sorted(filters.items())), sort_key, page_size, search.cursor,
+                     scenario, response_format)
+    
+    # The cache holds encoded (and lazily compressed) bodies, so a hit skips
+    # serialization and compression too
+    cached = property_cache.get(cache_key)
+    if cached is not None:
+        body, next_cursor, compressed = cached
+        return properties_response(request, body, next_cursor, response_format, etag, compressed)
+    
+    hot = _hot_set
+    # The hot set holds only for-sale listings: a viewport is limited to them
+    # when asked to, the initial load unless asked otherwise
+    for_sale_only = filters.get('for_sale') if use_bbox else filters.get('for_sale') is not False
+    if hot is not None and assumptions is None and for_sale_only:
+        # Served from memory: the for-sale set under default assumptions
+        bbox = (north, south, east, west) if use_bbox else None
+        with phase('hot_set'):
+            slots = hot.query(bbox, filters, sort_key, after, page_size + 1)
+        next_cursor = None
+        if len(slots) > page_size:
+            slots = slots[:page_size]
+            next_cursor = encode_cursor(sort_key, hot.cursor_row(slots[-1]))
+        with phase('encode'):
+            if response_format == 'json':
+                body = hot.json_body(slots)
+            else:
+                body = encode_columns({name: values[slots] for name, values in hot.columns.items()}, response_format)
+        compressed = {}
+        property_cache.set(cache_key, (body, next_cursor, compressed), weight=len(slots))
+        return properties_response(request, body, next_cursor, response_format, etag, compressed)
+    
     try:
-        # If a full bounding box is provided, use the spatial query. Check for
-        # None explicitly so a legitimate 0.0 coordinate isn't treated as missing.
-        if all(v is not None for v in (north, south, east, west)):
-            filters = {
-                'status': status,
-                'home_type': home_type,
-                'min_price': min_price,
-                'max_price': max_price,
-                'min_beds': min_beds,
-            }
-            properties = await fetch_properties_in_bbox(north, south, east, west, filters)
+        # A change while the page is read may or may not be in it, so only
+        # cache the page if the version is unchanged afterwards
+        version = data_version.value
+        # Fetch one extra row to learn whether another page exists
+        if use_bbox:
+            properties = await fetch_viewport_rows(north, south, east, west, filters, page_size, after, sort_key)
         else:
             # Return all properties
-            properties = await fetch_all_properties()
+            properties = await fetch_all_properties(filters, limit=page_size + 1, after=after, sort=sort_key)
+        
+        next_cursor = None
+        if len(properties) > page_size:
+            properties = properties[:page_size]
+            next_cursor = encode_cursor(sort_key, properties[-1])
         
-        # Attach analysis and convert DB field names to the frontend's shape.
-        results = [to_frontend_property(prop) for prop in properties]
-        return results
+        body, compressed = await offload.run(
+            encode_page, offload.rows(properties), assumptions, response_format, request_encoding(request),
+            size=len(properties),
+        )
+        if data_version.value == version:
+            property_cache.set(cache_key, (body, next_cursor, compressed), weight=len(properties))
+        return properties_response(request, body, next_cursor, response_format, etag, compressed)
 
+    except PoolBusyError:
+        raise
     except Exception as e:
         print(f"Database error: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-# Maps snake_case DB column names to the camelCase keys the frontend expects.
-# (db_key, frontend_key, default)
-_FIELD_RENAMES = [
-    ('square_foot', 'sqft', 0),
-    ('bed', 'beds', 0),
-    ('bath', 'baths', 0),
-    ('price_per_square_foot', 'pricePerSqft', 0),
-    ('lot_size', 'lotSize', 0),
-    ('home_type', 'homeType', ''),
-    ('home_design', 'homeDesign', ''),
-    ('estimated_taxes', 'estimatedTaxes', 0),
-    ('year_built', 'yearBuilt', 0),
-    ('number_of_units', 'units', 1),
-    ('date_listed', 'dateListed', None),
-    ('days_on_market', 'daysOnMarket', 0),
-    ('for_sale', 'forSale', True),
-    ('last_sold_date', 'lastSoldDate', None),
-    ('last_sold_amount', 'lastSoldAmount', 0),
-    ('estimated_monthly_rent', 'estimatedMonthlyRent', 0),
-]
+# Most rows fetched for a snapped viewport cell
+SNAPPED_FETCH_MAX_ROWS = int(os.getenv("SNAPPED_FETCH_MAX_ROWS", "5000"))
 
 
-def to_frontend_property(prop: dict) -> dict:
-    """Attach investment analysis and rename DB fields to the frontend shape."""
-    prop['analysis'] = calculate_property_analysis(prop)
-    for db_key, frontend_key, default in _FIELD_RENAMES:
-        prop[frontend_key] = prop.pop(db_key, default)
-    return prop
+async def fetch_viewport_rows(north: float, south: float, east: float, west: float,
+                              filters: dict, page_size: int, after: Optional[tuple], sort_key: str) -> list:
+    """
+    The first page_size + 1 rows inside a viewport, cut from the cached rows
+    of the viewport snapped outward to the cache grid (snap_bbox), so small
+    pans and zoom jitter don't query again. Rows outside the viewport never
+    reach the page.
+    """
+    snapped = snap_bbox(north, south, east, west)
+    cell_key = ('cell', *snapped, tuple(sorted(filters.items())), sort_key, after)
+    cell = property_cache.get(cell_key)
+    if cell is None:
+        version = data_version.value
+        rows = await fetch_properties_in_bbox(
+            *snapped, filters, limit=SNAPPED_FETCH_MAX_ROWS, after=after, sort=sort_key
+        )
+        # (rows in sort order, whether they are all of the cell's rows)
+        cell = (rows, len(rows) < SNAPPED_FETCH_MAX_ROWS)
+        if data_version.value == version:
+            property_cache.set(cell_key, cell, weight=len(rows))
+    rows, complete = cell
+    inside = [
+        row for row in rows
+        if south <= row['latitude'] <= north and west <= row['longitude'] <= east
+    ]
+    if len(inside) > page_size or complete:
+        return inside[:page_size + 1]
+    # The cell has more rows than were fetched, and the viewport's page may
+    # continue past them
+    return await fetch_properties_in_bbox(
+        north, south, east, west, filters, limit=page_size + 1, after=after, sort=sort_key
+    )
 
 
-def calculate_property_analysis(prop: dict) -> dict:
-    """Calculate investment metrics for a property"""
-    price = float(prop.get('price', 0))
-    sqft = int(prop.get('square_foot', 0))
-    year_built = int(prop.get('year_built', 2000))
-    estimated_taxes = float(prop.get('estimated_taxes', 0) or 0)
-    hoa = float(prop.get('hoa', 0) or 0)
-    beds = int(prop.get('bed', 0))
-    baths = float(prop.get('bath', 0))
-    units = int(prop.get('number_of_units', 1))
-    
-    # Use stored rent or estimate
-    monthly_rent = float(prop.get('estimated_monthly_rent', 0) or 0)
-    if monthly_rent == 0 and sqft > 0:
-        monthly_rent = estimate_rent(sqft, beds, baths, year_built) * units
-    
-    if price == 0:
-        return {'dealScore': 0, 'capRate': 0, 'cashOnCash': 0, 'monthlyCashFlow': 0, 'monthlyMortgage': 0}
-    
-    # Assumptions
-    down_payment_pct = 0.25
-    interest_rate = 0.07
-    loan_term = 30
-    vacancy_rate = 0.08
-    maintenance_pct = 0.01
-    capex_pct = 0.01
-    management_pct = 0.10
-    insurance_rate = 0.005
-    
-    # Calculate loan
-    down_payment = price * down_payment_pct
-    loan_amount = price - down_payment
-    closing_costs = price * 0.03
-    total_cash = down_payment + closing_costs
-    
-    # Monthly mortgage
-    monthly_rate = interest_rate / 12
-    num_payments = loan_term * 12
-    if monthly_rate > 0:
-        monthly_mortgage = loan_amount * (monthly_rate * (1 + monthly_rate)**num_payments) / ((1 + monthly_rate)**num_payments - 1)
-    else:
-        monthly_mortgage = loan_amount / num_payments
-    
-    # Expenses
-    monthly_taxes = estimated_taxes / 12
-    monthly_insurance = (price * insurance_rate) / 12
-    monthly_maintenance = (price * maintenance_pct) / 12
-    monthly_capex = (price * capex_pct) / 12
-    monthly_management = monthly_rent * management_pct
-    total_expenses = monthly_taxes + monthly_insurance + hoa + monthly_maintenance + monthly_capex + monthly_management
-    
-    # Cash flow
-    effective_income = monthly_rent * (1 - vacancy_rate)
-    monthly_noi = effective_income - total_expenses
-    annual_noi = monthly_noi * 12
-    monthly_cash_flow = monthly_noi - monthly_mortgage
-    annual_cash_flow = monthly_cash_flow * 12
-    
-    # Returns
-    cap_rate = annual_noi / price if price > 0 else 0
-    cash_on_cash = annual_cash_flow / total_cash if total_cash > 0 else 0
-    dscr = annual_noi / (monthly_mortgage * 12) if monthly_mortgage > 0 else 0
-    one_pct_rule = monthly_rent / price if price > 0 else 0
-    
-    # Deal score
-    deal_score = 0
-    if cash_on_cash >= 0.12: deal_score += 30
-    elif cash_on_cash >= 0.08: deal_score += 20
-    elif cash_on_cash >= 0.05: deal_score += 10
-    
-    if cap_rate >= 0.08: deal_score += 25
-    elif cap_rate >= 0.06: deal_score += 15
-    elif cap_rate >= 0.04: deal_score += 5
-    
-    if dscr >= 1.5: deal_score += 20
-    elif dscr >= 1.25: deal_score += 15
-    elif dscr >= 1.0: deal_score += 5
-    
-    if one_pct_rule >= 0.01: deal_score += 15
-    elif one_pct_rule >= 0.008: deal_score += 8
-    
-    if monthly_cash_flow >= 300: deal_score += 10
-    elif monthly_cash_flow >= 200: deal_score += 5
-    
-    return {
-        'dealScore': deal_score,
-        'capRate': round(cap_rate, 4),
-        'cashOnCash': round(cash_on_cash, 4),
-        'monthlyCashFlow': round(monthly_cash_flow, 2),
-        'monthlyMortgage': round(monthly_mortgage, 2),
-        'dscr': round(dscr, 2),
-        'monthlyRent': round(monthly_rent, 2),
+# Listing response formats and their media types
+RESPONSE_FORMATS = {
+    'json': 'application/json',
+    'columnar': 'application/json',
+    'msgpack': 'application/x-msgpack',
+}
+
+# Columns of the map payload: (name, listing row key, dtype). The analysis
+# metrics below are appended after them.
+MAP_COLUMNS = (
+    ('id', 'id', np.int32),
+    ('latitude', 'latitude', np.float32),
+    ('longitude', 'longitude', np.float32),
+    ('price', 'price', np.float32),
+    ('beds', 'beds', np.int32),
+    ('baths', 'baths', np.float32),
+    ('sqft', 'sqft', np.int32),
+)
+MAP_METRICS = (
+    ('dealScore', 'deal_score', np.int32),
+    ('capRate', 'cap_rate', np.float32),
+    ('cashOnCash', 'cash_on_cash', np.float32),
+    ('monthlyCashFlow', 'monthly_cash_flow', np.float32),
+)
+
+
+def map_columns(props: list, assumptions: Optional[AnalysisAssumptions] = None,
+                result: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """Typed struct-of-arrays view of listing rows and their analysis (computed unless given)"""
+    columns = {name: _column(props, key, 0).astype(dtype) for name, key, dtype in MAP_COLUMNS}
+    if result is None:
+        result = analyze_rows(props, assumptions, LISTING_ANALYSIS_FIELDS)
+    columns.update({name: result[key].astype(dtype) for name, key, dtype in MAP_METRICS})
+    return columns
+
+
+def encode_properties(props: list, assumptions: Optional[AnalysisAssumptions], response_format: str) -> bytes:
+    """
+    Encode one page of listing rows.
+    json is the usual array of property objects. columnar and msgpack carry
+    {count, dtypes, columns}: columnar as JSON arrays, msgpack with each
+    column as raw little-endian bytes that can back a typed array directly.
+    """
+    if response_format == 'json':
+        # Rows already come back in the frontend's shape; attach analysis.
+        with phase('analysis'):
+            props = to_frontend_properties(props, assumptions)
+        with phase('encode'):
+            return dump_json(props)
+    with phase('analysis'):
+        columns = map_columns(props, assumptions)
+    with phase('encode'):
+        return encode_columns(columns, response_format)
+
+
+def encode_page(props: list, assumptions: Optional[AnalysisAssumptions], response_format: str,
+                encoding: Optional[str]) -> tuple:
+    """encode_properties plus the compressed variant the client will get, in one offloadable call"""
+    body = encode_properties(props, assumptions, response_format)
+    return body, compressed_variants(body, encoding)
+
+
+def encode_columns(columns: Dict[str, np.ndarray], response_format: str) -> bytes:
+    """Encode map columns as columnar JSON or msgpack"""
+    payload = {
+        'count': len(columns['id']),
+        'dtypes': {name: values.dtype.name for name, values in columns.items()},
     }
+    if response_format == 'columnar':
+        return dump_json({**payload, 'columns': columns})
+    return msgpack.packb({
+        **payload,
+        'columns': {name: values.astype(values.dtype.newbyteorder('<')).tobytes()
+                    for name, values in columns.items()},
+    })
+
+
+def properties_response(request: Request, body: bytes, next_cursor: Optional[str], response_format: str,
+                        etag: Optional[str], compressed: Dict[str, bytes]) -> Response:
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return send(request, body, RESPONSE_FORMATS[response_format], etag, headers, compressed)
+
+
+async def stream_ndjson(query: str, params: list, assumptions: Optional[AnalysisAssumptions] = None):
+    """Analyze and serialize each cursor batch as soon as Postgres returns it."""
+    try:
+        async for batch in stream_properties(query, params, STREAM_BATCH_SIZE):
+            yield b''.join(
+                dump_json(prop) + b'\n' for prop in to_frontend_properties(batch, assumptions)
+            )
+    except Exception as e:
+        # Headers are already sent, so the status can't change; the client
+        # sees a truncated stream.
+        print(f"Database error while streaming: {e}")
+        raise
+
+
+def to_frontend_property(prop, assumptions: Optional[AnalysisAssumptions] = None) -> dict:
+    """Attach investment analysis to a listing row (see database.PROPERTY_COLUMNS)."""
+    return to_frontend_properties([prop], assumptions)[0]
+
+
+def to_frontend_properties(props: list, assumptions: Optional[AnalysisAssumptions] = None) -> List[dict]:
+    """
+    Attach investment analysis to listing rows in one batch.
+    The rows are already aliased to the frontend's field names in SQL, so
+    each one is copied once into its response dict and never renamed.
+    """
+    analyses = calculate_properties_analysis(props, assumptions)
+    return [{**prop, 'analysis': analysis} for prop, analysis in zip(props, analyses)]
+
+
+def _column(props: list, key: str, default: float) -> np.ndarray:
+    """Pull one column out of a list of rows as a float array, filling NULLs."""
+    return np.fromiter(
+        (float(v) if (v := prop.get(key)) is not None else default for prop in props),
+        dtype=np.float64,
+        count=len(props),
+    )
+
+
+# Row key and NULL fallback for each analyze_batch input, plus the
+# RENT_LOCATION_FIELDS the local rent rate is looked up by. Internal queries
+# (heatmap, stored analysis, tiles) return DB column names; listing rows use
+# the frontend aliases from database.PROPERTY_COLUMNS.
+RENT_LOCATION_FIELDS = ('latitude', 'longitude', 'zip', 'home_type')
+DB_ANALYSIS_FIELDS = {
+    'price': ('price', 0),
+    'estimated_taxes': ('estimated_taxes', 0),
+    'hoa': ('hoa', 0),
+    'estimated_monthly_rent': ('estimated_monthly_rent', 0),
+    'sqft': ('square_foot', 0),
+    'beds': ('bed', 0),
+    'baths': ('bath', 0),
+    'year_built': ('year_built', 2000),
+    'units': ('number_of_units', 1),
+    'latitude': ('latitude', math.nan),
+    'longitude': ('longitude', math.nan),
+    'zip': ('zip', ''),
+    'home_type': ('home_type', ''),
+}
+LISTING_ANALYSIS_FIELDS = {
+    'price': ('price', 0),
+    'estimated_taxes': ('estimatedTaxes', 0),
+    'hoa': ('hoa', 0),
+    'estimated_monthly_rent': ('estimatedMonthlyRent', 0),
+    'sqft': ('sqft', 0),
+    'beds': ('beds', 0),
+    'baths': ('baths', 0),
+    'year_built': ('yearBuilt', 2000),
+    'units': ('units', 1),
+    'latitude': ('latitude', math.nan),
+    'longitude': ('longitude', math.nan),
+    'zip': ('zip', ''),
+    'home_type': ('homeType', ''),
+}
+
+
+def analyze_rows(props: list, assumptions: Optional[AnalysisAssumptions] = None,
+                 fields: Dict[str, tuple] = DB_ANALYSIS_FIELDS) -> Dict[str, np.ndarray]:
+    """Run analyze_batch over rows whose keys are described by `fields`"""
+    columns = {
+        arg: _column(props, key, default) for arg, (key, default) in fields.items()
+        if arg not in RENT_LOCATION_FIELDS
+    }
+    return analyze_batch(
+        **columns, assumptions=assumptions or AnalysisAssumptions(),
+        rent_per_sqft=local_rent_per_sqft(props, fields), listing_rules=True,
+    )
+
+
+def local_rent_per_sqft(props: list, fields: Dict[str, tuple]) -> Optional[np.ndarray]:
+    """Local rent rate of each row (NaN where unknown), or None before the rent table is loaded"""
+    if not comps.rent_table.entries:
+        return None
+    (lat_key, _), (lng_key, _), (zip_key, _), (home_type_key, _) = (
+        fields[field] for field in RENT_LOCATION_FIELDS
+    )
+    return comps.rent_table.rates(
+        _column(props, lat_key, math.nan),
+        _column(props, lng_key, math.nan),
+        [prop.get(zip_key) or '' for prop in props],
+        [prop.get(home_type_key) or '' for prop in props],
+    )
+
+
+def calculate_properties_analysis(props: list, assumptions: Optional[AnalysisAssumptions] = None) -> List[dict]:
+    """
+    Calculate investment metrics for listing rows (default assumptions if none given).
+    Results under custom assumptions are memoized per row in analysis_cache.
+    The key includes every analysis input, so an edited property misses
+    instead of returning a stale result.
+    """
+    if not props:
+        return []
+    if assumptions is None:
+        return format_analyses(analyze_rows(props, fields=LISTING_ANALYSIS_FIELDS))
+    
+    scenario = assumptions_key(assumptions)
+    inputs = [key for key, _ in LISTING_ANALYSIS_FIELDS.values()]
+    keys = [(scenario,) + tuple(prop.get(key) for key in inputs) for prop in props]
+    analyses = [analysis_cache.get(key) for key in keys]
+    missing = [i for i, analysis in enumerate(analyses) if analysis is None]
+    if missing:
+        computed = format_analyses(
+            analyze_rows([props[i] for i in missing], assumptions, LISTING_ANALYSIS_FIELDS)
+        )
+        for i, analysis in zip(missing, computed):
+            analyses[i] = analysis
+            analysis_cache.set(keys[i], analysis)
+    return analyses
+
+
+def format_analyses(result: Dict[str, np.ndarray]) -> List[dict]:
+    """Round analyze_batch columns into the per-property analysis dicts"""
+    columns = zip(
+        result['deal_score'].tolist(),
+        np.round(result['cap_rate'], 4).tolist(),
+        np.round(result['cash_on_cash'], 4).tolist(),
+        np.round(result['monthly_cash_flow'], 2).tolist(),
+        np.round(result['monthly_mortgage'], 2).tolist(),
+        np.round(result['dscr'], 2).tolist(),
+        np.round(result['monthly_rent'], 2).tolist(),
+    )
+    return [
+        {
+            'dealScore': deal_score,
+            'capRate': cap_rate,
+            'cashOnCash': cash_on_cash,
+            'monthlyCashFlow': monthly_cash_flow,
+            'monthlyMortgage': monthly_mortgage,
+            'dscr': dscr,
+            'monthlyRent': monthly_rent,
+        }
+        for deal_score, cap_rate, cash_on_cash, monthly_cash_flow, monthly_mortgage, dscr, monthly_rent in columns
+    ]
+
+
+def calculate_property_analysis(prop: dict, assumptions: Optional[AnalysisAssumptions] = None) -> dict:
+    """Calculate investment metrics for a property"""
+    return calculate_properties_analysis([prop], assumptions)[0]
 
 
 @app.get("/api/properties/{property_id}")
-async def get_property(property_id: int):
+async def get_property(
+    request: Request,
+    property_id: int,
+    assumptions: Optional[str] = Query(None, description="Analysis overrides, e.g. dp:0.2,ir:0.065"),
+):
     """Get a single property by ID."""
+    overrides = parse_assumptions(assumptions)
+    etag = data_etag(request)
+    if matched := matching_etag(request, etag):
+        return not_modified(matched)
     try:
         prop = await fetch_property_by_id(property_id)
         if not prop:
             raise HTTPException(status_code=404, detail="Property not found")
 
         # Attach analysis and rename fields to match the list endpoint's shape.
-        return to_frontend_property(dict(prop))
-    except HTTPException:
+        return send(request, dump_json(to_frontend_property(prop, overrides)), 'application/json', etag)
+    except (HTTPException, PoolBusyError):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# PropertyCreate fields whose DB column has a different name
+_MODEL_TO_DB = {
+    'sqft': 'square_foot',
+    'beds': 'bed',
+    'baths': 'bath',
+    'price_per_sqft': 'price_per_square_foot',
+    'units': 'number_of_units',
+}
+
+
+def property_to_db(property: PropertyCreate) -> dict:
+    """Convert a validated PropertyCreate to DB column names."""
+    return {_MODEL_TO_DB.get(key, key): value for key, value in property.model_dump().items()}
+
+
+def invalidate_derived_data():
+    """Drop cached responses, tiles and the heatmap after a bulk change."""
+    global _heatmap
+    data_version.bump()
+    property_cache.clear()
+    tile_cache.clear()
+    _heatmap = None
+
+
+def on_data_change(payload: str):
+    """
+    Notification callback for every committed listing change, including
+    those made by other API processes, bulk SQL or psql, and for stored
+    analysis rewrites ('analysis', which move pages filtered or sorted by
+    deal score): ETags and cached responses from before it must not be
+    served any more.
+    """
+    if json.loads(payload)['op'] == 'bulk':
+        invalidate_derived_data()
+    else:
+        data_version.bump()
+        property_cache.clear()
+        tile_cache.clear()
+
+
 @app.post("/api/properties")
 async def create_property(property: PropertyCreate):
-    """Create a new property (for off-market uploads)."""
+    """Create a new property (for off-market uploads). 409 if its address and zip exist."""
     try:
-        property_id = await insert_property(property.model_dump())
+        property_id = await insert_property(property_to_db(property))
+        # Any cached viewport might now be missing this property
+        data_version.bump()
+        property_cache.clear()
+        tile_cache.clear()
+        if property.for_sale:
+            # Folded into the heatmap in the background; that can't fail the create
+            _heatmap_pending.add(property_id)
+            run_in_background(match_saved_searches([property_id]))
+        run_in_background(refresh_stored_analysis())
         return {"id": property_id, "message": "Property created successfully"}
+    except PoolBusyError:
+        raise
+    except asyncpg.UniqueViolationError:
+        raise HTTPException(status_code=409, detail="A property with this address and zip already exists")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+BULK_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+
+async def iter_body_lines(request: Request):
+    """Yield decoded lines from a streamed request body."""
+    buffer = b''
+    first = True
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            text = line.decode('utf-8').rstrip('\r')
+            if first:
+                text, first = text.lstrip('\ufeff'), False
+            yield text
+    if buffer:
+        text = buffer.decode('utf-8').rstrip('\r')
+        yield text.lstrip('\ufeff') if first else text
+
+
+async def iter_bulk_rows(request: Request, body_format: str):
+    """Yield (row number, raw dict) pairs from a CSV or NDJSON body."""
+    header = None
+    row_number = 0
+    # Physical lines of the CSV record being read: a quoted field (a feed's
+    # description, say) may span lines, and its quotes are still unbalanced
+    record = []
+    quotes = 0
+    async for line in iter_body_lines(request):
+        if body_format == 'csv':
+            record.append(line)
+            quotes += line.count('"')
+            if quotes % 2:
+                continue
+            text = '\n'.join(record)
+            record, quotes = [], 0
+            if not text.strip():
+                continue
+            values = next(csv.reader([text]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            row_number += 1
+            # Empty CSV cells mean "not provided" so model defaults apply
+            yield row_number, {k: v for k, v in zip(header, values) if v != ''}
+        elif line.strip():
+            row_number += 1
+            try:
+                yield row_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row_number, e
+    if record:
+        yield row_number + 1, csv.Error('unterminated quoted field at end of body')
+
+
+def validate_bulk_batch(batch: list, errors: list) -> list:
+    """Validate raw rows against PropertyCreate, returning (row number, COPY-ready record) pairs."""
+    records = []
+    for row_number, raw in batch:
+        if isinstance(raw, Exception):
+            errors.append({'row': row_number, 'errors': [{'loc': [], 'msg': str(raw)}]})
+            continue
+        try:
+            data = property_to_db(PropertyCreate.model_validate(raw))
+        except ValidationError as e:
+            errors.append({
+                'row': row_number,
+                'errors': [{'loc': list(err['loc']), 'msg': err['msg']} for err in e.errors()],
+            })
+            continue
+        records.append((row_number, tuple(data.get(column) for column in BULK_COLUMNS)))
+    return records
+
+
+async def upsert_bulk_batch(records: list, errors: list) -> tuple:
+    """
+    Upsert validated (row number, record) pairs. A batch the database still
+    rejects (a value validation can't see, like an overflowing price per
+    sqft) is split in halves until the failing rows are found, so they are
+    reported by row number and the rest of the batch loads.
+    """
+    try:
+        return await bulk_upsert_properties([record for _, record in records])
+    except asyncpg.DataError as e:
+        if len(records) == 1:
+            errors.append({'row': records[0][0], 'errors': [{'loc': [], 'msg': str(e)}]})
+            return 0, 0, []
+    middle = len(records) // 2
+    first_inserted, first_updated, first_ids = await upsert_bulk_batch(records[:middle], errors)
+    inserted, updated, ids = await upsert_bulk_batch(records[middle:], errors)
+    return first_inserted + inserted, first_updated + updated, first_ids + ids
+
+
+@app.post("/api/properties/bulk")
+async def bulk_create_properties(
+    request: Request,
+    format: Optional[str] = Query(None, description="'csv' or 'ndjson'; defaults from Content-Type"),
+):
+    """
+    Bulk load properties from a streamed CSV (with a header row of
+    PropertyCreate field names) or NDJSON body. Rows are validated in
+    batches, COPYed into a staging table and upserted on (address, zip).
+    Invalid rows, including values the database rejects, are skipped and
+    reported by row number.
+    """
+    body_format = format
+    if body_format is None:
+        content_type = request.headers.get('content-type', '')
+        body_format = 'csv' if 'csv' in content_type else 'ndjson'
+    if body_format not in ('csv', 'ndjson'):
+        raise HTTPException(status_code=400, detail="Unsupported format, use 'csv' or 'ndjson'")
+    
+    received = inserted = updated = 0
+    errors = []
+    batch = []
+    
+    async def flush():
+        nonlocal inserted, updated
+        records = validate_bulk_batch(batch, errors)
+        batch.clear()
+        if records:
+            batch_inserted, batch_updated, ids = await upsert_bulk_batch(records, errors)
+            inserted += batch_inserted
+            updated += batch_updated
+            run_in_background(match_saved_searches(ids))
+    
+    try:
+        async for row in iter_bulk_rows(request, body_format):
+            received += 1
+            batch.append(row)
+            if len(batch) >= BULK_BATCH_SIZE:
+                await flush()
+        await flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Malformed body: {e}")
+    except PoolBusyError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if inserted or updated:
+            invalidate_derived_data()
+            run_in_background(refresh_stored_analysis())
+    
+    return {
+        "received": received,
+        "inserted": inserted,
+        "updated": updated,
+        "failed": len(errors),
+        "errors": errors[:MAX_REPORTED_ERRORS],
+    }
+
+
 @app.get("/api/stats")
-async def get_stats():
+async def get_stats(request: Request):
     """Get aggregate statistics for the database"""
+    etag = data_etag(request)
+    if matched := matching_etag(request, etag):
+        return not_modified(matched)
     try:
         stats = await get_property_stats()
-        return stats
+        return send(request, dump_json(stats), 'application/json', etag)
+    except PoolBusyError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Region levels of /api/stats/breakdown and the summary columns keying them
+BREAKDOWN_LEVELS = {
+    'state': ('state',),
+    'city': ('state', 'city'),
+    'zip': ('state', 'zip'),
+    'home_type': ('home_type',),
+}
+BREAKDOWN_METRICS = ('price', 'price_per_sqft', 'rent', 'deal_score')
+
+
+def summarize_region(rows: list) -> dict:
+    """Counts, averages and median / p90 of each metric over summary rows"""
+    listings = sum(row['listings'] for row in rows)
+    price_per_sqft_count = sum(row['price_per_sqft_count'] for row in rows)
+    summary = {
+        'listings': listings,
+        'avg_price': round(sum(row['price_sum'] for row in rows) / listings, 2),
+        'avg_price_per_sqft': round(
+            sum(row['price_per_sqft_sum'] for row in rows) / price_per_sqft_count, 2
+        ) if price_per_sqft_count else None,
+    }
+    for metric in BREAKDOWN_METRICS:
+        merged = sketch.merge(orjson.loads(row[f'{metric}_sketch']) for row in rows)
+        summary[metric] = {
+            name: None if (value := sketch.quantile(merged, q)) is None else round(value, 2)
+            for name, q in (('median', 0.5), ('p90', 0.9))
+        }
+    return summary
+
+
+@app.get("/api/stats/breakdown")
+async def get_stats_breakdown(
+    request: Request,
+    by: str = Query('state', description="'state', 'city', 'zip' or 'home_type'"),
+    for_sale: Optional[bool] = Query(None, description="Only listings with this for-sale flag"),
+    state: Optional[str] = Query(None, description="Only regions in this state"),
+):
+    """
+    Listing counts, averages and median / p90 price, price per sqft, rent and
+    deal score per region, largest first. Computed from the market_stats
+    summary, so the cost depends on the number of regions, not listings;
+    percentiles are within about 1%. Deal scores are the stored analysis.
+    """
+    if by not in BREAKDOWN_LEVELS:
+        raise HTTPException(status_code=400, detail="Unsupported breakdown, use 'state', 'city', 'zip' or 'home_type'")
+    etag = data_etag(request)
+    if matched := matching_etag(request, etag):
+        return not_modified(matched)
+    try:
+        rows = await fetch_market_stats(for_sale, state)
+    except PoolBusyError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    keys = BREAKDOWN_LEVELS[by]
+    regions: Dict[tuple, list] = {}
+    for row in rows:
+        regions.setdefault(tuple(row[key] for key in keys), []).append(row)
+    breakdown = [
+        {**dict(zip(keys, region)), **summarize_region(region_rows)}
+        for region, region_rows in regions.items()
+    ]
+    breakdown.sort(key=lambda region: region['listings'], reverse=True)
+    return send(request, dump_json(breakdown), 'application/json', etag)
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Cache hit/miss counters and sizes, plus hot set and live stream state"""
+    return {
+        'properties': property_cache.stats(),
+        'tiles': tile_cache.stats(),
+        'analysis': analysis_cache.stats(),
+        'hot_set': hot_set_stats(),
+        'stream': change_feed.stats(),
+        'saved_searches': saved_search_stats(),
+    }
+
+# ============ METRICS ============
+
+# Request and phase histograms are recorded by metrics.py; these are read
+# when /metrics is scraped.
+CACHES = {'properties': property_cache, 'tiles': tile_cache, 'analysis': analysis_cache}
+
+
+def pool_connections() -> list:
+    samples = []
+    for name, pool in (('primary', database.pool), ('replica', database.replica_pool)):
+        if pool is None:
+            continue
+        size, idle = pool.get_size(), pool.get_idle_size()
+        samples += [
+            ((name, 'total'), size), ((name, 'idle'), idle), ((name, 'in_use'), size - idle),
+            ((name, 'min'), pool.get_min_size()), ((name, 'max'), pool.get_max_size()),
+        ]
+    return samples
+
+
+def cache_stat(key: str):
+    return lambda: [((name,), cache.stats()[key]) for name, cache in CACHES.items()]
+
+
+CallbackMetric('dealfinder_db_pool_connections', 'asyncpg pool connections by state', ('pool', 'state'),
+               pool_connections)
+CallbackMetric('dealfinder_db_pool_waiting', 'Requests waiting for a pooled connection', ('pool',),
+               lambda: [((name,), waiting) for name, waiting in database.acquire_waiting.items()])
+CallbackMetric('dealfinder_cache_hits_total', 'Cache hits', ('cache',), cache_stat('hits'), kind='counter')
+CallbackMetric('dealfinder_cache_misses_total', 'Cache misses', ('cache',), cache_stat('misses'), kind='counter')
+CallbackMetric('dealfinder_cache_hit_ratio', 'Cache hits per lookup since start', ('cache',), cache_stat('hit_ratio'))
+CallbackMetric('dealfinder_cache_entries', 'Cached entries', ('cache',), cache_stat('entries'))
+CallbackMetric('dealfinder_hot_set_rows', 'Listings held in the hot set', (),
+               lambda: [((), _hot_set.stats()['rows'])] if _hot_set is not None else [])
+CallbackMetric('dealfinder_event_loop_lag_max_seconds', 'Largest event loop lag since start', (),
+               lambda: [((), loop_lag['max_seconds'])])
+CallbackMetric('dealfinder_stream_subscribers', 'Connected /api/stream clients', (),
+               lambda: [((), len(change_feed.subscriptions))])
+CallbackMetric('dealfinder_saved_searches', 'Saved searches in the match index', (),
+               lambda: [((), saved_search_stats().get('searches', 0))])
+CallbackMetric('dealfinder_saved_search_matches_total', 'New saved search matches recorded', (),
+               lambda: [((), _search_match_stats['matches'])], kind='counter')
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of request, database and cache metrics"""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# ============ TOP DEALS ============
+
+# Deal score only grows with the rent-to-price ratio and is highest with no
+# taxes, HOA or rehab, so scoring a synthetic zero-expense property at a
+# given ratio bounds every real property at or below that ratio. Candidates
+# are read best-bound first and the scan stops once the bound can no longer
+# beat the current top N.
+DEAL_CANDIDATE_BATCH_SIZE = 500
+# Large enough that the absolute monthly cash flow tiers never limit the bound
+_BOUND_PRICE = 1e9
+# Slack on the cash on cash bound for float error between price scales
+_BOUND_CASH_ON_CASH_SLACK = 1e-9
+
+
+def _bound_analysis(rent_to_price: float, assumptions: AnalysisAssumptions) -> Dict[str, np.ndarray]:
+    """Analysis of the zero-expense property at this rent/price ratio"""
+    return analyze_batch(
+        price=[_BOUND_PRICE],
+        estimated_taxes=[0],
+        hoa=[0],
+        estimated_monthly_rent=[rent_to_price * _BOUND_PRICE],
+        sqft=[0],
+        beds=[0],
+        baths=[0],
+        year_built=[0],
+        units=[1],
+        assumptions=assumptions.model_copy(update={'rehab_budget': 0, 'estimated_rent': None}),
+        listing_rules=True,
+    )
+
+
+def deal_score_upper_bound(rent_to_price: float, assumptions: AnalysisAssumptions) -> int:
+    """Best deal score any property with this rent/price ratio can reach"""
+    return int(_bound_analysis(rent_to_price, assumptions)['deal_score'][0])
+
+
+def deal_rank_upper_bound(rent_to_price: float, assumptions: AnalysisAssumptions) -> tuple:
+    """
+    Best (deal score, cash on cash) ranking key any property with this
+    rent/price ratio can reach. Positive cash on cash falls with expenses
+    and rehab just like the score, so the zero-expense property bounds
+    both; a negative one can rise with rehab, hence the floor at zero.
+    """
+    result = _bound_analysis(rent_to_price, assumptions)
+    cash_on_cash = max(float(result['cash_on_cash'][0]), 0.0)
+    return int(result['deal_score'][0]), cash_on_cash + _BOUND_CASH_ON_CASH_SLACK
+
+
+def min_ratio_for_score(min_score: int, assumptions: AnalysisAssumptions) -> Optional[float]:
+    """Smallest rent/price ratio whose upper bound reaches min_score, None if unreachable"""
+    low, high = 0.0, 1.0
+    if deal_score_upper_bound(high, assumptions) < min_score:
+        return None
+    for _ in range(40):
+        mid = (low + high) / 2
+        if deal_score_upper_bound(mid, assumptions) >= min_score:
+            high = mid
+        else:
+            low = mid
+    return low
+
+
+def rent_bound(assumptions: AnalysisAssumptions) -> dict:
+    """Parameters of the SQL rent upper bound, taken from the rent model"""
+    return {
+        'fixed_rent': assumptions.estimated_rent or None,
+        # The highest local rate bounds every row's rate from above
+        'rent_per_sqft': max(BASE_RENT_PER_SQFT, comps.rent_table.max_rate or 0) * max(
+            NEW_BUILD_RENT_FACTOR, MID_AGE_RENT_FACTOR, OLD_BUILD_RENT_FACTOR
+        ),
+        'rent_per_bed': RENT_PER_EXTRA_BED,
+        'rent_per_bath': RENT_PER_EXTRA_BATH,
+    }
+
+
+async def find_top_deals(request: TopDealsRequest) -> dict:
+    """Return the N highest-scoring properties, analyzing as few as possible"""
+    assumptions = request.assumptions
+    min_ratio = 0.0
+    if request.min_deal_score is not None:
+        min_ratio = min_ratio_for_score(request.min_deal_score, assumptions)
+        if min_ratio is None:
+            return {"deals": [], "examined": 0}
+    
+    bbox = None
+    if request.bbox is not None:
+        bbox = (request.bbox.north, request.bbox.south, request.bbox.east, request.bbox.west)
+    filters = request.model_dump(include={'status', 'home_type', 'min_price', 'max_price', 'min_beds'})
+    bound = rent_bound(assumptions)
+    
+    # Min-heap of the best N so far: (deal score, cash on cash, id, row)
+    heap = []
+    examined = 0
+    after = None
+    while True:
+        rows = await fetch_deal_candidates(
+            bbox, filters, bound, min_ratio, DEAL_CANDIDATE_BATCH_SIZE, after
+        )
+        if not rows:
+            break
+        examined += len(rows)
+        
+        result = analyze_rows(rows, assumptions, LISTING_ANALYSIS_FIELDS)
+        for row, score, cash_on_cash in zip(rows, result['deal_score'].tolist(),
+                                            result['cash_on_cash'].tolist()):
+            if request.min_deal_score is not None and score < request.min_deal_score:
+                continue
+            entry = (score, cash_on_cash, row['id'], row)
+            if len(heap) < request.n:
+                heapq.heappush(heap, entry)
+            elif entry[:3] > heap[0][:3]:
+                heapq.heapreplace(heap, entry)
+        
+        last = rows[-1]
+        after = (last['ratio_bound'], last['id'])
+        # Every remaining row is bounded by the last ratio read. Stop only once
+        # none can outrank the worst kept deal, cash on cash tiebreak included.
+        if len(heap) == request.n and heap[0][:2] > deal_rank_upper_bound(last['ratio_bound'], assumptions):
+            break
+        if len(rows) < DEAL_CANDIDATE_BATCH_SIZE:
+            break
+    
+    best = [entry[3] for entry in sorted(heap, key=lambda entry: entry[:3], reverse=True)]
+    deals = to_frontend_properties(best, assumptions)
+    for deal in deals:
+        del deal['ratio_bound']
+    return {"deals": deals, "examined": examined}
+
+
+@app.get("/api/deals/top")
+async def get_top_deals(
+    north: Optional[float] = Query(None, description="North boundary latitude"),
+    south: Optional[float] = Query(None, description="South boundary latitude"),
+    east: Optional[float] = Query(None, description="East boundary longitude"),
+    west: Optional[float] = Query(None, description="West boundary longitude"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    home_type: Optional[str] = Query(None, description="Filter by home type"),
+    min_price: Optional[float] = Query(None, description="Minimum price"),
+    max_price: Optional[float] = Query(None, description="Maximum price"),
+    min_beds: Optional[int] = Query(None, description="Minimum bedrooms"),
+    min_deal_score: Optional[int] = Query(None, description="Minimum deal score"),
+    n: int = Query(20, ge=1, le=1000, description="Number of deals to return"),
+):
+    """Top N for-sale deals under the default assumptions."""
+    bbox = None
+    if all(v is not None for v in (north, south, east, west)):
+        bbox = BoundingBox(north=north, south=south, east=east, west=west)
+    request = TopDealsRequest(
+        bbox=bbox, status=status, home_type=home_type, min_price=min_price,
+        max_price=max_price, min_beds=min_beds, min_deal_score=min_deal_score, n=n,
+    )
+    return await post_top_deals(request)
+
+
+@app.post("/api/deals/top")
+async def post_top_deals(request: TopDealsRequest):
+    """
+    Top N for-sale deals under custom assumptions.
+    Returns the deals (best first) and how many candidates were analyzed.
+    """
+    try:
+        return await find_top_deals(request)
+    except PoolBusyError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ============ STORED ANALYSIS ============
+
+# deal_score, cap_rate, cash_on_cash and monthly_cash_flow are stored per row
+# under the default assumptions so they can be filtered and sorted in SQL.
+# Rows with a NULL analysis_version are (re)computed here in batches.
+ANALYSIS_BATCH_SIZE = 5000
+
+_analysis_lock = asyncio.Lock()
+_background_tasks = set()
+
+
+def run_in_background(coro):
+    """Schedule a coroutine, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def analysis_version() -> str:
+    """Identifies the default assumptions, rent model year and rent table stored analysis uses"""
+    payload = json.dumps(
+        [AnalysisAssumptions().model_dump(), date.today().year, comps.rent_table.version], sort_keys=True
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+async def refresh_stored_analysis() -> int:
+    """Recompute stored analysis for every stale row. Returns rows updated."""
+    version = analysis_version()
+    updated = 0
+    async with _analysis_lock:
+        while True:
+            rows = await fetch_unanalyzed_rows(ANALYSIS_BATCH_SIZE)
+            if not rows:
+                break
+            result = await offload.run(analyze_rows, offload.rows(rows), size=len(rows))
+            await store_analysis(
+                version,
+                [row['id'] for row in rows],
+                result['deal_score'].tolist(),
+                result['cap_rate'].tolist(),
+                result['cash_on_cash'].tolist(),
+                result['monthly_cash_flow'].tolist(),
+            )
+            updated += len(rows)
+            # A listing may now pass (or fail) saved searches on deal score.
+            # Rows never analyzed are new and matched where they were created.
+            rescored = [
+                row['id'] for row, score in zip(rows, result['deal_score'].tolist())
+                if row['deal_score'] is not None and row['deal_score'] != score
+            ]
+            if rescored:
+                run_in_background(match_saved_searches(rescored))
+    if updated:
+        # Filtered and score-sorted responses may have changed
+        data_version.bump()
+        property_cache.clear()
+    return updated
+
+
+async def sync_stored_analysis():
+    """On startup, recompute analysis stored under older defaults or never computed"""
+    try:
+        await invalidate_stored_analysis(analysis_version())
+        updated = await refresh_stored_analysis()
+        print(f"✅ Stored analysis up to date ({updated} rows recomputed)")
+    except Exception as e:
+        print(f"⚠️ Stored analysis refresh failed: {e}")
+
+
+# ============ RENT COMPS ============
+
+# Local rent rates (comps.RentTable) replace the flat BASE_RENT_PER_SQFT in
+# the rent estimate wherever enough listings around a property have a rent.
+# The table is loaded at startup and the rent_rates view refreshed every
+# RENT_TABLE_REFRESH_SECONDS. Every refresh is announced on
+# RENT_RATES_CHANNEL, so all API processes reload the table, and a changed
+# table marks the stored analysis of every row stale.
+RENT_TABLE_REFRESH_SECONDS = float(os.getenv("RENT_TABLE_REFRESH_SECONDS", "86400"))
+MAX_COMPS = 50
+
+_rent_table_lock = asyncio.Lock()
+
+offload.share(comps, 'rent_table')
+
+
+async def load_rent_table() -> bool:
+    """Load rent_rates into memory. True if the table changed."""
+    table = comps.RentTable(await fetch_rent_rates())
+    if table.version == comps.rent_table.version:
+        return False
+    comps.rent_table = table
+    offload.restart()
+    print(f"🏘️ Rent table loaded: {table.entries} local rates")
+    return True
+
+
+async def apply_rent_table_change():
+    """Drop everything analyzed under the old rent table"""
+    analysis_cache.clear()
+    invalidate_derived_data()
+    if _hot_set is not None:
+        on_property_change(json.dumps({'op': 'bulk'}))
+    # Stored analysis is versioned by the rent table, so this marks every
+    # row analyzed under the old one stale and recomputes it
+    await sync_stored_analysis()
+
+
+async def reload_rent_table():
+    """Pick up a refreshed rent_rates, applying it if the rates changed"""
+    try:
+        async with _rent_table_lock:
+            if await load_rent_table():
+                await apply_rent_table_change()
+    except Exception as e:
+        print(f"⚠️ Rent table reload failed: {e}")
+
+
+def on_rent_rates_refresh(payload: str):
+    """Notification callback: some API process (or psql) refreshed rent_rates"""
+    run_in_background(reload_rent_table())
+
+
+async def run_rent_table():
+    """Refresh rent_rates periodically and pick up the new rates"""
+    while True:
+        await asyncio.sleep(RENT_TABLE_REFRESH_SECONDS)
+        try:
+            if await refresh_rent_rates():
+                await reload_rent_table()
+        except Exception as e:
+            print(f"⚠️ Rent table refresh failed: {e}")
+
+
+@app.get("/api/properties/{property_id}/comps")
+async def get_property_comps(
+    request: Request,
+    property_id: int,
+    limit: int = Query(10, ge=1, le=MAX_COMPS),
+    radius_km: float = Query(comps.COMP_MAX_DISTANCE_KM, gt=0, le=50),
+):
+    """
+    Comparable rentals for a property: the nearest listings with a rent of
+    the same home type and similar beds, baths and size, each weighted by
+    distance and listing age, with the rent they suggest. localRentPerSqft
+    is the rate the deal analysis uses (null where it uses the flat model).
+    """
+    etag = data_etag(request)
+    if matched := matching_etag(request, etag):
+        return not_modified(matched)
+    try:
+        prop = await fetch_property_by_id(property_id)
+        if not prop:
+            raise HTTPException(status_code=404, detail="Property not found")
+        
+        rows = []
+        if prop['latitude'] is not None and prop['longitude'] is not None:
+            ranges = comps.comp_ranges(prop['beds'], prop['baths'], prop['sqft'])
+            rows = await fetch_comps(
+                prop['latitude'], prop['longitude'], property_id, prop['homeType'],
+                ranges['beds'], ranges['baths'], ranges['sqft'], radius_km, limit,
+            )
+        local_rate = local_rent_per_sqft([prop], LISTING_ANALYSIS_FIELDS)
+        local_rate = None if local_rate is None or np.isnan(local_rate[0]) else round(local_rate[0].item(), 4)
+        return send(request, dump_json({
+            'id': property_id,
+            **comps.weigh_comps(prop, rows),
+            'localRentPerSqft': local_rate,
+        }), 'application/json', etag)
+    except (HTTPException, PoolBusyError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ============ SAVED SEARCHES ============
+
+# Saved searches live in saved_searches (12-saved-searches.sql) and in an
+# in-memory SearchIndex (savedsearch.py). Listings created or bulk loaded
+# through the API are matched against it in the background, and new
+# matches recorded in saved_search_matches for GET .../matches. Searches
+# created through another API process are picked up on the next reload,
+# every SAVED_SEARCH_RELOAD_SECONDS.
+SAVED_SEARCH_CELL_DEGREES = float(os.getenv("SAVED_SEARCH_CELL_DEGREES", "0.25"))
+SAVED_SEARCH_RELOAD_SECONDS = float(os.getenv("SAVED_SEARCH_RELOAD_SECONDS", "60"))
+MAX_SEARCH_MATCHES_PAGE = 500
+
+_saved_searches: Optional[SearchIndex] = None
+_search_match_stats = {'listings': 0, 'matches': 0, 'last_seconds': 0.0}
+
+
+def build_search_index(searches: list) -> SearchIndex:
+    """A SearchIndex of `searches`, returned rather than built in place so it survives a process worker"""
+    index = SearchIndex(SAVED_SEARCH_CELL_DEGREES)
+    index.load(searches)
+    return index
+
+
+async def load_saved_searches() -> SearchIndex:
+    searches = [dict(row) for row in await fetch_saved_searches()]
+    return await offload.run(build_search_index, searches, size=len(searches))
+
+
+async def run_saved_searches():
+    """Load the saved search index, then reload it periodically"""
+    global _saved_searches
+    while True:
+        try:
+            _saved_searches = await load_saved_searches()
+        except asyncpg.UndefinedTableError:
+            print("Saved searches disabled: apply init-db/12-saved-searches.sql")
+            return
+        except Exception as e:
+            print(f"⚠️ Saved search reload failed: {e}")
+        await asyncio.sleep(SAVED_SEARCH_RELOAD_SECONDS)
+
+
+def search_matches(index: SearchIndex, rows: list) -> tuple:
+    """(search ids, property ids) of the listing rows' matches, by default-assumption deal score"""
+    deal_scores = analyze_rows(rows, fields=LISTING_ANALYSIS_FIELDS)['deal_score']
+    return index.match(rows, deal_scores)
+
+
+async def match_saved_searches(property_ids: list):
+    """Match created or updated listings against the saved searches and record new matches"""
+    index = _saved_searches
+    if index is None or not property_ids:
+        return
+    started = time.perf_counter()
+    try:
+        for start in range(0, len(property_ids), BULK_BATCH_SIZE):
+            rows = await fetch_for_sale_rows(property_ids[start:start + BULK_BATCH_SIZE])
+            search_ids, matched_ids = await offload.run(
+                search_matches, index, offload.rows(rows), size=len(rows)
+            )
+            _search_match_stats['listings'] += len(rows)
+            if len(search_ids):
+                _search_match_stats['matches'] += await store_search_matches(
+                    search_ids.tolist(), matched_ids.tolist()
+                )
+    except Exception as e:
+        print(f"⚠️ Saved search matching failed: {e}")
+    _search_match_stats['last_seconds'] = time.perf_counter() - started
+
+
+def update_saved_searches(added: list = (), removed: list = ()):
+    """Apply a change to a copy of the index, leaving running matches on the old one"""
+    global _saved_searches
+    if _saved_searches is None:
+        return
+    index = _saved_searches.copy()
+    index.add(list(added))
+    index.remove(list(removed))
+    _saved_searches = index
+
+
+def saved_search_stats() -> dict:
+    stats = {'loaded': _saved_searches is not None}
+    if _saved_searches is not None:
+        stats.update(_saved_searches.stats())
+        stats.update(_search_match_stats)
+    return stats
+
+
+@app.post("/api/saved-searches", status_code=201)
+async def create_saved_search(search: SavedSearchCreate):
+    """Save a bbox + filter combination to be told about new matching listings"""
+    bbox = (search.north, search.south, search.east, search.west)
+    if any(v is None for v in bbox) and any(v is not None for v in bbox):
+        raise HTTPException(status_code=422, detail="Give all of north, south, east and west, or none")
+    if search.north is not None and (search.south > search.north or search.west > search.east):
+        raise HTTPException(status_code=422, detail="Bounding box needs south <= north and west <= east")
+    try:
+        row = dict(await insert_saved_search(search.model_dump()))
+    except (HTTPException, PoolBusyError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    update_saved_searches(added=[row])
+    return FastJSONResponse(row, status_code=201)
+
+
+@app.get("/api/saved-searches")
+async def list_saved_searches(owner: Optional[str] = Query(None)):
+    """Saved searches, optionally of one owner"""
+    try:
+        return FastJSONResponse([dict(row) for row in await fetch_saved_searches(owner)])
+    except PoolBusyError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.delete("/api/saved-searches/{search_id}")
+async def remove_saved_search(search_id: int):
+    """Delete a saved search and its matches"""
+    try:
+        deleted = await delete_saved_search(search_id)
+    except PoolBusyError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    update_saved_searches(removed=[search_id])
+    return {"id": search_id, "message": "Saved search deleted"}
+
+
+@app.get("/api/saved-searches/{search_id}/matches")
+async def get_saved_search_matches(
+    search_id: int,
+    limit: int = Query(100, ge=1, le=MAX_SEARCH_MATCHES_PAGE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+):
+    """
+    Listings that matched a saved search since it was saved, newest match
+    first, with their analysis and matchedAt. When more remain, the
+    X-Next-Cursor response header holds the cursor for the next page.
+    """
+    try:
+        before = int(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        if not await fetch_saved_search(search_id):
+            raise HTTPException(status_code=404, detail="Saved search not found")
+        rows = await fetch_search_matches(search_id, limit, before)
+    except (HTTPException, PoolBusyError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    headers = {'X-Next-Cursor': str(rows[-1]['matchId'])} if len(rows) == limit else {}
+    return Response(dump_json(to_frontend_properties(rows)), media_type="application/json", headers=headers)
+
+
+# ============ HOT SET ============
+
+# Opt-in in-memory index of the for-sale listings (see hotset.py). It is
+# loaded in the background at startup and kept current from the
+# property_changes notifications (07-change-notify.sql); changed ids are
+# collected and applied every HOT_SET_APPLY_SECONDS, bulk loads trigger a
+# full reload.
+HOT_SET_ENABLED = os.getenv("HOT_SET_ENABLED", "").lower() in ("1", "true", "yes")
+HOT_SET_APPLY_SECONDS = float(os.getenv("HOT_SET_APPLY_SECONDS", "1"))
+HOT_SET_CELL_DEGREES = float(os.getenv("HOT_SET_CELL_DEGREES", "0.05"))
+HOT_SET_LOAD_BATCH_SIZE = 5000
+
+_hot_set: Optional[HotSet] = None
+_hot_pending: set = set()
+_hot_reload = False
+_hot_pending_since: Optional[float] = None
+_hot_lag = {'last_seconds': 0.0, 'max_seconds': 0.0}
+
+
+def listing_bodies(rows: list, result: Dict[str, np.ndarray]) -> List[bytes]:
+    """Encoded frontend JSON of each listing row with its analysis"""
+    return [
+        dump_json({**row, 'analysis': analysis})
+        for row, analysis in zip(rows, format_analyses(result))
+    ]
+
+
+def hot_set_batch(rows: list) -> tuple:
+    """Default analysis, encoded bodies and map columns for a batch of listing rows"""
+    result = analyze_rows(rows, fields=LISTING_ANALYSIS_FIELDS)
+    return rows, result, listing_bodies(rows, result), map_columns(rows, result=result)
+
+
+async def load_hot_set() -> HotSet:
+    hot = HotSet(HOT_SET_CELL_DEGREES)
+    query, params = build_for_sale_query()
+    hot.load([
+        await offload.run(hot_set_batch, offload.rows(rows), size=len(rows))
+        async for rows in stream_properties(query, params, HOT_SET_LOAD_BATCH_SIZE)
+    ])
+    return hot
+
+
+def on_property_change(payload: str):
+    """Notification callback: queue the change for the next apply"""
+    global _hot_reload, _hot_pending_since
+    change = json.loads(payload)
+    if change['op'] == 'analysis':
+        # The hot set analyzes listings itself
+        return
+    if change['op'] == 'bulk':
+        _hot_reload = True
+    else:
+        _hot_pending.add(change['id'])
+    if _hot_pending_since is None:
+        _hot_pending_since = time.monotonic()
+
+
+async def apply_hot_set_changes():
+    global _hot_set, _hot_reload, _hot_pending_since
+    reload, ids, since = _hot_reload, list(_hot_pending), _hot_pending_since
+    _hot_reload = False
+    _hot_pending.clear()
+    _hot_pending_since = None
+    
+    if reload:
+        _hot_set = await load_hot_set()
+    else:
+        rows = await fetch_for_sale_rows(ids)
+        found = {row['id'] for row in rows}
+        _hot_set.apply(*hot_set_batch(rows), removed_ids=[i for i in ids if i not in found])
+    
+    lag = time.monotonic() - since
+    _hot_lag['last_seconds'] = lag
+    _hot_lag['max_seconds'] = max(_hot_lag['max_seconds'], lag)
+    # Changes may come from other processes, so drop derived caches here too
+    data_version.bump()
+    property_cache.clear()
+    tile_cache.clear()
+
+
+async def run_hot_set():
+    """Load the hot set, then keep applying queued changes"""
+    global _hot_set
+    try:
+        # Listen before loading so changes made during the load aren't missed
+        await start_change_listener(on_property_change)
+        started = time.perf_counter()
+        _hot_set = await load_hot_set()
+        print(f"🔥 Hot set loaded: {_hot_set.stats()['rows']} listings "
+              f"in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"Hot set load failed, serving from the database: {e}")
+        return
+    
+    while True:
+        await asyncio.sleep(HOT_SET_APPLY_SECONDS)
+        if not (_hot_reload or _hot_pending):
+            continue
+        try:
+            await apply_hot_set_changes()
+        except Exception as e:
+            print(f"Hot set refresh failed: {e}")
+
+
+def hot_set_stats() -> dict:
+    stats = {'enabled': HOT_SET_ENABLED, 'loaded': _hot_set is not None}
+    if _hot_set is not None:
+        stats.update(_hot_set.stats())
+        stats.update(_hot_lag)
+        stats['pending'] = len(_hot_pending) + int(_hot_reload)
+    return stats
+
+
+# ============ LIVE CHANGE FEED ============
+
+# /api/stream pushes listing changes to subscribed clients as Server-Sent
+# Events (see changefeed.py). The notification listener and flush loop start
+# with the first subscriber.
+STREAM_FLUSH_SECONDS = float(os.getenv("STREAM_FLUSH_SECONDS", "0.5"))
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS", "1000"))
+
+change_feed = ChangeFeed()
+_change_feed_task: Optional[asyncio.Task] = None
+_change_feed_lock = asyncio.Lock()
+
+
+async def start_change_feed():
+    global _change_feed_task
+    async with _change_feed_lock:
+        if _change_feed_task is None:
+            await start_change_listener(change_feed.record)
+            _change_feed_task = run_in_background(run_change_feed())
+
+
+async def flush_change_feed():
+    """Fetch the changed listings once and publish them to every subscriber"""
+    resync, old_rows = change_feed.take()
+    if not change_feed.subscriptions:
+        return
+    
+    rows, bodies = [], []
+    if old_rows and not resync:
+        rows = [dict(row) for row in await fetch_listing_rows(list(old_rows))]
+        if rows:
+            result = analyze_rows(rows, fields=LISTING_ANALYSIS_FIELDS)
+            bodies = listing_bodies(rows, result)
+            # Subscriptions filter on the default-assumption metrics
+            for row, deal_score, cap_rate in zip(rows, result['deal_score'].tolist(), result['cap_rate'].tolist()):
+                row['deal_score'] = deal_score
+                row['cap_rate'] = cap_rate
+    change_feed.publish(resync, old_rows, rows, bodies)
+
+
+async def run_change_feed():
+    while True:
+        await asyncio.sleep(STREAM_FLUSH_SECONDS)
+        if not (change_feed.resync or change_feed.pending):
+            continue
+        try:
+            await flush_change_feed()
+        except Exception as e:
+            print(f"Change feed flush failed: {e}")
+
+
+async def sse_events(bbox: Optional[tuple], filters: dict):
+    subscription = change_feed.subscribe(bbox, filters)
+    try:
+        yield READY_EVENT
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.queue.get(), STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield HEARTBEAT
+    finally:
+        change_feed.unsubscribe(subscription)
+
+
+@app.get("/api/stream")
+async def stream_changes(
+    north: float = Query(None, description="North boundary latitude"),
+    south: float = Query(None, description="South boundary latitude"),
+    east: float = Query(None, description="East boundary longitude"),
+    west: float = Query(None, description="West boundary longitude"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    home_type: Optional[str] = Query(None, description="Filter by home type"),
+    min_price: Optional[float] = Query(None, description="Minimum price"),
+    max_price: Optional[float] = Query(None, description="Maximum price"),
+    min_beds: Optional[int] = Query(None, description="Minimum bedrooms"),
+    for_sale: Optional[bool] = Query(None, description="Only listings with this for-sale flag"),
+    min_deal_score: Optional[int] = Query(None, description="Minimum deal score"),
+    min_cap_rate: Optional[float] = Query(None, description="Minimum cap rate"),
+):
+    """
+    Live listing changes inside a viewport, as Server-Sent Events.
+    Takes the same bbox and filters as GET /api/properties (the bbox is
+    optional here). Events:
+      ready   - subscribed; load the current listings now
+      changes - {"upserts": [property, ...], "removes": [id, ...]}, where
+                upserts have the same shape as /api/properties rows
+      resync  - too many changes to send (bulk load, slow client); refetch
+    Deal score and cap rate filters use the default assumptions.
+    """
+    bbox_values = (north, south, east, west)
+    if any(v is not None for v in bbox_values) and not all(v is not None for v in bbox_values):
+        raise HTTPException(status_code=400, detail="Provide all of north, south, east and west, or none")
+    if len(change_feed.subscriptions) >= STREAM_MAX_SUBSCRIBERS:
+        raise HTTPException(status_code=503, detail="Too many live subscribers")
+    try:
+        await start_change_feed()
+    except Exception as e:
+        print(f"Change feed unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Live updates unavailable")
+    
+    filters = {
+        'status': status, 'home_type': home_type, 'min_price': min_price, 'max_price': max_price,
+        'min_beds': min_beds, 'for_sale': for_sale, 'min_deal_score': min_deal_score,
+        'min_cap_rate': min_cap_rate,
+    }
+    return StreamingResponse(
+        sse_events(bbox_values if north is not None else None, filters),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 # ============ HEATMAP DATA ENDPOINTS ============
 
+# The hex pyramid over the for-sale set is built on first use and kept
+# current from property change notifications, wherever the change was made:
+# every HEATMAP_APPLY_SECONDS the changed listings are refetched and only
+# their hexes recomputed, and those no longer for sale removed. A batch of
+# more than HEATMAP_MAX_APPLY changes drops the pyramid to be rebuilt
+# instead, as do bulk loads. It is still rebuilt after HEATMAP_REBUILD_SECONDS.
+HEATMAP_REBUILD_SECONDS = float(os.getenv("HEATMAP_REBUILD_SECONDS", "900"))
+HEATMAP_APPLY_SECONDS = float(os.getenv("HEATMAP_APPLY_SECONDS", "1"))
+HEATMAP_MAX_APPLY = int(os.getenv("HEATMAP_MAX_APPLY", "5000"))
+
+_heatmap: Optional[HexPyramid] = None
+_heatmap_lock = asyncio.Lock()
+# Ids of listings changed since the last apply
+_heatmap_pending: set = set()
+
+
+def heatmap_metrics(rows: List[dict]) -> Dict[str, np.ndarray]:
+    """Default-assumption metrics that the heatmaps aggregate"""
+    result = analyze_rows(rows)
+    return {
+        'dealScore': result['deal_score'],
+        'capRate': result['cap_rate'],
+        'monthlyCashFlow': result['monthly_cash_flow'],
+    }
+
+
+async def get_heatmap() -> HexPyramid:
+    """Return the hex pyramid, building it if missing or stale"""
+    global _heatmap
+    async with _heatmap_lock:
+        if _heatmap is None or time.monotonic() - _heatmap.built_at > HEATMAP_REBUILD_SECONDS:
+            rows = await fetch_analysis_columns()
+            _heatmap = await offload.run(build_heatmap, offload.rows(rows), size=len(rows))
+        return _heatmap
+
+
+def build_heatmap(rows: list) -> HexPyramid:
+    return HexPyramid(
+        ids=[row['id'] for row in rows],
+        lat=_column(rows, 'latitude', 0),
+        lng=_column(rows, 'longitude', 0),
+        metrics=heatmap_metrics(rows),
+    )
+
+
+def on_heatmap_change(payload: str):
+    """Notification callback: queue the changed listing for the next apply"""
+    change = json.loads(payload)
+    # Bulk loads drop the whole pyramid (invalidate_derived_data), and the
+    # pyramid analyzes listings itself
+    if change['op'] not in ('bulk', 'analysis'):
+        _heatmap_pending.add(change['id'])
+
+
+async def apply_heatmap_changes(ids: list):
+    """Fold changed listings into a built pyramid, dropping those no longer for sale"""
+    global _heatmap
+    async with _heatmap_lock:
+        if _heatmap is None:
+            # The next build reads them as they are now
+            return
+        if len(ids) > HEATMAP_MAX_APPLY:
+            _heatmap = None
+            return
+        rows = await fetch_analysis_columns(ids)
+        found = {row['id'] for row in rows}
+        _heatmap.apply(
+            [row['id'] for row in rows],
+            _column(rows, 'latitude', 0),
+            _column(rows, 'longitude', 0),
+            heatmap_metrics(rows),
+            removed_ids=[i for i in ids if i not in found],
+        )
+
+
+async def run_heatmap_changes():
+    """Keep applying queued listing changes to the pyramid"""
+    global _heatmap
+    while True:
+        await asyncio.sleep(HEATMAP_APPLY_SECONDS)
+        if not _heatmap_pending:
+            continue
+        ids = list(_heatmap_pending)
+        _heatmap_pending.clear()
+        try:
+            await apply_heatmap_changes(ids)
+        except Exception as e:
+            # Rebuilt on next use rather than served without the changes
+            _heatmap = None
+            print(f"⚠️ Heatmap refresh failed: {e}")
+
+
+async def heatmap_response(metric: str, north: float, south: float, east: float, west: float,
+                           zoom: Optional[int]) -> dict:
+    try:
+        heatmap = await get_heatmap()
+        return heatmap.query(north, south, east, west, metric, zoom)
+    except PoolBusyError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/heatmap/deal-score")
 async def get_deal_score_heatmap(
     north: float = Query(...),
     south: float = Query(...),
     east: float = Query(...),
-    west: float = Query(...)
+    west: float = Query(...),
+    zoom: Optional[int] = Query(None, description="Map zoom; derived from the bbox if omitted"),
 ):
     """
     Get aggregated deal scores for heatmap visualization.
-    Returns hex-binned data for Deck.gl.
+    Returns hex-binned count / mean / p50 / max for Deck.gl.
     """
-    # In production, this would aggregate deal scores by geographic area
-    return {"message": "Requires database connection"}
+    return await heatmap_response('dealScore', north, south, east, west, zoom)
 
 @app.get("/api/heatmap/cap-rate")
 async def get_cap_rate_heatmap(
     north: float = Query(...),
     south: float = Query(...),
     east: float = Query(...),
-    west: float = Query(...)
+    west: float = Query(...),
+    zoom: Optional[int] = Query(None, description="Map zoom; derived from the bbox if omitted"),
 ):
     """Get aggregated cap rates for heatmap."""
-    return {"message": "Requires database connection"}
+    return await heatmap_response('capRate', north, south, east, west, zoom)
 
 @app.get("/api/heatmap/cash-flow")
 async def get_cash_flow_heatmap(
     north: float = Query(...),
     south: float = Query(...),
     east: float = Query(...),
-    west: float = Query(...)
+    west: float = Query(...),
+    zoom: Optional[int] = Query(None, description="Map zoom; derived from the bbox if omitted"),
 ):
     """Get aggregated cash flow for heatmap."""
-    return {"message": "Requires database connection"}
+    return await heatmap_response('monthlyCashFlow', north, south, east, west, zoom)
+
+
+# ============ VECTOR TILES ============
+
+# At or below this zoom tiles carry hex clusters instead of individual listings
+CLUSTER_MAX_ZOOM = 11
+TILE_MAX_ZOOM = 22
+
+
+def tile_bounds(z: int, x: int, y: int):
+    """(north, south, east, west) in degrees of a web mercator tile"""
+    n = 2 ** z
+    west = x / n * 360 - 180
+    east = (x + 1) / n * 360 - 180
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return north, south, east, west
+
+
+async def build_tile(z: int, x: int, y: int) -> bytes:
+    """Encode one tile: hex clusters at low zoom, analyzed listings above"""
+    if z <= CLUSTER_MAX_ZOOM:
+        heatmap = await get_heatmap()
+        clusters = heatmap.clusters(*tile_bounds(z, x, y), zoom=z)
+        return await render_cluster_tile(z, x, y, clusters)
+    
+    rows = await fetch_tile_analysis_columns(z, x, y)
+    result = analyze_rows(rows)
+    return await render_property_tile(
+        z, x, y,
+        [row['id'] for row in rows],
+        result['deal_score'].tolist(),
+        np.round(result['cap_rate'], 4).tolist(),
+    )
+
+
+@app.get("/api/tiles/{z}/{x}/{y}.mvt")
+async def get_tile(
+    request: Request,
+    z: int,
+    x: int,
+    y: int,
+):
+    """
+    Mapbox Vector Tile of for-sale properties.
+    Zoom <= CLUSTER_MAX_ZOOM returns a 'clusters' layer (point_count, mean and
+    max deal_score, mean cap_rate); higher zooms return a 'properties' layer
+    (id, price, deal_score, cap_rate). Tiles carry strong ETags.
+    """
+    if not 0 <= z <= TILE_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Tile coordinates out of range")
+    if not database.has_postgis:
+        raise HTTPException(status_code=503, detail="Vector tiles require PostGIS")
+    
+    cached = tile_cache.get((z, x, y))
+    if cached is None:
+        version = data_version.value
+        try:
+            tile = await build_tile(z, x, y)
+        except PoolBusyError:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        etag = '"' + hashlib.sha1(tile).hexdigest() + '"'
+        if data_version.value == version:
+            tile_cache.set((z, x, y), (tile, etag), weight=len(tile))
+    else:
+        tile, etag = cached
+    
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if matched := matching_etag(request, etag):
+        return Response(status_code=304, headers={**headers, "ETag": matched})
+    return Response(content=tile, media_type="application/vnd.mapbox-vector-tile", headers=headers)
 
 
 if __name__ == "__main__":
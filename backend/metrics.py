@@ -0,0 +1,204 @@
+# Request phase timing and Prometheus metrics
+#
+# Code marks expensive steps with `with phase('db_query'):`. Each phase is
+# observed into a histogram and, while a request is being served, added to
+# that request's timings, which TimingMiddleware sends back as a
+# Server-Timing header (e.g. `db_acquire;dur=0.1, db_query;dur=4.2,
+# analysis;dur=1.3, encode;dur=0.8, total;dur=7.0`).
+#
+# monitor_event_loop() measures how late the event loop runs timers, which
+# is how long other requests on this worker were kept waiting.
+#
+# render() writes every metric in the Prometheus text format for /metrics.
+# Gauges are read from callbacks at scrape time, so pool and cache state
+# cost nothing between scrapes.
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds; covers sub-millisecond phases up to slow bulk requests
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 2500, 5000, 10000)
+
+# Every metric, in /metrics order
+REGISTRY: list = []
+
+_request_phases: ContextVar[Optional[Dict[str, float]]] = ContextVar('request_phases', default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination"""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: Dict[Tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames + ("le",), labels + (_number(bound),))} {cumulative}')
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames + ("le",), labels + ("+Inf",))} {series[-1]}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple, float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        lines += [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+                  for labels, value in sorted(self._values.items())]
+        return lines
+
+
+class CallbackMetric:
+    """Gauge or counter whose samples come from `read() -> [(label values, value)]` at scrape time"""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...], read: Callable, kind: str = 'gauge'):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.read = read
+        self.kind = kind
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        lines += [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}' for labels, value in self.read()]
+        return lines
+
+
+PHASE_SECONDS = Histogram('dealfinder_phase_seconds', 'Time spent per request phase', ('phase',))
+REQUEST_SECONDS = Histogram(
+    'dealfinder_request_seconds', 'Time to first response byte per route', ('method', 'route', 'status'),
+)
+QUERY_ROWS = Histogram('dealfinder_query_rows', 'Rows returned per listing query', ('query',), ROW_BUCKETS)
+POOL_REJECTIONS = Counter(
+    'dealfinder_db_pool_rejections_total', 'Requests turned away for lack of a connection', ('pool', 'reason'),
+)
+
+LOOP_LAG_SECONDS = Histogram('dealfinder_event_loop_lag_seconds', 'How late the event loop woke a sleeping task')
+# Most recent and largest lag seen by monitor_event_loop
+loop_lag = {'last_seconds': 0.0, 'max_seconds': 0.0}
+
+
+def render() -> bytes:
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return ('\n'.join(lines) + '\n').encode()
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block into the phase histogram and the current request's Server-Timing"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PHASE_SECONDS.observe(elapsed, name)
+        phases = _request_phases.get()
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + elapsed
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware: collects the phases of each HTTP request, adds them as
+    a Server-Timing header (when `server_timing` is on) and observes the
+    time to the response start per route. Streamed bodies are timed up to
+    their first byte.
+    """
+
+    def __init__(self, app, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        phases: Dict[str, float] = {}
+        token = _request_phases.set(phases)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                total = time.perf_counter() - start
+                route = scope.get('route')
+                REQUEST_SECONDS.observe(
+                    total, scope['method'], getattr(route, 'path', 'unmatched'), str(message['status'])
+                )
+                if self.server_timing:
+                    entries = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in phases.items()]
+                    entries.append(f'total;dur={total * 1000:.2f}')
+                    message['headers'] = list(message.get('headers', [])) + [
+                        (b'server-timing', ', '.join(entries).encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_phases.reset(token)
+
+
+async def monitor_event_loop(interval: float):
+    """
+    Sleep `interval` seconds over and over, recording how much later than
+    asked each wake-up came. Anything running on the loop without yielding
+    (a long synchronous encode, say) shows up here as lag.
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - start - interval)
+        LOOP_LAG_SECONDS.observe(lag)
+        loop_lag['last_seconds'] = lag
+        loop_lag['max_seconds'] = max(loop_lag['max_seconds'], lag)
@@ -0,0 +1,99 @@
+# CPU-heavy work off the event loop
+#
+# Analysis and encoding of large listing pages, batch analysis, sensitivity
+# grids and simulations go through run(), so /health and small requests keep
+# being served while they compute. Work smaller than OFFLOAD_MIN_ROWS runs
+# inline: handing it to a worker would cost more than it saves.
+#
+# OFFLOAD_EXECUTOR picks the pool:
+#   thread  (default) NumPy releases the GIL in its kernels and the
+#           interpreter switches threads every few ms, so the loop keeps
+#           getting scheduled. Phases timed in the worker still reach the
+#           request's Server-Timing.
+#   process full parallelism across cores; arguments and results are
+#           pickled, so pass listing rows through rows() first. The whole
+#           call is timed as the 'worker' phase. Module state the work reads
+#           (the rent table) is registered with share() and handed to each
+#           worker as it starts; restart() replaces the workers after it changes.
+#   off     everything inline (the old behaviour, for comparison)
+
+import asyncio
+import contextvars
+import functools
+import importlib
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from metrics import phase
+
+OFFLOAD_EXECUTOR = os.getenv("OFFLOAD_EXECUTOR", "thread").lower()
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+OFFLOAD_MIN_ROWS = int(os.getenv("OFFLOAD_MIN_ROWS", "1000"))
+
+if OFFLOAD_EXECUTOR not in ("thread", "process", "off"):
+    raise ValueError(f"OFFLOAD_EXECUTOR must be 'thread', 'process' or 'off', not {OFFLOAD_EXECUTOR!r}")
+
+_executor: Optional[Executor] = None
+# (module, attribute) pairs process workers start with the current value of
+_shared = []
+
+
+def share(module, name: str):
+    """Have process workers see `module.name` as it is when they start"""
+    _shared.append((module, name))
+
+
+def _init_worker(values: list):
+    for module_name, name, value in values:
+        setattr(importlib.import_module(module_name), name, value)
+
+
+def executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if OFFLOAD_EXECUTOR == "process":
+            # spawn: forking a process that runs an event loop and threads isn't safe
+            values = [(module.__name__, name, getattr(module, name)) for module, name in _shared]
+            _executor = ProcessPoolExecutor(
+                OFFLOAD_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=(values,),
+            )
+        else:
+            _executor = ThreadPoolExecutor(OFFLOAD_WORKERS, thread_name_prefix="offload")
+    return _executor
+
+
+def rows(records: list) -> list:
+    """Listing rows in a form run() can hand to the pool (asyncpg Records don't pickle)"""
+    if OFFLOAD_EXECUTOR == "process":
+        return [dict(record) for record in records]
+    return records
+
+
+async def run(fn: Callable, *args, size: int):
+    """`fn(*args)` on the worker pool when `size` (rows, grid points...) reaches OFFLOAD_MIN_ROWS"""
+    if OFFLOAD_EXECUTOR == "off" or size < OFFLOAD_MIN_ROWS:
+        return fn(*args)
+    loop = asyncio.get_running_loop()
+    if OFFLOAD_EXECUTOR == "process":
+        with phase('worker'):
+            return await loop.run_in_executor(executor(), functools.partial(fn, *args))
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor(), functools.partial(context.run, fn, *args))
+
+
+def restart():
+    """After a shared value changes: new process workers for new work, running work finishes"""
+    global _executor
+    if OFFLOAD_EXECUTOR == "process" and _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
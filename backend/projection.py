@@ -0,0 +1,242 @@
+# Multi-year cash flow projection and Monte Carlo simulation
+#
+# Everything works on (trials, years) arrays, so a deterministic projection
+# is a single trial with flat growth paths and a simulation is the same
+# computation over thousands of drawn paths. The mortgage rate is a yearly
+# path too: each year the remaining balance is re-amortized over the
+# remaining term at that year's rate, which is an ordinary fixed-rate loan
+# when the path is flat.
+
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Yearly series returned by project() and summarized by simulate()
+YEARLY_METRICS = (
+    'rent', 'noi', 'debt_service', 'cash_flow', 'interest', 'principal',
+    'loan_balance', 'property_value', 'equity',
+)
+
+# IRR is found by bisection between these annual rates
+_IRR_LOW = -0.99
+_IRR_HIGH = 10.0
+_IRR_ITERATIONS = 60
+
+
+def mortgage_payment_factor(annual_rate, years):
+    """
+    Monthly P&I payment per dollar borrowed, shared by every row of a batch.
+    Rate and term may also be arrays, e.g. one per sensitivity grid point.
+    """
+    monthly_rate = np.asarray(annual_rate, dtype=np.float64) / 12
+    num_payments = np.asarray(years, dtype=np.float64) * 12
+
+    growth = (1 + monthly_rate) ** num_payments
+    # A zero rate amortizes linearly
+    factor = np.broadcast_to(1 / num_payments, growth.shape).copy()
+    np.divide(monthly_rate * growth, growth - 1, out=factor, where=monthly_rate != 0)
+    return factor[()]
+
+
+def amortization_schedule(loan_amount: float, annual_rate: float, years: int) -> Dict[str, np.ndarray]:
+    """Month-by-month payment, interest, principal and balance of a fixed-rate loan"""
+    months = np.arange(1, years * 12 + 1)
+    payment = loan_amount * mortgage_payment_factor(annual_rate, years)
+    monthly_rate = annual_rate / 12
+
+    if monthly_rate == 0:
+        balance = loan_amount - payment * months
+    else:
+        growth = (1 + monthly_rate) ** months
+        balance = loan_amount * growth - payment * (growth - 1) / monthly_rate
+    balance = np.maximum(balance, 0.0)
+
+    previous = np.concatenate([[loan_amount], balance[:-1]])
+    interest = previous * monthly_rate
+    return {
+        'month': months,
+        'payment': np.full(len(months), payment),
+        'interest': interest,
+        'principal': previous - balance,
+        'balance': balance,
+    }
+
+
+def _growth_factors(rates: np.ndarray) -> np.ndarray:
+    """Cumulative growth at the start of each year (year 1 is ungrown)"""
+    start = np.ones((rates.shape[0], 1))
+    return np.concatenate([start, np.cumprod(1 + rates[:, :-1], axis=1)], axis=1)
+
+
+def irr(cash_flows: np.ndarray) -> np.ndarray:
+    """
+    Annual IRR per row of a (trials, periods) cash flow array, where period 0
+    is the initial investment. NaN where no rate in range zeroes the NPV.
+    """
+    periods = np.arange(cash_flows.shape[1])
+
+    def npv(rate: np.ndarray) -> np.ndarray:
+        return (cash_flows * (1 + rate[:, None]) ** -periods).sum(axis=1)
+
+    low = np.full(len(cash_flows), _IRR_LOW)
+    high = np.full(len(cash_flows), _IRR_HIGH)
+    npv_low = npv(low)
+    solvable = np.sign(npv_low) != np.sign(npv(high))
+
+    for _ in range(_IRR_ITERATIONS):
+        mid = (low + high) / 2
+        npv_mid = npv(mid)
+        same_side = np.sign(npv_mid) == np.sign(npv_low)
+        low = np.where(same_side, mid, low)
+        npv_low = np.where(same_side, npv_mid, npv_low)
+        high = np.where(same_side, high, mid)
+
+    return np.where(solvable, (low + high) / 2, np.nan)
+
+
+def project(
+    price: float,
+    monthly_rent: float,
+    monthly_operating_expenses: float,
+    management_percent: float,
+    loan_amount: float,
+    loan_term_years: int,
+    total_cash_invested: float,
+    selling_cost_percent: float,
+    rent_growth: np.ndarray,
+    appreciation: np.ndarray,
+    expense_growth: np.ndarray,
+    vacancy: np.ndarray,
+    rates: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """
+    Project a hold period for every trial.
+    The path arguments are (trials, years) arrays of yearly rates. Year 1
+    matches the single-year analysis; rent and operating expenses grow
+    from year 2 and the property appreciates through each year. The
+    property is sold at the end of the last year.
+    Returns (trials, years) arrays for YEARLY_METRICS plus per-trial
+    sale_proceeds, irr, total_return and equity_multiple.
+    """
+    trials, years = rent_growth.shape
+
+    rent = monthly_rent * 12 * _growth_factors(rent_growth)
+    operating = monthly_operating_expenses * 12 * _growth_factors(expense_growth)
+    noi = rent * (1 - vacancy) - operating - rent * management_percent
+    property_value = price * np.cumprod(1 + appreciation, axis=1)
+
+    # Re-amortize the remaining balance each year at that year's rate
+    debt_service = np.zeros((trials, years))
+    interest = np.zeros((trials, years))
+    loan_balance = np.zeros((trials, years))
+    balance = np.full(trials, float(loan_amount))
+    term_months = loan_term_years * 12
+    for year in range(years):
+        remaining = term_months - year * 12
+        if remaining <= 0:
+            break
+        months = min(12, remaining)
+        monthly_rate = rates[:, year] / 12
+        payment = balance * mortgage_payment_factor(rates[:, year], remaining / 12)
+        growth = (1 + monthly_rate) ** months
+        paid_down = np.divide(growth - 1, monthly_rate,
+                              out=np.full(trials, float(months)), where=monthly_rate != 0)
+        end_balance = np.maximum(balance * growth - payment * paid_down, 0.0)
+
+        debt_service[:, year] = payment * months
+        interest[:, year] = payment * months - (balance - end_balance)
+        loan_balance[:, year] = end_balance
+        balance = end_balance
+
+    cash_flow = noi - debt_service
+    sale_proceeds = property_value[:, -1] * (1 - selling_cost_percent) - loan_balance[:, -1]
+
+    flows = np.column_stack([np.full(trials, -float(total_cash_invested)), cash_flow])
+    flows[:, -1] += sale_proceeds
+    returned = cash_flow.sum(axis=1) + sale_proceeds
+    if total_cash_invested > 0:
+        equity_multiple = returned / total_cash_invested
+        total_return = equity_multiple - 1
+    else:
+        equity_multiple = total_return = np.full(trials, np.nan)
+
+    return {
+        'rent': rent,
+        'noi': noi,
+        'debt_service': debt_service,
+        'cash_flow': cash_flow,
+        'interest': interest,
+        'principal': debt_service - interest,
+        'loan_balance': loan_balance,
+        'property_value': property_value,
+        'equity': property_value - loan_balance,
+        'sale_proceeds': sale_proceeds,
+        'irr': irr(flows),
+        'total_return': total_return,
+        'equity_multiple': equity_multiple,
+    }
+
+
+def flat_paths(years: int, rent_growth: float, appreciation: float, expense_growth: float,
+               vacancy: float, interest_rate: float) -> Dict[str, np.ndarray]:
+    """Constant yearly paths for a single deterministic trial"""
+    return {
+        'rent_growth': np.full((1, years), rent_growth),
+        'appreciation': np.full((1, years), appreciation),
+        'expense_growth': np.full((1, years), expense_growth),
+        'vacancy': np.full((1, years), vacancy),
+        'rates': np.full((1, years), interest_rate),
+    }
+
+
+def random_paths(trials: int, years: int, rent_growth: float, appreciation: float, expense_growth: float,
+                 vacancy: float, interest_rate: float, rent_growth_sd: float, appreciation_sd: float,
+                 vacancy_sd: float, rate_sd: float, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Draw yearly paths for a Monte Carlo run.
+    Growth rates and vacancy are drawn independently each year; the mortgage
+    rate starts at interest_rate and random-walks from year 2, so a zero
+    rate_sd keeps the loan fixed-rate.
+    """
+    rng = np.random.default_rng(seed)
+    shape = (trials, years)
+    shocks = rng.normal(0.0, rate_sd, shape)
+    shocks[:, 0] = 0.0
+    return {
+        'rent_growth': rng.normal(rent_growth, rent_growth_sd, shape),
+        'appreciation': rng.normal(appreciation, appreciation_sd, shape),
+        'expense_growth': np.full(shape, expense_growth),
+        'vacancy': np.clip(rng.normal(vacancy, vacancy_sd, shape), 0.0, 1.0),
+        'rates': np.maximum(interest_rate + np.cumsum(shocks, axis=1), 0.0),
+    }
+
+
+def _band(values: np.ndarray) -> Dict[str, list]:
+    """Percentiles over the trial axis, NaN-aware"""
+    if np.isnan(values).all():
+        return {f'p{p}': None for p in PERCENTILES}
+    bands = np.nanpercentile(values, PERCENTILES, axis=0)
+    return {f'p{p}': np.round(band, 4).tolist() for p, band in zip(PERCENTILES, bands)}
+
+
+def summarize(result: Dict[str, np.ndarray]) -> dict:
+    """Percentile bands per year and for the exit metrics of a simulation"""
+    irr_values = result['irr']
+    solved = irr_values[~np.isnan(irr_values)]
+    return {
+        'yearly': {metric: _band(result[metric]) for metric in YEARLY_METRICS},
+        'sale_proceeds': _band(result['sale_proceeds']),
+        'irr': _band(irr_values),
+        'irr_mean': round(float(solved.mean()), 4) if len(solved) else None,
+        'total_return': _band(result['total_return']),
+        'equity_multiple': _band(result['equity_multiple']),
+        'probability_of_loss': float(np.mean(result['total_return'] < 0)),
+        'probability_negative_cash_flow': float(np.mean((result['cash_flow'] < 0).any(axis=1))),
+    }
+
+
+def nan_to_none(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
@@ -0,0 +1,352 @@
+# Matching new listings against saved searches
+#
+# Every saved search is a bbox plus the listing filters (status, home type,
+# price range, min beds, min deal score). SearchIndex finds, for a batch of
+# listings, every search each one satisfies without testing every pair:
+#
+#   - spatial: each search is registered in the lat/lng grid cells its
+#     bbox overlaps (cell_degrees square). Searches without a bbox, or with
+#     one over more than max_cells cells, go in one catch-all cell.
+#   - inverted: within a cell, searches are bucketed by (status, home type),
+#     with 'All' as its own key, so a listing visits at most 8 buckets: its
+#     own and the catch-all cell, times exact/'All' for each of the two.
+#   - interval: each bucket is sorted by min price, so a binary search
+#     narrows it to the searches whose min price the listing reaches. The
+#     remaining predicates (max price, beds, deal score, the bbox itself)
+#     are checked on those candidates with NumPy.
+#
+# Searches added after the last build sit in an unindexed tail that is
+# checked in full, and removed ones are masked out, until either grows past
+# REBUILD_FRACTION of the index and it is rebuilt. Changes are made on a
+# copy() so matches running in a worker thread see a consistent index. Filter semantics follow
+# database._filter_conditions: a 0 or missing bound is no bound, and a
+# listing missing a bounded value doesn't match.
+
+import copy
+import math
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Rebuild once this share of searches is unindexed or removed
+REBUILD_FRACTION = 0.05
+REBUILD_MIN = 256
+# Candidate (listing, search) pairs checked at a time
+MATCH_CHUNK_PAIRS = 1 << 21
+
+# Cell key packing: lat and lng cell numbers are offset to be non-negative
+_CELL_OFFSET = 1 << 15
+_CELL_STRIDE = 1 << 16
+# Cell of searches without a usable bbox
+_ANY_CELL = _CELL_STRIDE * _CELL_STRIDE
+# Stand-in coordinate for listings without a location: outside every bbox,
+# inside the infinite one of a search without a bbox
+_NO_LOCATION = 1e9
+
+SEARCH_FILTERS = ('status', 'home_type', 'min_price', 'max_price', 'min_beds', 'min_deal_score')
+
+
+def _bound(value, default: float) -> float:
+    return float(value) if value else default
+
+
+class SearchIndex:
+    """Saved search predicates as NumPy columns, indexed by grid cell, status, home type and min price"""
+
+    def __init__(self, cell_degrees: float = 0.25, max_cells: int = 64):
+        self.cell_degrees = cell_degrees
+        self.max_cells = max_cells
+        # Status and home type codes; 0 is 'All'
+        self._codes: Dict[str, Dict[str, int]] = {'status': {}, 'home_type': {}}
+        self._slot: Dict[int, int] = {}
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.south = np.zeros(0)
+        self.north = np.zeros(0)
+        self.west = np.zeros(0)
+        self.east = np.zeros(0)
+        self.status = np.zeros(0, dtype=np.int64)
+        self.home_type = np.zeros(0, dtype=np.int64)
+        self.min_price = np.zeros(0)
+        self.max_price = np.zeros(0)
+        self.min_beds = np.zeros(0)
+        self.min_deal_score = np.zeros(0)
+        self.alive = np.zeros(0, dtype=bool)
+        self._indexed = 0
+        self._bucket_keys = np.zeros(0, dtype=np.int64)
+        self._bucket_bounds = np.zeros(1, dtype=np.int64)
+        self._reg_slots = np.zeros(0, dtype=np.int64)
+        self._reg_min_price = np.zeros(0)
+        self._key_base = 1
+        self.built_at = None
+        self.build_seconds = 0.0
+
+    _FIELDS = ('ids', 'south', 'north', 'west', 'east', 'status', 'home_type',
+               'min_price', 'max_price', 'min_beds', 'min_deal_score')
+
+    # ----- building -----
+
+    def _code(self, field: str, value: Optional[str]) -> int:
+        if not value or value == 'All':
+            return 0
+        codes = self._codes[field]
+        return codes.setdefault(value, len(codes) + 1)
+
+    def _search_arrays(self, searches: list) -> dict:
+        def column(values, dtype=np.float64):
+            return np.fromiter(values, dtype=dtype, count=len(searches))
+
+        has_bbox = [all(s.get(k) is not None for k in ('north', 'south', 'east', 'west')) for s in searches]
+        return {
+            'ids': column((s['id'] for s in searches), np.int64),
+            'south': column((s['south'] if b else -math.inf for s, b in zip(searches, has_bbox))),
+            'north': column((s['north'] if b else math.inf for s, b in zip(searches, has_bbox))),
+            'west': column((s['west'] if b else -math.inf for s, b in zip(searches, has_bbox))),
+            'east': column((s['east'] if b else math.inf for s, b in zip(searches, has_bbox))),
+            'status': column((self._code('status', s.get('status')) for s in searches), np.int64),
+            'home_type': column((self._code('home_type', s.get('home_type')) for s in searches), np.int64),
+            'min_price': column((_bound(s.get('min_price'), -math.inf) for s in searches)),
+            'max_price': column((_bound(s.get('max_price'), math.inf) for s in searches)),
+            'min_beds': column((_bound(s.get('min_beds'), -math.inf) for s in searches)),
+            'min_deal_score': column(
+                (-math.inf if s.get('min_deal_score') is None else float(s['min_deal_score']) for s in searches)
+            ),
+        }
+
+    def copy(self) -> 'SearchIndex':
+        """A copy to change while matches may still be running on this one"""
+        index = copy.copy(self)
+        index._codes = {field: dict(codes) for field, codes in self._codes.items()}
+        index._slot = dict(self._slot)
+        index.alive = self.alive.copy()
+        return index
+
+    def load(self, searches: list):
+        """Replace everything with `searches` (dicts with id, bbox and SEARCH_FILTERS)"""
+        self._slot = {}
+        for field in self._FIELDS:
+            setattr(self, field, getattr(self, field)[:0])
+        self.alive = self.alive[:0]
+        self.add(searches, rebuild=True)
+
+    def add(self, searches: list, rebuild: bool = False):
+        """Add or replace searches; they are matched from the tail until the next rebuild"""
+        if searches:
+            first = len(self.ids)
+            arrays = self._search_arrays(searches)
+            for field in self._FIELDS:
+                setattr(self, field, np.concatenate([getattr(self, field), arrays[field]]))
+            self.alive = np.concatenate([self.alive, np.ones(len(searches), dtype=bool)])
+            for offset, search_id in enumerate(arrays['ids'].tolist()):
+                old = self._slot.get(search_id)
+                if old is not None:
+                    self.alive[old] = False
+                self._slot[search_id] = first + offset
+        if rebuild or self._stale() > max(REBUILD_MIN, REBUILD_FRACTION * len(self._slot)):
+            self._compact()
+
+    def remove(self, search_ids: List[int]):
+        for search_id in search_ids:
+            slot = self._slot.pop(search_id, None)
+            if slot is not None:
+                self.alive[slot] = False
+        if self._stale() > max(REBUILD_MIN, REBUILD_FRACTION * len(self._slot)):
+            self._compact()
+
+    def _stale(self) -> int:
+        return (len(self.ids) - self._indexed) + int((~self.alive[:self._indexed]).sum())
+
+    def _compact(self):
+        """Drop removed searches and index everything"""
+        started = time.perf_counter()
+        keep = np.flatnonzero(self.alive)
+        for field in self._FIELDS:
+            setattr(self, field, getattr(self, field)[keep])
+        self.alive = np.ones(len(keep), dtype=bool)
+        self._slot = {search_id: slot for slot, search_id in enumerate(self.ids.tolist())}
+        self._build()
+        self.built_at = time.time()
+        self.build_seconds = time.perf_counter() - started
+
+    def _cells(self, lat: np.ndarray, lng: np.ndarray) -> tuple:
+        return (np.floor(lat / self.cell_degrees).astype(np.int64),
+                np.floor(lng / self.cell_degrees).astype(np.int64))
+
+    def _build(self):
+        count = len(self.ids)
+        # Registrations: one per (search, overlapped cell)
+        bounded = np.isfinite(self.south)
+        south, west = self._cells(np.where(bounded, self.south, 0), np.where(bounded, self.west, 0))
+        north, east = self._cells(np.where(bounded, self.north, 0), np.where(bounded, self.east, 0))
+        rows, cols = north - south + 1, east - west + 1
+        spread = bounded & (rows > 0) & (cols > 0) & (rows * cols <= self.max_cells)
+        cells = np.where(spread, rows * cols, 1)
+        slots = np.repeat(np.arange(count), cells)
+        # Position of each registration within its search's cells, row-major
+        offset = np.arange(len(slots)) - np.repeat(np.cumsum(cells) - cells, cells)
+        lat_cell = south[slots] + offset // cols[slots]
+        lng_cell = west[slots] + offset % cols[slots]
+        cell_keys = np.where(
+            spread[slots],
+            (lat_cell + _CELL_OFFSET) * _CELL_STRIDE + (lng_cell + _CELL_OFFSET),
+            _ANY_CELL,
+        )
+        # Codes run 0..len; one more for listing values no search uses
+        self._key_base = max(len(self._codes['status']), len(self._codes['home_type'])) + 2
+        keys = self._bucket_key(cell_keys, self.status[slots], self.home_type[slots])
+        order = np.lexsort((self.min_price[slots], keys))
+        keys, self._reg_slots = keys[order], slots[order]
+        self._reg_min_price = self.min_price[self._reg_slots]
+        self._bucket_keys, starts = np.unique(keys, return_index=True)
+        self._bucket_bounds = np.append(starts, len(keys)).astype(np.int64)
+        self._indexed = count
+
+    def _bucket_key(self, cell_keys: np.ndarray, status: np.ndarray, home_type: np.ndarray) -> np.ndarray:
+        return (cell_keys * self._key_base + status) * self._key_base + home_type
+
+    # ----- matching -----
+
+    def _listing_arrays(self, rows: list, deal_scores) -> dict:
+        def number(key, missing):
+            return np.fromiter(
+                (float(v) if (v := row[key]) is not None else missing for row in rows),
+                dtype=np.float64, count=len(rows),
+            )
+
+        def code(field, key):
+            codes = self._codes[field]
+            return np.fromiter((codes.get(row[key], -1) for row in rows), dtype=np.int64, count=len(rows))
+
+        price = number('price', math.nan)
+        return {
+            'ids': np.fromiter((row['id'] for row in rows), dtype=np.int64, count=len(rows)),
+            'lat': number('latitude', _NO_LOCATION),
+            'lng': number('longitude', _NO_LOCATION),
+            # A missing value fails any bound: -inf reaches no minimum...
+            'price_floor': np.nan_to_num(price, nan=-math.inf),
+            # ...and NaN stays under no maximum
+            'price': price,
+            'beds': number('beds', -math.inf),
+            'deal_score': np.nan_to_num(np.asarray(deal_scores, dtype=np.float64), nan=-math.inf),
+            'status': code('status', 'status'),
+            'home_type': code('home_type', 'homeType'),
+        }
+
+    def _check(self, listing: dict, rows: np.ndarray, slots: np.ndarray, exact: bool) -> np.ndarray:
+        """Which (row, slot) pairs match; `exact` pairs are known to pass status, type and min price"""
+        lat, lng = listing['lat'][rows], listing['lng'][rows]
+        max_price = self.max_price[slots]
+        ok = (
+            self.alive[slots]
+            & ((max_price == math.inf) | (listing['price'][rows] <= max_price))
+            & (listing['beds'][rows] >= self.min_beds[slots])
+            & (listing['deal_score'][rows] >= self.min_deal_score[slots])
+            & (self.south[slots] <= lat) & (lat <= self.north[slots])
+            & (self.west[slots] <= lng) & (lng <= self.east[slots])
+        )
+        if not exact:
+            status, home_type = self.status[slots], self.home_type[slots]
+            ok &= (
+                (listing['price_floor'][rows] >= self.min_price[slots])
+                & ((status == 0) | (status == listing['status'][rows]))
+                & ((home_type == 0) | (home_type == listing['home_type'][rows]))
+            )
+        return ok
+
+    def match(self, rows: list, deal_scores) -> tuple:
+        """
+        (search ids, property ids) of every match between listing rows
+        (database.PROPERTY_COLUMNS shape) with their deal scores and the
+        saved searches.
+        """
+        if not rows or not self._slot:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        listing = self._listing_arrays(rows, deal_scores)
+        matched_rows, matched_slots = [], []
+
+        # Candidate buckets: own and catch-all cell x exact and 'All' status x type
+        count = len(rows)
+        located = listing['lat'] != _NO_LOCATION
+        lat_cell, lng_cell = self._cells(np.where(located, listing['lat'], 0), np.where(located, listing['lng'], 0))
+        own_cell = np.where(located, (lat_cell + _CELL_OFFSET) * _CELL_STRIDE + (lng_cell + _CELL_OFFSET), _ANY_CELL)
+        zero = np.zeros(count, dtype=np.int64)
+        # Values no indexed search uses (codes handed out since the build
+        # included) get the spare code, which has no buckets
+        unknown = self._key_base - 1
+        own_status, own_home_type = (
+            np.where((codes > 0) & (codes < unknown), codes, unknown)
+            for codes in (listing['status'], listing['home_type'])
+        )
+        keys, key_rows = [], []
+        for cell in (own_cell, np.full(count, _ANY_CELL)):
+            for status in (own_status, zero):
+                for home_type in (own_home_type, zero):
+                    keys.append(self._bucket_key(cell, status, home_type))
+                    key_rows.append(np.arange(count))
+        keys, key_rows = np.concatenate(keys), np.concatenate(key_rows)
+        # Unlocated listings only have the catch-all cell: don't visit it twice
+        keys, key_rows = np.unique(np.stack([keys, key_rows]), axis=1)
+        bucket = np.searchsorted(self._bucket_keys, keys)
+        found = bucket < len(self._bucket_keys)
+        found[found] = self._bucket_keys[bucket[found]] == keys[found]
+        bucket, key_rows = bucket[found], key_rows[found]
+
+        if len(bucket):
+            # Visit each bucket once with its listings in price order
+            order = np.lexsort((listing['price_floor'][key_rows], bucket))
+            bucket, key_rows = bucket[order], key_rows[order]
+            edges = np.flatnonzero(np.diff(bucket)) + 1
+            for start, end in zip(np.concatenate([[0], edges]), np.concatenate([edges, [len(bucket)]])):
+                b = bucket[start]
+                low, high = self._bucket_bounds[b], self._bucket_bounds[b + 1]
+                bucket_rows = key_rows[start:end]
+                # Searches low..low+reach have a min price the listing reaches
+                reach = np.searchsorted(
+                    self._reg_min_price[low:high], listing['price_floor'][bucket_rows], side='right'
+                )
+                self._expand(listing, bucket_rows, reach, self._reg_slots[low:high], matched_rows, matched_slots)
+
+        # Searches added since the last build: check against every listing
+        tail = np.arange(self._indexed, len(self.ids))
+        if len(tail):
+            for start in range(0, count, max(MATCH_CHUNK_PAIRS // len(tail), 1)):
+                chunk = np.arange(start, min(start + max(MATCH_CHUNK_PAIRS // len(tail), 1), count))
+                pair_rows, pair_slots = np.repeat(chunk, len(tail)), np.tile(tail, len(chunk))
+                ok = self._check(listing, pair_rows, pair_slots, exact=False)
+                matched_rows.append(pair_rows[ok])
+                matched_slots.append(pair_slots[ok])
+
+        if not matched_rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        pair_rows, pair_slots = np.concatenate(matched_rows), np.concatenate(matched_slots)
+        return self.ids[pair_slots], listing['ids'][pair_rows]
+
+    def _expand(self, listing: dict, rows: np.ndarray, reach: np.ndarray, slots: np.ndarray,
+                matched_rows: list, matched_slots: list):
+        """Check each row against the first `reach` slots, MATCH_CHUNK_PAIRS pairs at a time"""
+        ends = np.cumsum(reach)
+        start = 0
+        while start < len(rows):
+            # Rows up to the one that crosses the chunk size (at least one row)
+            before = ends[start - 1] if start else 0
+            stop = max(int(np.searchsorted(ends, before + MATCH_CHUNK_PAIRS, side='right')), start + 1)
+            chunk_reach = reach[start:stop]
+            total = int(chunk_reach.sum())
+            if total:
+                pair_rows = np.repeat(rows[start:stop], chunk_reach)
+                positions = np.arange(total) - np.repeat(np.cumsum(chunk_reach) - chunk_reach, chunk_reach)
+                pair_slots = slots[positions]
+                ok = self._check(listing, pair_rows, pair_slots, exact=True)
+                matched_rows.append(pair_rows[ok])
+                matched_slots.append(pair_slots[ok])
+            start = stop
+
+    def stats(self) -> dict:
+        return {
+            'searches': len(self._slot),
+            'buckets': len(self._bucket_keys),
+            'registrations': len(self._reg_slots),
+            'unindexed': len(self.ids) - self._indexed,
+            'built_at': self.built_at,
+            'build_seconds': round(self.build_seconds, 4),
+        }
@@ -0,0 +1,48 @@
+# Mergeable quantile sketches
+#
+# The log-bucket sketches maintained in market_stats (09-market-stats.sql):
+# a {bucket: count} map where bucket 0 holds values below 1 and bucket
+# i >= 1 holds [GAMMA^(i-1), GAMMA^i). Sketches of any set of groups merge
+# by adding counts, and every quantile is within about 1% of the true value.
+
+import math
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+# Must match market_stats_bucket()
+GAMMA = 1.02
+
+
+def bucket(value: float) -> int:
+    if value < 1:
+        return 0
+    return math.floor(math.log(value) / math.log(GAMMA)) + 1
+
+
+def merge(sketches: Iterable[Dict]) -> Counter:
+    """Add sketches; keys may be the JSON strings stored in Postgres"""
+    merged = Counter()
+    for sketch in sketches:
+        for key, count in sketch.items():
+            merged[int(key)] += count
+    return merged
+
+
+def _estimate(index: int) -> float:
+    """Value with the smallest worst-case relative error for a bucket"""
+    if index == 0:
+        return 0.0
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+def quantile(sketch: Dict[int, int], q: float) -> Optional[float]:
+    total = sum(count for count in sketch.values() if count > 0)
+    if total == 0:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for index in sorted(sketch):
+        seen += max(sketch[index], 0)
+        if seen > rank:
+            return _estimate(index)
+    return _estimate(max(sketch))
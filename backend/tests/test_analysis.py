@@ -0,0 +1,64 @@
+# analyze_batch against the scalar calculators it replaced. Expected values
+# were produced by the original analyze_property / calculate_property_analysis.
+
+import pytest
+
+from main import AnalysisAssumptions, Property, analyze_property, calculate_property_analysis
+
+PROPERTY = dict(
+    id=1, address='1 Main St', street='1 Main St', city='Dallas', state='TX', zip='75201',
+    latitude=32.78, longitude=-96.8, price=250000, sqft=1500, beds=3, baths=2, price_per_sqft=0,
+    lot_size=5000, hoa=0, home_type='Single Family', estimated_taxes=3000, year_built=2000, units=1,
+)
+# A listing row, keyed like database.PROPERTY_COLUMNS
+ROW = dict(
+    price=250000, sqft=1500, beds=3, baths=2, yearBuilt=2000, estimatedTaxes=3000,
+    hoa=0, units=1, estimatedMonthlyRent=None,
+)
+
+
+def analyze(**overrides):
+    return analyze_property(Property(**{**PROPERTY, **overrides}), AnalysisAssumptions())
+
+
+def test_analyze_zero_price_is_still_scored():
+    analysis = analyze(price=0, estimated_monthly_rent=2000)
+    assert analysis.deal_score == 30
+    assert analysis.cap_rate == 0
+    assert analysis.one_percent_rule == 0
+    assert analysis.dscr == 999.0
+    assert analysis.monthly_cash_flow == pytest.approx(1390.0)
+
+
+def test_analyze_zero_sqft_estimates_rent_from_rooms():
+    analysis = analyze(sqft=0)
+    assert analysis.monthly_rent == 150.0
+    assert analysis.deal_score == 0
+    assert analysis.cap_rate == pytest.approx(-0.031096)
+    assert analysis.one_percent_rule == pytest.approx(0.0006)
+
+
+def test_analyze_zero_price_and_sqft():
+    analysis = analyze(price=0, sqft=0)
+    assert analysis.monthly_rent == 150.0
+    assert analysis.deal_score == 20
+    assert analysis.monthly_cash_flow == pytest.approx(-127.0)
+
+
+def test_listing_zero_price_analyzes_to_zeros():
+    analysis = calculate_property_analysis({**ROW, 'price': 0, 'estimatedMonthlyRent': 2000})
+    assert analysis['dealScore'] == 0
+    assert analysis['capRate'] == 0
+    assert analysis['cashOnCash'] == 0
+    assert analysis['monthlyCashFlow'] == 0
+    assert analysis['monthlyMortgage'] == 0
+
+
+def test_listing_zero_sqft_has_no_estimated_rent():
+    analysis = calculate_property_analysis({**ROW, 'sqft': 0})
+    assert analysis['monthlyRent'] == 0
+    assert analysis['dealScore'] == 0
+    assert analysis['capRate'] == pytest.approx(-0.037)
+    assert analysis['cashOnCash'] == pytest.approx(-0.346)
+    assert analysis['monthlyCashFlow'] == pytest.approx(-2018.28)
+    assert analysis['dscr'] == pytest.approx(-0.62)
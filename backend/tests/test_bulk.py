@@ -0,0 +1,101 @@
+# POST /api/properties/bulk row validation and error reporting, and the
+# (address, zip) key listings are upserted on
+
+import json
+
+import asyncpg
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+LISTING = {
+    'address': '1500 Main St, Dallas, TX 75201', 'street': '1500 Main St', 'city': 'Dallas',
+    'state': 'TX', 'zip': '75201', 'latitude': 32.7825, 'longitude': -96.7985,
+    'price': 425000, 'sqft': 1850, 'beds': 3, 'baths': 2, 'price_per_sqft': 229.73,
+    'lot_size': 0, 'home_type': 'Condo', 'estimated_taxes': 8500, 'year_built': 2008,
+}
+OVERFLOW_ADDRESS = 'overflow'
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    """Records that reached bulk_upsert_properties, one list per call"""
+    calls = []
+
+    async def bulk_upsert_properties(records):
+        calls.append(records)
+        if any(record[0] == OVERFLOW_ADDRESS for record in records):
+            raise asyncpg.exceptions.NumericValueOutOfRangeError('numeric field overflow')
+        return len(records), 0, list(range(len(records)))
+
+    async def noop(*args):
+        pass
+
+    monkeypatch.setattr(main, 'bulk_upsert_properties', bulk_upsert_properties)
+    monkeypatch.setattr(main, 'match_saved_searches', noop)
+    monkeypatch.setattr(main, 'refresh_stored_analysis', noop)
+    return calls
+
+
+def post_rows(rows: list) -> dict:
+    body = '\n'.join(json.dumps(row) for row in rows)
+    response = TestClient(main.app).post('/api/properties/bulk?format=ndjson', content=body)
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.parametrize('field, value', [
+    ('state', 'Texas'),
+    ('zip', '75201-12345'),
+    ('baths', 100),
+    ('price', 1e10),
+    ('address', 'x' * 501),
+])
+def test_values_past_column_limits_are_row_errors(loaded, field, value):
+    rows = [{**LISTING, 'address': f'{n} Main St'} for n in range(3)]
+    rows[1][field] = value
+    result = post_rows(rows)
+    assert result['inserted'] == 2
+    assert result['failed'] == 1
+    assert result['errors'][0]['row'] == 2
+    assert result['errors'][0]['errors'][0]['loc'] == [field]
+    assert all(len(records) == 2 for records in loaded)
+
+
+def test_database_rejections_are_narrowed_to_their_rows(loaded):
+    rows = [{**LISTING, 'address': f'{n} Main St'} for n in range(10)]
+    rows[6]['address'] = OVERFLOW_ADDRESS
+    result = post_rows(rows)
+    assert result['received'] == 10
+    assert result['inserted'] == 9
+    assert result['failed'] == 1
+    assert result['errors'] == [{'row': 7, 'errors': [{'loc': [], 'msg': 'numeric field overflow'}]}]
+
+
+def test_duplicate_single_create_is_a_conflict(monkeypatch):
+    async def insert_property(record):
+        raise asyncpg.UniqueViolationError('duplicate key value violates unique constraint')
+
+    monkeypatch.setattr(main, 'insert_property', insert_property)
+    response = TestClient(main.app).post('/api/properties', json=LISTING)
+    assert response.status_code == 409
+
+
+def csv_row(listing: dict, description: str) -> str:
+    cells = [str(value) for value in listing.values()] + [description]
+    return ','.join('"' + cell.replace('"', '""') + '"' for cell in cells)
+
+
+def test_csv_quoted_fields_may_span_lines(loaded):
+    body = '\n'.join([
+        ','.join(list(LISTING) + ['description']),
+        csv_row(LISTING, 'Corner unit.\nNew roof, "quiet" street.\n'),
+        csv_row({**LISTING, 'address': '2200 Ross Ave, Dallas, TX 75201'}, ''),
+    ])
+    response = TestClient(main.app).post('/api/properties/bulk?format=csv', content=body)
+    assert response.status_code == 200
+    result = response.json()
+    assert result['received'] == 2
+    assert result['failed'] == 0
+    assert [record[0] for record in loaded[0]] == [LISTING['address'], '2200 Ross Ave, Dallas, TX 75201']
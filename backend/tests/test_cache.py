@@ -0,0 +1,46 @@
+# TTLCache is shared by the event loop and offload worker threads
+# (analysis_cache under OFFLOAD_EXECUTOR=thread)
+
+import sys
+import threading
+
+import pytest
+
+from cache import TTLCache
+
+THREADS = 8
+OPERATIONS = 20_000
+
+
+@pytest.fixture
+def frequent_switches():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_concurrent_access_keeps_the_cache_consistent(frequent_switches):
+    cache = TTLCache(max_entries=64, max_weight=200, ttl_seconds=60)
+    failures = []
+
+    def worker(seed: int):
+        try:
+            for n in range(OPERATIONS):
+                key = (seed * 7 + n) % 100
+                if cache.get(key) is None:
+                    cache.set(key, n, weight=1 + key % 5)
+                if n % 997 == seed:
+                    cache.clear()
+        except Exception as e:
+            failures.append(e)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert failures == []
+    assert cache.stats()['weight'] == sum(weight for _, weight, _ in cache._entries.values())
+    assert cache.hits + cache.misses == THREADS * OPERATIONS
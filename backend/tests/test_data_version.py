@@ -0,0 +1,69 @@
+# ETags and cached listing pages follow changes made outside this process
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import data_version, property_cache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, '_hot_set', None)
+    property_cache.clear()
+    yield TestClient(main.app)
+    property_cache.clear()
+
+
+def serve_pages(monkeypatch, during_fetch=None) -> list:
+    """Answer the unbounded listing query with no rows, counting the calls"""
+    calls = []
+
+    async def fetch_all_properties(filters=None, limit=1000, after=None, sort='date_listed'):
+        calls.append(filters)
+        if during_fetch:
+            during_fetch()
+        return []
+
+    monkeypatch.setattr(main, 'fetch_all_properties', fetch_all_properties)
+    return calls
+
+
+def test_change_notification_invalidates_etags_and_pages(client, monkeypatch):
+    calls = serve_pages(monkeypatch)
+    response = client.get('/api/properties')
+    etag = response.headers['etag']
+    assert client.get('/api/properties', headers={'If-None-Match': etag}).status_code == 304
+
+    # Another worker (or psql) updated a listing
+    main.on_data_change(json.dumps({'op': 'update', 'id': 1}))
+
+    response = client.get('/api/properties', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+    assert len(calls) == 2
+
+
+def test_page_read_across_a_change_is_not_cached(client, monkeypatch):
+    calls = serve_pages(monkeypatch, during_fetch=data_version.bump)
+    client.get('/api/properties')
+    client.get('/api/properties')
+    assert len(calls) == 2
+
+
+def test_stored_analysis_rewrite_invalidates_score_filtered_pages(client, monkeypatch):
+    serve_pages(monkeypatch)
+    params = {'min_deal_score': 60, 'sort': 'deal_score'}
+    etag = client.get('/api/properties', params=params).headers['etag']
+
+    # Another worker recomputed stored analysis (08-change-feed.sql)
+    payload = json.dumps({'op': 'analysis'})
+    main.on_data_change(payload)
+    main.on_property_change(payload)
+    main.change_feed.record(payload)
+
+    response = client.get('/api/properties', params=params, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert main.change_feed.take() == (False, {})
@@ -0,0 +1,101 @@
+# The hex pyramid follows listing changes incrementally: folding changes in
+# must give the same hexes as building from scratch
+
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from heatmap import HEATMAP_METRICS, HexPyramid
+
+COUNT = 2000
+LISTING = {
+    'address': '1500 Main St, Dallas, TX 75201', 'street': '1500 Main St', 'city': 'Dallas',
+    'state': 'TX', 'zip': '75201', 'latitude': 32.7825, 'longitude': -96.7985,
+    'price': 425000, 'sqft': 1850, 'beds': 3, 'baths': 2, 'price_per_sqft': 229.73,
+    'lot_size': 0, 'home_type': 'Condo', 'estimated_taxes': 8500, 'year_built': 2008,
+}
+
+
+def random_listings(rng, count: int):
+    return (rng.uniform(32.6, 33.0, count), rng.uniform(-97.0, -96.6, count),
+            {name: rng.uniform(0, 100, count) for name in HEATMAP_METRICS})
+
+
+def hexes(pyramid: HexPyramid) -> dict:
+    """zoom -> {hex key: (count, stats...)} of the non-empty hexes"""
+    result = {}
+    for zoom, level in pyramid.levels.items():
+        filled = level.counts > 0
+        stats = np.hstack([level.stats[name][filled] for name in HEATMAP_METRICS])
+        result[zoom] = {
+            key: (count, *np.round(row, 6).tolist())
+            for key, count, row in zip(level.keys[filled].tolist(), level.counts[filled].tolist(), stats)
+        }
+    return result
+
+
+def test_changes_match_a_rebuild():
+    rng = np.random.default_rng(0)
+    lat, lng, metrics = random_listings(rng, COUNT)
+    pyramid = HexPyramid(np.arange(COUNT), lat, lng, metrics)
+
+    # Move and rescore some listings, add new ones, sell others
+    changed = np.concatenate([rng.choice(COUNT, 50, replace=False), np.arange(COUNT, COUNT + 20)])
+    new_lat, new_lng, new_metrics = random_listings(rng, len(changed))
+    sold = [i for i in rng.choice(COUNT, 30, replace=False).tolist() if i not in set(changed.tolist())]
+    pyramid.apply(changed, new_lat, new_lng, new_metrics, removed_ids=sold)
+    pyramid.remove(sold[:1])
+
+    ids = np.arange(COUNT + 20)
+    lat, lng = np.append(lat, np.zeros(20)), np.append(lng, np.zeros(20))
+    metrics = {name: np.append(values, np.zeros(20)) for name, values in metrics.items()}
+    lat[changed], lng[changed] = new_lat, new_lng
+    for name in HEATMAP_METRICS:
+        metrics[name][changed] = new_metrics[name]
+    kept = ~np.isin(ids, sold)
+    rebuilt = HexPyramid(ids[kept], lat[kept], lng[kept], {name: values[kept] for name, values in metrics.items()})
+
+    assert hexes(pyramid) == hexes(rebuilt)
+
+
+@pytest.fixture
+def heatmap(monkeypatch):
+    """A built pyramid over LISTING as id 1, and the ids fetched from then on"""
+    rows = [{'id': 1, **{main._MODEL_TO_DB.get(key, key): value for key, value in LISTING.items()}}]
+    fetched = []
+
+    async def fetch_analysis_columns(ids=None):
+        fetched.append(ids)
+        return []
+
+    monkeypatch.setattr(main, '_heatmap', main.build_heatmap(rows))
+    monkeypatch.setattr(main, 'fetch_analysis_columns', fetch_analysis_columns)
+    main._heatmap_pending.clear()
+    yield fetched
+    main._heatmap_pending.clear()
+
+
+def test_listing_no_longer_for_sale_leaves_the_heatmap(heatmap):
+    main.on_heatmap_change('{"op": "update", "id": 1, "old": {}}')
+    asyncio.run(main.apply_heatmap_changes(list(main._heatmap_pending)))
+    assert heatmap == [[1]]
+    assert all(level.counts.sum() == 0 for level in main._heatmap.levels.values())
+
+
+def test_create_queues_the_heatmap_update(heatmap, monkeypatch):
+    async def insert_property(record):
+        return 2
+
+    async def noop(*args):
+        return 0
+
+    monkeypatch.setattr(main, 'insert_property', insert_property)
+    monkeypatch.setattr(main, 'match_saved_searches', noop)
+    monkeypatch.setattr(main, 'refresh_stored_analysis', noop)
+    response = TestClient(main.app).post('/api/properties', json={**LISTING, 'for_sale': True})
+    assert response.status_code == 200
+    assert main._heatmap_pending == {2}
+    assert heatmap == []
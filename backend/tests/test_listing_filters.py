@@ -0,0 +1,56 @@
+# Listing filters apply without a bounding box too (GET /api/properties
+# with no viewport is the app's initial load)
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.generate import generate_properties, listing_rows
+from database import build_all_query
+from hotset import HotSet
+
+MIN_DEAL_SCORE = 50
+
+
+@pytest.fixture
+def client():
+    main.property_cache.clear()
+    yield TestClient(main.app)
+    main.property_cache.clear()
+
+
+def test_build_all_query_applies_filters():
+    query, params = build_all_query({'min_deal_score': MIN_DEAL_SCORE, 'min_cap_rate': 0.05}, limit=10)
+    assert 'deal_score >= $1' in query
+    assert 'cap_rate >= $2' in query
+    assert params == [MIN_DEAL_SCORE, 0.05, 10]
+
+
+def test_list_without_bbox_passes_filters(client, monkeypatch):
+    calls = []
+
+    async def fetch_all_properties(filters=None, limit=1000, after=None, sort='date_listed'):
+        calls.append(filters)
+        return []
+
+    monkeypatch.setattr(main, 'fetch_all_properties', fetch_all_properties)
+    monkeypatch.setattr(main, '_hot_set', None)
+    response = client.get('/api/properties', params={'min_deal_score': MIN_DEAL_SCORE})
+    assert response.status_code == 200
+    assert calls[0]['min_deal_score'] == MIN_DEAL_SCORE
+
+
+def test_hot_set_without_bbox_excludes_low_scores(client, monkeypatch):
+    rows = listing_rows([record for chunk in generate_properties(2000) for record in chunk])
+    rows = [row for row in rows if row['forSale']]
+    hot = HotSet()
+    hot.load([main.hot_set_batch(rows)])
+    monkeypatch.setattr(main, '_hot_set', hot)
+
+    scores = {row['id']: analysis['dealScore'] for row, analysis in zip(rows, main.calculate_properties_analysis(rows))}
+    expected = {property_id for property_id, score in scores.items() if score >= MIN_DEAL_SCORE}
+    assert 0 < len(expected) < len(rows)
+
+    response = client.get('/api/properties', params={'min_deal_score': MIN_DEAL_SCORE, 'limit': len(rows)})
+    assert response.status_code == 200
+    assert {listing['id'] for listing in response.json()} == expected
@@ -0,0 +1,40 @@
+# A rent_rates refresh announced by another process reloads the rent table
+# and recomputes the stored analysis only when the rates changed
+
+import asyncio
+
+import pytest
+
+import comps
+import main
+
+RATES = [('zip', '75201', 'Condo', 1.8, 20)]
+
+
+@pytest.fixture
+def synced(monkeypatch):
+    """Stored analysis syncs, one entry per call"""
+    calls = []
+
+    async def fetch_rent_rates():
+        return RATES
+
+    async def sync_stored_analysis():
+        calls.append(comps.rent_table.version)
+
+    monkeypatch.setattr(comps, 'rent_table', comps.RentTable())
+    monkeypatch.setattr(main, 'fetch_rent_rates', fetch_rent_rates)
+    monkeypatch.setattr(main, 'sync_stored_analysis', sync_stored_analysis)
+    monkeypatch.setattr(main, '_hot_set', None)
+    monkeypatch.setattr(main.offload, 'restart', lambda: None)
+    return calls
+
+
+def test_refresh_applies_changed_rates_once(synced):
+    asyncio.run(main.reload_rent_table())
+    assert comps.rent_table.entries == 1
+    assert synced == [comps.rent_table.version]
+
+    # Same rates again: nothing to recompute
+    asyncio.run(main.reload_rent_table())
+    assert len(synced) == 1
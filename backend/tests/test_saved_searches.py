@@ -0,0 +1,70 @@
+# The saved search index is built on the offload pool and must reach the
+# event loop's process intact, including with OFFLOAD_EXECUTOR=process; and
+# listings whose stored deal score moves are matched against it again
+
+import asyncio
+
+import pytest
+
+import main
+import offload
+
+SEARCHES = [
+    {'id': n, 'north': 33.0, 'south': 32.5, 'east': -96.5, 'west': -97.0,
+     'status': 'For Sale', 'home_type': 'All', 'min_price': 100_000 * n,
+     'max_price': None, 'min_beds': None, 'min_deal_score': None}
+    for n in range(1, 4)
+]
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_loaded_index_holds_the_searches(monkeypatch, executor):
+    async def fetch_saved_searches():
+        return SEARCHES
+
+    monkeypatch.setattr(main, 'fetch_saved_searches', fetch_saved_searches)
+    monkeypatch.setattr(offload, 'OFFLOAD_EXECUTOR', executor)
+    monkeypatch.setattr(offload, 'OFFLOAD_MIN_ROWS', 0)
+    monkeypatch.setattr(offload, '_executor', None)
+    try:
+        index = asyncio.run(main.load_saved_searches())
+    finally:
+        offload.shutdown()
+    assert sorted(index.ids.tolist()) == [1, 2, 3]
+
+
+def test_rescored_listings_are_matched_again(monkeypatch):
+    listing = {
+        'latitude': 32.78, 'longitude': -96.8, 'zip': '75201', 'home_type': 'Condo',
+        'price': 250000, 'estimated_taxes': 5000, 'hoa': 0, 'estimated_monthly_rent': 2400,
+        'square_foot': 1200, 'bed': 2, 'bath': 2, 'year_built': 2005, 'number_of_units': 1,
+    }
+    score = int(main.analyze_rows([listing])['deal_score'][0])
+    # Never analyzed, unchanged, rescored
+    stale = [{'id': 1, 'deal_score': None, **listing},
+             {'id': 2, 'deal_score': score, **listing},
+             {'id': 3, 'deal_score': score - 10, **listing}]
+    matched = []
+
+    async def fetch_unanalyzed_rows(limit):
+        rows = list(stale)
+        stale.clear()
+        return rows
+
+    async def store_analysis(*args):
+        pass
+
+    async def match_saved_searches(property_ids):
+        matched.extend(property_ids)
+
+    monkeypatch.setattr(main, 'fetch_unanalyzed_rows', fetch_unanalyzed_rows)
+    monkeypatch.setattr(main, 'store_analysis', store_analysis)
+    monkeypatch.setattr(main, 'match_saved_searches', match_saved_searches)
+
+    async def refresh():
+        updated = await main.refresh_stored_analysis()
+        await asyncio.gather(*main._background_tasks)
+        return updated
+
+    assert asyncio.run(refresh()) == 3
+    assert matched == [3]
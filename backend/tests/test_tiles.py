@@ -0,0 +1,36 @@
+# Conditional GETs of vector tiles
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+import main
+
+TILE = b'\x1a\x02tile'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def build_tile(z, x, y):
+        return TILE
+    monkeypatch.setattr(database, 'has_postgis', True)
+    monkeypatch.setattr(main, 'build_tile', build_tile)
+    main.tile_cache.clear()
+    yield TestClient(main.app)
+    main.tile_cache.clear()
+
+
+def test_tile_revalidation(client):
+    response = client.get('/api/tiles/14/3770/6650.mvt')
+    assert response.status_code == 200
+    etag = response.headers['etag']
+    digest = etag.strip('"')
+
+    for if_none_match in (etag, f'W/{etag}', f'"other", {etag}', f'"{digest}-gzip"', '*'):
+        response = client.get('/api/tiles/14/3770/6650.mvt', headers={'If-None-Match': if_none_match})
+        assert response.status_code == 304, if_none_match
+        assert response.content == b''
+
+    response = client.get('/api/tiles/14/3770/6650.mvt', headers={'If-None-Match': '"other"'})
+    assert response.status_code == 200
+    assert response.content == TILE
@@ -0,0 +1,46 @@
+# Top deals pruning must return what a full scan would
+
+from fastapi.testclient import TestClient
+
+import main
+
+PRICE = 200_000
+
+
+def listing(property_id: int, rent: float, taxes: float) -> dict:
+    return {
+        'id': property_id, 'price': PRICE, 'estimatedMonthlyRent': rent, 'estimatedTaxes': taxes,
+        'hoa': 0, 'sqft': 1500, 'beds': 3, 'baths': 2, 'yearBuilt': 2000, 'units': 1,
+        'ratio_bound': rent / PRICE,
+    }
+
+
+def serve_candidates(monkeypatch, rows: list):
+    """fetch_deal_candidates over `rows`, best ratio bound first"""
+    rows = sorted(rows, key=lambda row: (row['ratio_bound'], row['id']), reverse=True)
+
+    async def fetch_deal_candidates(bbox, filters, rent_bound, min_ratio, limit, after):
+        remaining = [row for row in rows if after is None or (row['ratio_bound'], row['id']) < after]
+        return [dict(row) for row in remaining[:limit]]
+
+    monkeypatch.setattr(main, 'fetch_deal_candidates', fetch_deal_candidates)
+    monkeypatch.setattr(main, 'DEAL_CANDIDATE_BATCH_SIZE', 1)
+
+
+def test_score_ties_are_broken_by_cash_on_cash(monkeypatch):
+    # Both score 100. The first read has the higher ratio, so its score
+    # already equals the bound, but taxes leave it the lower cash on cash.
+    taxed = listing(1, rent=2500, taxes=750)
+    untaxed = listing(2, rent=2450, taxes=0)
+    weak = listing(3, rent=1500, taxes=0)
+    serve_candidates(monkeypatch, [taxed, untaxed, weak])
+
+    scores = main.calculate_properties_analysis([taxed, untaxed])
+    assert scores[0]['dealScore'] == scores[1]['dealScore'] == 100
+    assert scores[0]['cashOnCash'] < scores[1]['cashOnCash']
+    assert main.deal_score_upper_bound(taxed['ratio_bound'], main.AnalysisAssumptions()) == 100
+
+    response = TestClient(main.app).post('/api/deals/top', json={'n': 1})
+    assert response.status_code == 200
+    result = response.json()
+    assert [deal['id'] for deal in result['deals']] == [untaxed['id']]
@@ -0,0 +1,73 @@
+# Viewport pages are cut from rows cached per snapped cell: pans share the
+# cell, but a page only ever holds listings inside the requested viewport
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.generate import generate_properties, listing_rows
+from cache import snap_bbox
+
+ROWS = listing_rows([record for chunk in generate_properties(20_000) for record in chunk])
+# Central Dallas, off the snap grid on every side
+VIEWPORT = dict(north=32.83, south=32.74, east=-96.73, west=-96.86)
+PAGE_SIZE = 50
+
+
+def inside(row: dict, north, south, east, west) -> bool:
+    return south <= row['latitude'] <= north and west <= row['longitude'] <= east
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """Bboxes queried, answered from ROWS most expensive first"""
+    calls = []
+
+    async def fetch_properties_in_bbox(north, south, east, west, filters=None, limit=500, after=None, sort='price'):
+        calls.append((north, south, east, west))
+        rows = [row for row in ROWS if inside(row, north, south, east, west)]
+        rows.sort(key=lambda row: (row['price'], row['id']), reverse=True)
+        return rows[:limit]
+
+    monkeypatch.setattr(main, 'fetch_properties_in_bbox', fetch_properties_in_bbox)
+    monkeypatch.setattr(main, '_hot_set', None)
+    main.property_cache.clear()
+    yield calls
+    main.property_cache.clear()
+
+
+def expected_ids(viewport: dict) -> list:
+    rows = sorted((row for row in ROWS if inside(row, **viewport)),
+                  key=lambda row: (row['price'], row['id']), reverse=True)
+    return [row['id'] for row in rows[:PAGE_SIZE]]
+
+
+def get_page(viewport: dict) -> list:
+    response = TestClient(main.app).get('/api/properties', params={**viewport, 'limit': PAGE_SIZE})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_page_holds_only_the_viewport(queries):
+    snapped = snap_bbox(**VIEWPORT)
+    assert sum(inside(row, *snapped) and not inside(row, **VIEWPORT) for row in ROWS) > PAGE_SIZE
+
+    page = get_page(VIEWPORT)
+    assert all(inside(row, **VIEWPORT) for row in page)
+    assert [row['id'] for row in page] == expected_ids(VIEWPORT)
+
+
+def test_pans_within_a_cell_share_its_rows(queries):
+    panned = {**VIEWPORT, 'east': VIEWPORT['east'] - 0.01, 'west': VIEWPORT['west'] - 0.01}
+    assert snap_bbox(**panned) == snap_bbox(**VIEWPORT)
+    get_page(VIEWPORT)
+    page = get_page(panned)
+    assert [row['id'] for row in page] == expected_ids(panned)
+    assert len(queries) == 1
+
+
+def test_truncated_cell_falls_back_to_the_viewport(queries, monkeypatch):
+    monkeypatch.setattr(main, 'SNAPPED_FETCH_MAX_ROWS', PAGE_SIZE)
+    page = get_page(VIEWPORT)
+    assert [row['id'] for row in page] == expected_ids(VIEWPORT)
+    assert queries[-1] == (VIEWPORT['north'], VIEWPORT['south'], VIEWPORT['east'], VIEWPORT['west'])
@@ -0,0 +1,72 @@
+# The viewport query build_bbox_query emits must be answered by a GIST
+# index on location (03-viewport-indexes.sql), under the default planner
+# settings, against a realistically sized table.
+#
+# Needs the docker-compose database (DATABASE_URL, PostGIS); skipped without
+# it. Generated listings are loaded inside a transaction that is rolled
+# back, so the database is left as it was.
+
+import asyncio
+import json
+
+import asyncpg
+import pytest
+
+import database
+from benchmarks.generate import generate_properties
+from database import BULK_COLUMNS, build_bbox_query
+
+SEED_LISTINGS = 50_000
+# A few blocks of central Dallas, one of the generated metros
+VIEWPORT = dict(north=32.79, south=32.77, east=-96.785, west=-96.81)
+FILTERS = {'status': 'For Sale', 'min_price': 100_000}
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+async def explain_viewport_query() -> tuple:
+    """(plan nodes, GIST index names on properties) with the seed data loaded"""
+    try:
+        await database.init_db()
+    except (OSError, asyncpg.PostgresError) as e:
+        pytest.skip(f"database unavailable: {e}")
+    try:
+        if not database.has_postgis:
+            pytest.skip("viewport indexes need PostGIS")
+        async with database.get_connection() as conn:
+            transaction = conn.transaction()
+            await transaction.start()
+            try:
+                # Prefixed so they can't collide with listings already loaded by benchmarks.generate
+                records = [
+                    (f"viewport-test {record[0]}",) + record[1:]
+                    for chunk in generate_properties(SEED_LISTINGS) for record in chunk
+                ]
+                await conn.copy_records_to_table('properties', records=records, columns=BULK_COLUMNS)
+                await conn.execute("ANALYZE properties")
+                gist_indexes = {
+                    row['indexname'] for row in await conn.fetch("""
+                        SELECT indexname FROM pg_indexes
+                        WHERE tablename = 'properties' AND indexdef ILIKE '%USING gist%'
+                    """)
+                }
+                query, params = build_bbox_query(**VIEWPORT, filters=FILTERS, limit=500)
+                plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *params)
+            finally:
+                await transaction.rollback()
+    finally:
+        await database.close_db()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return list(plan_nodes(plan[0]['Plan'])), gist_indexes
+
+
+def test_viewport_query_uses_gist_index():
+    nodes, gist_indexes = asyncio.run(explain_viewport_query())
+    scanned = {node.get('Index Name') for node in nodes if 'Index Scan' in node['Node Type']}
+    assert scanned & gist_indexes, f"viewport query is not using a GIST index: {nodes}"
+    assert not any(node['Node Type'] == 'Seq Scan' for node in nodes)
@@ -5,6 +5,25 @@
 
 const API_BASE = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
+/**
+ * Mapbox Vector Tile URL template for for-sale properties.
+ * Low zooms return a 'clusters' layer, higher zooms a 'properties' layer.
+ */
+export const PROPERTY_TILES_URL = `${API_BASE}/api/tiles/{z}/{x}/{y}.mvt`;
+
+/**
+ * Encode analysis assumption overrides as the compact `key:value,...` query
+ * value, e.g. { interest_rate: 0.065 } -> 'interest_rate:0.065'
+ * @param {Object} assumptions - AnalysisAssumptions fields to override
+ * @returns {string}
+ */
+export function encodeAssumptions(assumptions) {
+  return Object.entries(assumptions)
+    .filter(([, value]) => value !== null && value !== undefined)
+    .map(([key, value]) => `${key}:${value}`)
+    .join(',');
+}
+
 /**
  * Fetch properties from the API
  * @param {Object} params - Query parameters
@@ -23,6 +42,13 @@ export async function fetchProperties(params = {}) {
     if (params.minPrice) queryParams.append('min_price', params.minPrice);
     if (params.maxPrice) queryParams.append('max_price', params.maxPrice);
     if (params.minBeds) queryParams.append('min_beds', params.minBeds);
+    if (params.forSale !== undefined) queryParams.append('for_sale', params.forSale);
+    if (params.minDealScore) queryParams.append('min_deal_score', params.minDealScore);
+    if (params.minCapRate) queryParams.append('min_cap_rate', params.minCapRate);
+    if (params.sort) queryParams.append('sort', params.sort);
+    if (params.assumptions) queryParams.append('assumptions', encodeAssumptions(params.assumptions));
+    // 'columnar' returns { count, dtypes, columns } instead of an array of properties
+    if (params.format) queryParams.append('format', params.format);
     
     const url = `${API_BASE}/api/properties?${queryParams.toString()}`;
     const response = await fetch(url);
@@ -39,6 +65,33 @@ export async function fetchProperties(params = {}) {
   }
 }
 
+/**
+ * Subscribe to live listing changes inside a viewport (Server-Sent Events)
+ * @param {Object} params - Same bbox and filter params as fetchProperties
+ * @param {Object} handlers - { onChanges({ upserts, removes }), onResync() }
+ * @returns {EventSource} Call .close() to unsubscribe
+ */
+export function subscribeToChanges(params = {}, { onChanges, onResync } = {}) {
+  const queryParams = new URLSearchParams();
+  ['north', 'south', 'east', 'west'].forEach((key) => {
+    if (params[key] !== undefined) queryParams.append(key, params[key]);
+  });
+  if (params.status && params.status !== 'All') queryParams.append('status', params.status);
+  if (params.homeType && params.homeType !== 'All') queryParams.append('home_type', params.homeType);
+  if (params.minPrice) queryParams.append('min_price', params.minPrice);
+  if (params.maxPrice) queryParams.append('max_price', params.maxPrice);
+  if (params.minBeds) queryParams.append('min_beds', params.minBeds);
+  if (params.forSale !== undefined) queryParams.append('for_sale', params.forSale);
+  if (params.minDealScore) queryParams.append('min_deal_score', params.minDealScore);
+  if (params.minCapRate) queryParams.append('min_cap_rate', params.minCapRate);
+
+  const source = new EventSource(`${API_BASE}/api/stream?${queryParams.toString()}`);
+  source.addEventListener('changes', (event) => onChanges?.(JSON.parse(event.data)));
+  // The server asks for a full refetch after bulk loads or when we fell behind
+  source.addEventListener('resync', () => onResync?.());
+  return source;
+}
+
 /**
  * Fetch a single property by ID
  * @param {number} id - Property ID
@@ -59,6 +112,77 @@ export async function fetchPropertyById(id) {
   }
 }
 
+/**
+ * Fetch comparable rentals for a property
+ * @param {number} id - Property ID
+ * @param {Object} params - Optional limit and radius_km
+ * @returns {Promise<Object>} Weighted comps and the rent they suggest
+ */
+export async function fetchPropertyComps(id, params = {}) {
+  try {
+    const query = new URLSearchParams(params).toString();
+    const response = await fetch(`${API_BASE}/api/properties/${id}/comps${query ? `?${query}` : ''}`);
+    
+    if (!response.ok) {
+      throw new Error(`API error: ${response.status}`);
+    }
+    
+    return await response.json();
+  } catch (error) {
+    console.error('Error fetching comps:', error);
+    throw error;
+  }
+}
+
+/**
+ * Save a bbox + filter combination to be told about new matches
+ * @param {Object} search - name, optional owner and bbox, and filters
+ * @returns {Promise<Object>} The saved search with its ID
+ */
+export async function createSavedSearch(search) {
+  try {
+    const response = await fetch(`${API_BASE}/api/saved-searches`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(search),
+    });
+    
+    if (!response.ok) {
+      throw new Error(`API error: ${response.status}`);
+    }
+    
+    return await response.json();
+  } catch (error) {
+    console.error('Error saving search:', error);
+    throw error;
+  }
+}
+
+/**
+ * Fetch the listings that matched a saved search, newest first
+ * @param {number} id - Saved search ID
+ * @param {string} cursor - nextCursor of the previous page
+ * @returns {Promise<Object>} { matches, nextCursor }
+ */
+export async function fetchSavedSearchMatches(id, cursor = null) {
+  try {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    const response = await fetch(`${API_BASE}/api/saved-searches/${id}/matches${query}`);
+    
+    if (!response.ok) {
+      throw new Error(`API error: ${response.status}`);
+    }
+    
+    return {
+      matches: await response.json(),
+      nextCursor: response.headers.get('X-Next-Cursor'),
+    };
+  } catch (error) {
+    console.error('Error fetching saved search matches:', error);
+    throw error;
+  }
+}
+
 /**
  * Create a new property
  * @param {Object} propertyData - Property data
@@ -104,6 +228,31 @@ export async function fetchStats() {
   }
 }
 
+/**
+ * Get per-region market statistics (counts, averages, median / p90)
+ * @param {Object} params - { by: 'state' | 'city' | 'zip' | 'home_type', forSale, state }
+ * @returns {Promise<Array>} One entry per region, largest first
+ */
+export async function fetchStatsBreakdown(params = {}) {
+  try {
+    const queryParams = new URLSearchParams();
+    if (params.by) queryParams.append('by', params.by);
+    if (params.forSale !== undefined) queryParams.append('for_sale', params.forSale);
+    if (params.state) queryParams.append('state', params.state);
+    
+    const response = await fetch(`${API_BASE}/api/stats/breakdown?${queryParams.toString()}`);
+    
+    if (!response.ok) {
+      throw new Error(`API error: ${response.status}`);
+    }
+    
+    return await response.json();
+  } catch (error) {
+    console.error('Error fetching stats breakdown:', error);
+    throw error;
+  }
+}
+
 /**
  * Check if API is available
  * @returns {Promise<boolean>}